@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# @author madebycm (2025-01-23)
+
+"""
+Alias Manager command line
+`am` without arguments opens the GUI; the subcommands work on ~/.zprofile directly and
+never import tkinter, so they are quick and run on headless machines.
+
+    am list [--json] [TEXT]        aliases whose name or command contains TEXT
+    am add NAME COMMAND            add or update one alias
+    am rm NAME...                  remove aliases
+    am import [--replace] FILE     add aliases from a JSON export or alias lines (- for stdin)
+    am export [--json]             print all aliases as alias lines or JSON
+    am usage [--json] [--unused]   how often each alias appears in the shell history
+    am profile [--shell SHELL]     what sourcing the profile costs at shell startup
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+import alias_store
+
+
+def cmd_list(args, aliases):
+    query = (args.text or "").lower()
+    matches = {name: command for name, command in sorted(aliases.items())
+               if query in name.lower() or query in command.lower()}
+    if args.json:
+        json.dump(matches, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        for name, command in matches.items():
+            print(f"{name}\t{command}")
+    return 0
+
+
+def cmd_add(args, aliases):
+    if not alias_store.valid_name(args.name):
+        print(f"❌ Invalid alias name: {args.name}", file=sys.stderr)
+        return 1
+    if not args.alias_command:
+        print("❌ Command cannot be empty", file=sys.stderr)
+        return 1
+    action = "Updated" if args.name in aliases else "Added"
+    aliases[args.name] = args.alias_command
+    alias_store.save_aliases(aliases, args.profile)
+    print(f"✓ {action} alias: {args.name}")
+    return 0
+
+
+def cmd_rm(args, aliases):
+    missing = [name for name in args.names if name not in aliases]
+    if missing:
+        print(f"❌ No such alias: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    for name in args.names:
+        del aliases[name]
+    alias_store.save_aliases(aliases, args.profile)
+    print(f"✓ Removed {len(args.names)} alias{'es' if len(args.names) != 1 else ''}")
+    return 0
+
+
+def read_import(path):
+    """
+    Aliases from a file written by `am export`: JSON ({name: command}) or alias lines
+    Raises ValueError for JSON that is not an object of strings
+    """
+    if path == '-':
+        content = sys.stdin.read()
+    else:
+        with open(path, 'r') as f:
+            content = f.read()
+    if content.lstrip().startswith('{'):
+        data = json.loads(content)
+        if not isinstance(data, dict) or not all(isinstance(value, str) for value in data.values()):
+            raise ValueError("expected a JSON object of alias names to commands")
+        return data
+    return alias_store.parse_aliases(content)
+
+
+def cmd_import(args, aliases):
+    try:
+        imported = read_import(args.file)
+    except (OSError, ValueError) as e:
+        print(f"❌ Failed to import {args.file}: {e}", file=sys.stderr)
+        return 1
+    invalid = [name for name, command in imported.items() if not alias_store.valid_name(name) or not command]
+    if invalid:
+        print(f"❌ Invalid aliases, nothing imported: {', '.join(sorted(invalid)[:10])}", file=sys.stderr)
+        return 1
+
+    added = sum(1 for name in imported if name not in aliases)
+    updated = sum(1 for name, command in imported.items() if name in aliases and aliases[name] != command)
+    removed = 0
+    if args.replace:
+        removed = sum(1 for name in aliases if name not in imported)
+        aliases = {}
+    aliases.update(imported)
+    # All aliases are written in one rewrite, however many were imported
+    alias_store.save_aliases(aliases, args.profile)
+    print(f"✓ Imported {len(imported)} aliases: {added} added, {updated} updated, {removed} removed")
+    return 0
+
+
+def cmd_export(args, aliases):
+    if args.json:
+        json.dump(dict(sorted(aliases.items())), sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        for name, command in sorted(aliases.items()):
+            sys.stdout.write(alias_store.format_alias(name, command))
+    return 0
+
+
+def cmd_usage(args, aliases):
+    # Imported here so the other commands do not pay for it
+    import alias_usage
+    usage = alias_usage.scan_usage(aliases, paths=args.history or None, use_checkpoint=not args.rescan)
+    if args.unused:
+        usage = {name: value for name, value in usage.items() if value[0] == 0}
+    # Least used first: those are the candidates for removal
+    ordered = sorted(usage.items(), key=lambda item: (item[1][0], item[1][1] or 0, item[0]))
+    if args.json:
+        json.dump({name: {'count': count, 'last_used': last_used} for name, (count, last_used) in ordered},
+                  sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        for name, (count, last_used) in ordered:
+            last = datetime.fromtimestamp(last_used).strftime("%Y-%m-%d %H:%M") if last_used else "-"
+            print(f"{count:>7}  {last:16}  {name}")
+    return 0
+
+
+def cmd_profile(args, aliases):
+    import alias_profile
+    try:
+        report = alias_profile.profile_startup(args.profile, shell=args.shell, runs=args.runs)
+    except alias_profile.ProfileError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print(alias_profile.format_report(report, top=args.top))
+    return 0
+
+
+COMMANDS = {
+    'list': cmd_list,
+    'add': cmd_add,
+    'rm': cmd_rm,
+    'import': cmd_import,
+    'export': cmd_export,
+    'usage': cmd_usage,
+    'profile': cmd_profile,
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='am', description="Manage shell aliases in ~/.zprofile")
+    parser.add_argument('--profile', default=alias_store.ZPROFILE_PATH,
+                        help="profile file to edit (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command')
+
+    list_parser = commands.add_parser('list', help="list aliases")
+    list_parser.add_argument('text', nargs='?', help="only aliases whose name or command contains TEXT")
+    list_parser.add_argument('--json', action='store_true', help="print a JSON object")
+
+    add_parser = commands.add_parser('add', help="add or update an alias")
+    add_parser.add_argument('name')
+    add_parser.add_argument('alias_command', metavar='command')
+
+    rm_parser = commands.add_parser('rm', help="remove aliases")
+    rm_parser.add_argument('names', nargs='+', metavar='NAME')
+
+    import_parser = commands.add_parser('import', help="add aliases from a file (- for stdin)")
+    import_parser.add_argument('file')
+    import_parser.add_argument('--replace', action='store_true', help="remove aliases not in the file")
+
+    export_parser = commands.add_parser('export', help="print all aliases")
+    export_parser.add_argument('--json', action='store_true', help="print a JSON object")
+
+    usage_parser = commands.add_parser('usage', help="count alias uses in the shell history")
+    usage_parser.add_argument('--json', action='store_true', help="print a JSON object")
+    usage_parser.add_argument('--unused', action='store_true', help="only aliases never used")
+    usage_parser.add_argument('--history', action='append', metavar='FILE',
+                              help="history file to read (repeatable; default: $HISTFILE, ~/.zsh_history, ~/.bash_history)")
+    usage_parser.add_argument('--rescan', action='store_true', help="ignore the checkpoint and read all history")
+
+    profile_parser = commands.add_parser('profile', help="measure what sourcing the profile costs at startup")
+    profile_parser.add_argument('--shell', choices=['bash', 'zsh'], help="shell to profile with (default: $SHELL)")
+    profile_parser.add_argument('--runs', type=int, default=5, help="runs to take the median of (default: %(default)s)")
+    profile_parser.add_argument('--top', type=int, default=15, help="slowest lines to list (default: %(default)s)")
+    profile_parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+
+    commands.add_parser('gui', help="open the GUI (the default)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command in (None, 'gui'):
+        # tkinter is only imported here
+        import alias_manager
+        alias_manager.main(args.profile)
+        return 0
+
+    try:
+        aliases = alias_store.load_aliases(args.profile)
+    except FileNotFoundError:
+        aliases = {}
+    except OSError as e:
+        print(f"❌ Failed to load aliases: {e}", file=sys.stderr)
+        return 1
+    try:
+        return COMMANDS[args.command](args, aliases)
+    except OSError as e:
+        print(f"❌ Failed to save aliases: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,18 +6,37 @@ from tkinter import ttk, messagebox, filedialog, scrolledtext
 import os
 import shutil
 from datetime import datetime
-import re
 import subprocess
+import queue
+import threading
+
+import alias_profile
+import alias_store
+import alias_usage
+
+# The search filter runs once typing pauses for this long (ms)
+FILTER_DELAY_MS = 60
 
 class AliasManager:
-    def __init__(self, root):
+    def __init__(self, root, zprofile_path=alias_store.ZPROFILE_PATH):
         self.root = root
         self.root.title("Alias Manager")
         self.root.geometry("800x600")
         
-        self.zprofile_path = os.path.expanduser("~/.zprofile")
+        self.zprofile_path = zprofile_path
         self.aliases = {}
         
+        # Treeview rows are created once per alias and only attached/detached by the filter
+        self.rows = {}  # alias -> tree item id
+        self.search_index = {}  # alias -> lowercase "alias\0command"
+        self.sorted_aliases = []
+        self.shown = []  # item ids currently attached, in order
+        self._filter_job = None
+        self._last_query = None  # query behind _last_matches, None after alias changes
+        self._last_matches = []
+        self.usage = {}  # alias -> (count, last used), filled in by a background history scan
+        self._usage_results = queue.Queue()
+        
         self.setup_ui()
         self.load_aliases()
         
@@ -33,6 +52,7 @@ class AliasManager:
         file_menu.add_separator()
         file_menu.add_command(label="Reload", command=self.load_aliases)
         file_menu.add_command(label="Save", command=self.save_aliases)
+        file_menu.add_command(label="Profile startup...", command=self.profile_startup)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         
@@ -62,11 +82,15 @@ class AliasManager:
         list_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 5))
         
         # Treeview for aliases
-        self.tree = ttk.Treeview(list_frame, columns=("command",), show="tree headings", height=15)
+        self.tree = ttk.Treeview(list_frame, columns=("command", "uses", "last_used"), show="tree headings", height=15)
         self.tree.heading("#0", text="Alias")
         self.tree.heading("command", text="Command")
+        self.tree.heading("uses", text="Uses")
+        self.tree.heading("last_used", text="Last used")
         self.tree.column("#0", width=150)
         self.tree.column("command", width=400)
+        self.tree.column("uses", width=60, anchor=tk.E)
+        self.tree.column("last_used", width=90)
         
         # Scrollbar for treeview
         scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
@@ -121,36 +145,117 @@ class AliasManager:
             return
             
         try:
-            with open(self.zprofile_path, 'r') as f:
-                content = f.read()
-                
-            # Match alias patterns
-            # Handles: alias name="command" and alias name='command'
-            alias_pattern = r'^\s*alias\s+([^=]+)=(["\'])(.+?)\2'
-            
-            for line in content.split('\n'):
-                match = re.match(alias_pattern, line)
-                if match:
-                    alias_name = match.group(1).strip()
-                    alias_command = match.group(3)
-                    self.aliases[alias_name] = alias_command
-                    
-            self.update_tree()
+            self.aliases.update(alias_store.load_aliases(self.zprofile_path))
+            self.rebuild_rows()
+            self.update_tree(self.search_var.get())
             self.status_var.set(f"Loaded {len(self.aliases)} aliases")
+            self.scan_usage()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load aliases: {str(e)}")
             
+    def rebuild_rows(self):
+        """Recreate the tree rows and search index from self.aliases"""
+        if self.rows:
+            self.tree.delete(*self.rows.values())
+        self.rows.clear()
+        self.search_index.clear()
+        self.sorted_aliases = sorted(self.aliases)
+        for alias in self.sorted_aliases:
+            self.search_index[alias] = f"{alias}\0{self.aliases[alias]}".lower()
+            self.rows[alias] = self.tree.insert("", "end", text=alias,
+                                                values=(self.aliases[alias], *self.usage_values(alias)))
+        self.shown = list(self.rows.values())
+        self._last_query = None
+        
+    def index_alias(self, alias):
+        """Create or update the row and search key of one alias"""
+        command = self.aliases[alias]
+        self.search_index[alias] = f"{alias}\0{command}".lower()
+        if alias in self.rows:
+            self.tree.set(self.rows[alias], "command", command)
+        else:
+            # Created detached; update_tree attaches it if it matches the filter
+            self.rows[alias] = self.tree.insert("", "end", text=alias, values=(command, *self.usage_values(alias)))
+            self.tree.detach(self.rows[alias])
+        self._last_query = None
+        
+    def unindex_alias(self, alias):
+        """Remove the row and search key of a deleted alias"""
+        iid = self.rows.pop(alias)
+        self.tree.delete(iid)
+        del self.search_index[alias]
+        self.sorted_aliases.remove(alias)
+        self.shown = [shown_iid for shown_iid in self.shown if shown_iid != iid]
+        self._last_query = None
+        
+    def usage_values(self, alias):
+        """Uses and last used columns of one alias (empty until the history scan finished)"""
+        if alias not in self.usage:
+            return ("", "")
+        count, last_used = self.usage[alias]
+        return (count, datetime.fromtimestamp(last_used).strftime("%Y-%m-%d") if last_used else "")
+        
+    def scan_usage(self):
+        """Count alias uses in the shell history on a background thread"""
+        aliases = dict(self.aliases)
+        
+        def scan():
+            try:
+                self._usage_results.put(alias_usage.scan_usage(aliases))
+            except Exception as e:
+                self._usage_results.put(e)
+        
+        threading.Thread(target=scan, daemon=True).start()
+        self.root.after(100, self.apply_usage)
+        
+    def apply_usage(self):
+        """Show the history scan results once they are ready (polled from the Tk thread)"""
+        try:
+            result = self._usage_results.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.apply_usage)
+            return
+        if isinstance(result, Exception):
+            self.status_var.set(f"Failed to read shell history: {result}")
+            return
+        self.usage.update(result)
+        for alias, iid in self.rows.items():
+            uses, last_used = self.usage_values(alias)
+            self.tree.set(iid, "uses", uses)
+            self.tree.set(iid, "last_used", last_used)
+        unused = sum(1 for alias in self.aliases if self.usage.get(alias, (0, None))[0] == 0)
+        self.status_var.set(f"Loaded {len(self.aliases)} aliases, {unused} never used in the shell history")
+        
     def update_tree(self, filter_text=""):
-        """Update the tree view with aliases"""
-        self.tree.delete(*self.tree.get_children())
+        """Show the aliases whose name or command contains filter_text"""
+        query = filter_text.lower()
+        if not query:
+            matches = self.sorted_aliases
+        else:
+            # Typing on only narrows the previous matches
+            if self._last_query is not None and self._last_query in query:
+                candidates = self._last_matches
+            else:
+                candidates = self.sorted_aliases
+            matches = [alias for alias in candidates if query in self.search_index[alias]]
+        self._last_query = query
+        self._last_matches = matches
         
-        for alias, command in sorted(self.aliases.items()):
-            if filter_text.lower() in alias.lower() or filter_text.lower() in command.lower():
-                self.tree.insert("", "end", text=alias, values=(command,))
+        # Attach the matching rows and detach the rest in one call
+        shown = [self.rows[alias] for alias in matches]
+        if shown != self.shown:
+            self.tree.set_children("", *shown)
+            self.shown = shown
                 
     def filter_aliases(self, *args):
-        """Filter aliases based on search text"""
+        """Filter aliases based on search text, once typing pauses"""
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(FILTER_DELAY_MS, self.apply_filter)
+        
+    def apply_filter(self):
+        self._filter_job = None
         self.update_tree(self.search_var.get())
         
     def on_select(self, event):
@@ -176,11 +281,18 @@ class AliasManager:
             messagebox.showwarning("Warning", "Alias name cannot be empty")
             return
             
+        if not alias_store.valid_name(alias):
+            messagebox.showwarning("Warning", f"Invalid alias name: {alias}")
+            return
+            
         if not command:
             messagebox.showwarning("Warning", "Command cannot be empty")
             return
             
+        if alias not in self.aliases:
+            self.sorted_aliases = sorted(self.sorted_aliases + [alias])
         self.aliases[alias] = command
+        self.index_alias(alias)
         self.update_tree(self.search_var.get())
         self.status_var.set(f"Added/Updated alias: {alias}")
         
@@ -195,6 +307,7 @@ class AliasManager:
         if alias in self.aliases:
             if messagebox.askyesno("Confirm", f"Delete alias '{alias}'?"):
                 del self.aliases[alias]
+                self.unindex_alias(alias)
                 self.update_tree(self.search_var.get())
                 self.clear_editor()
                 self.status_var.set(f"Deleted alias: {alias}")
@@ -207,27 +320,8 @@ class AliasManager:
     def save_aliases(self):
         """Save aliases back to .zprofile"""
         try:
-            # Read current .zprofile
-            with open(self.zprofile_path, 'r') as f:
-                lines = f.readlines()
-                
-            # Remove existing alias lines
-            alias_pattern = r'^\s*alias\s+[^=]+=.*'
-            non_alias_lines = [line for line in lines if not re.match(alias_pattern, line)]
-            
-            # Add aliases at the end
-            alias_lines = []
-            for alias, command in sorted(self.aliases.items()):
-                # Escape quotes in command
-                escaped_command = command.replace('"', '\\"')
-                alias_lines.append(f'alias {alias}="{escaped_command}"\n')
-                
-            # Combine content
-            new_content = non_alias_lines + ['\n'] + alias_lines
-            
-            # Write back
-            with open(self.zprofile_path, 'w') as f:
-                f.writelines(new_content)
+            # Non-alias lines are kept, the aliases are rewritten at the end
+            alias_store.save_aliases(self.aliases, self.zprofile_path)
                 
             self.status_var.set(f"Saved {len(self.aliases)} aliases to {self.zprofile_path}")
             messagebox.showinfo("Success", "Aliases saved successfully")
@@ -235,6 +329,39 @@ class AliasManager:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save aliases: {str(e)}")
             
+    def profile_startup(self):
+        """Measure the startup cost of .zprofile as it is and as saving would write it"""
+        aliases = dict(self.aliases)
+        results = queue.Queue()
+        
+        def run():
+            try:
+                report = alias_profile.profile_startup(self.zprofile_path, aliases=aliases)
+                results.put(alias_profile.format_report(report))
+            except Exception as e:
+                results.put(e)
+        
+        def show():
+            try:
+                result = results.get_nowait()
+            except queue.Empty:
+                self.root.after(100, show)
+                return
+            self.status_var.set("Ready")
+            if isinstance(result, Exception):
+                messagebox.showerror("Error", f"Failed to profile {self.zprofile_path}: {result}")
+                return
+            window = tk.Toplevel(self.root)
+            window.title("Startup profile")
+            text = scrolledtext.ScrolledText(window, width=100, height=30, font="TkFixedFont")
+            text.pack(fill=tk.BOTH, expand=True)
+            text.insert('1.0', result)
+            text.configure(state=tk.DISABLED)
+        
+        self.status_var.set(f"Profiling {self.zprofile_path}...")
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(100, show)
+        
     def backup_zprofile(self):
         """Create a backup of .zprofile"""
         try:
@@ -268,9 +395,9 @@ class AliasManager:
                     messagebox.showerror("Error", f"Failed to restore backup: {str(e)}")
 
 
-def main():
+def main(zprofile_path=alias_store.ZPROFILE_PATH):
     root = tk.Tk()
-    app = AliasManager(root)
+    app = AliasManager(root, zprofile_path)
     root.mainloop()
 
 
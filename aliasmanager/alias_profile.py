@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# @author madebycm (2025-01-23)
+
+"""
+Shell startup cost of ~/.zprofile
+Sources the profile in a fresh bash or zsh with xtrace and a PS4 that prints a timestamp,
+file and line before every command, so each line's cost is the time until the next one.
+Untraced runs measure the real startup time of the profile as it is, without its alias
+lines, and as the alias manager would save it. Needs bash 5+ or zsh (for $EPOCHREALTIME).
+"""
+
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import alias_store
+
+SHELLS = ['bash', 'zsh']
+RUNS = 5
+
+# Fields are separated by \x1f, which does not occur in paths or timestamps; shells repeat
+# the leading + once per nesting level
+PS4 = {
+    'bash': '+\x1f${EPOCHREALTIME}\x1f${BASH_SOURCE}\x1f${LINENO}\x1f',
+    'zsh': '+\x1f${EPOCHREALTIME}\x1f%x\x1f%I\x1f',
+}
+TRACE_LINE = re.compile(rb'^\++\x1f(\d+[.,]\d+)\x1f([^\x1f]*)\x1f(\d+)\x1f')
+
+# Source the profile given as $2 with xtrace written to $1 (PS4 comes from AM_PS4)
+TRACED = {
+    'bash': 'exec 3>"$1"; BASH_XTRACEFD=3; PS4=$AM_PS4; set -x; source "$2"; set +x',
+    'zsh': 'zmodload zsh/datetime; setopt prompt_subst; PS4=$AM_PS4; exec 2>"$1"; setopt xtrace; '
+           'source "$2"; unsetopt xtrace',
+}
+UNTRACED = 'source "$1"'
+NO_RC = {'bash': ['--noprofile', '--norc'], 'zsh': ['-f']}
+
+
+class ProfileError(Exception):
+    """The shell is missing or cannot produce timestamps"""
+
+
+def default_shell():
+    shell = os.path.basename(os.environ.get('SHELL', ''))
+    return shell if shell in SHELLS else 'bash'
+
+
+def _command(shell, script, *args):
+    return [shell, *NO_RC[shell], '-c', script, shell, *args]
+
+
+def time_source(shell, path):
+    """Wall time (seconds) of one shell sourcing path, untraced"""
+    started = time.perf_counter()
+    subprocess.run(_command(shell, UNTRACED, path), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def trace_source(shell, path, trace_path):
+    """
+    Source path with xtrace; returns [(file, line, seconds)] per executed line
+    The time of a line runs until the next line starts, so it includes the tracing
+    overhead and everything the line waited for. Commands of the -c wrapper are left out.
+    """
+    subprocess.run(_command(shell, TRACED[shell], trace_path, path), env=dict(os.environ, AM_PS4=PS4[shell]),
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    events = []
+    with open(trace_path, 'rb') as f:
+        for line in f:
+            match = TRACE_LINE.match(line)
+            if match:
+                timestamp = float(match.group(1).replace(b',', b'.'))
+                events.append((timestamp, match.group(2).decode('utf-8', 'replace'), int(match.group(3))))
+    if not events:
+        raise ProfileError(f"{shell} wrote no timestamps; bash 5+ or zsh is needed")
+    # The last event switches tracing off; several commands on one line (or one command
+    # traced in steps, like `export A=1`) count as one execution of the line
+    executed = []
+    for i, (timestamp, source, line) in enumerate(events[:-1]):
+        seconds = events[i + 1][0] - timestamp
+        if executed and executed[-1][:2] == (source, line):
+            executed[-1] = (source, line, executed[-1][2] + seconds)
+        else:
+            executed.append((source, line, seconds))
+    return [event for event in executed if event[0] not in ('', shell)]
+
+
+def profile_startup(path=alias_store.ZPROFILE_PATH, shell=None, runs=RUNS, aliases=None):
+    """
+    Profile sourcing path `runs` times
+    `aliases` are the aliases a save would write (default: those in the file). Returns a
+    report dict with median startup times and the lines sorted by traced cost.
+    """
+    shell = shell or default_shell()
+    if not shutil.which(shell):
+        raise ProfileError(f"{shell} not found")
+    path = os.path.realpath(path)
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    if aliases is None:
+        aliases = alias_store.parse_aliases(''.join(lines))
+    alias_lines = {number for number, line in enumerate(lines, 1) if alias_store.ALIAS_LINE_PATTERN.match(line)}
+
+    with tempfile.TemporaryDirectory(prefix='am-profile-') as workdir:
+        variants = {
+            'current': path,
+            'empty': os.devnull,
+            'without_aliases': os.path.join(workdir, 'without_aliases'),
+            'saved': os.path.join(workdir, 'saved'),
+        }
+        with open(variants['without_aliases'], 'w') as f:
+            f.writelines(line for number, line in enumerate(lines, 1) if number not in alias_lines)
+        with open(variants['saved'], 'w') as f:
+            f.write(alias_store.render_profile(lines, aliases))
+
+        # Interleaved, so drift in machine load affects every variant alike
+        timings = {name: [] for name in variants}
+        for _ in range(runs):
+            for name, variant in variants.items():
+                timings[name].append(time_source(shell, variant))
+
+        costs = {}
+        trace_path = os.path.join(workdir, 'trace')
+        for _ in range(runs):
+            for source, line, seconds in trace_source(shell, path, trace_path):
+                key = (source, line)
+                total, count = costs.get(key, (0.0, 0))
+                costs[key] = (total + seconds, count + 1)
+
+    def line_text(source, number):
+        if os.path.realpath(source) == path and 0 < number <= len(lines):
+            return lines[number - 1].strip()
+        return ""
+
+    slowest = sorted(costs.items(), key=lambda item: -item[1][0])
+    median = {name: statistics.median(values) for name, values in timings.items()}
+    alias_block = sum(total for (source, line), (total, _) in costs.items()
+                      if line in alias_lines and os.path.realpath(source) == path) / runs
+    return {
+        'profile': path,
+        'shell': shell,
+        'runs': runs,
+        'aliases': len(aliases),
+        'alias_lines': len(alias_lines),
+        'shell_seconds': median['empty'],
+        'startup_seconds': median['current'] - median['empty'],
+        'without_aliases_seconds': median['without_aliases'] - median['empty'],
+        'saved_seconds': median['saved'] - median['empty'],
+        'alias_block_traced_seconds': alias_block,
+        'lines': [{
+            'source': source,
+            'line': line,
+            'seconds': total / runs,
+            'executions': count // runs,
+            'text': line_text(source, line),
+        } for (source, line), (total, count) in slowest],
+    }
+
+
+def format_report(report, top=15):
+    """Human-readable summary of a profile_startup() report"""
+    ms = lambda seconds: f"{seconds * 1000:.1f} ms"
+    home = os.path.expanduser("~")
+    short = lambda path: "~" + path[len(home):] if path.startswith(home + os.sep) else path
+    alias_cost = report['startup_seconds'] - report['without_aliases_seconds']
+    change = report['saved_seconds'] - report['startup_seconds']
+    out = [
+        f"Profiled {short(report['profile'])} with {report['shell']}, median of {report['runs']} runs",
+        f"  Startup:            {ms(report['startup_seconds'])} (plus {ms(report['shell_seconds'])} for the shell itself)",
+        f"  Alias block:        {ms(alias_cost)} for {report['alias_lines']} alias lines "
+        f"({ms(report['alias_block_traced_seconds'])} traced)",
+        f"  After saving:       {ms(report['saved_seconds'])} ({change * 1000:+.1f} ms, {report['aliases']} aliases)",
+        "",
+        "Slowest lines (traced, including xtrace overhead):",
+    ]
+    for entry in report['lines'][:top]:
+        location = f"{short(entry['source'])}:{entry['line']}"
+        repeat = f" x{entry['executions']}" if entry['executions'] > 1 else ""
+        out.append(f"  {ms(entry['seconds']):>10}  {location}{repeat}  {entry['text'][:60]}")
+    return "\n".join(out)
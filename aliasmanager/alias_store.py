@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# @author madebycm (2025-01-23)
+
+"""
+Reading and writing the aliases in ~/.zprofile
+Shared by the GUI (alias_manager.py) and the headless CLI (alias_cli.py); imports
+nothing from tkinter.
+"""
+
+import os
+import re
+import tempfile
+
+ZPROFILE_PATH = os.path.expanduser("~/.zprofile")
+
+# Handles: alias name="command" (with \" inside) and alias name='command'
+ALIAS_PATTERN = re.compile(r'''^\s*alias\s+([^=]+)=(?:"((?:[^"\\]|\\.)+)"|'([^']+)')''')
+
+# Any alias line, as removed before the aliases are written back
+ALIAS_LINE_PATTERN = re.compile(r'^\s*alias\s+[^=]+=.*')
+
+# Names a shell accepts without quoting
+ALIAS_NAME_PATTERN = re.compile(r'''^[^\s=\'"`$;&|<>()\\]+$''')
+
+
+def parse_aliases(content):
+    """Aliases defined in profile text, as {name: command}; later definitions win"""
+    aliases = {}
+    for line in content.split('\n'):
+        match = ALIAS_PATTERN.match(line)
+        if match:
+            name = match.group(1).strip()
+            if match.group(2) is not None:
+                aliases[name] = match.group(2).replace('\\"', '"')
+            else:
+                aliases[name] = match.group(3)
+    return aliases
+
+
+def load_aliases(path=ZPROFILE_PATH):
+    """Aliases defined in the profile at path; raises OSError if it cannot be read"""
+    with open(path, 'r') as f:
+        return parse_aliases(f.read())
+
+
+def format_alias(name, command):
+    # Escape quotes in command
+    escaped_command = command.replace('"', '\\"')
+    return f'alias {name}="{escaped_command}"\n'
+
+
+def render_profile(lines, aliases):
+    """
+    Profile text with all alias lines replaced by `aliases`
+    Non-alias lines are kept in order; the aliases follow them, sorted, after one blank line
+    """
+    non_alias_lines = [line for line in lines if not ALIAS_LINE_PATTERN.match(line)]
+    while non_alias_lines and not non_alias_lines[-1].strip():
+        non_alias_lines.pop()
+    if non_alias_lines and not non_alias_lines[-1].endswith('\n'):
+        non_alias_lines[-1] += '\n'
+    alias_lines = [format_alias(name, command) for name, command in sorted(aliases.items())]
+    return ''.join(non_alias_lines + ['\n'] + alias_lines)
+
+
+def save_aliases(aliases, path=ZPROFILE_PATH):
+    """
+    Rewrite the profile with `aliases` in one atomic step
+    The new text goes to a temp file in the same directory, is flushed to disk and then
+    renamed over the profile, so a shell starting meanwhile sees the old or the new file.
+    """
+    try:
+        with open(path, 'r') as f:
+            lines = f.readlines()
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        lines = []
+        mode = 0o644
+
+    # A symlinked profile (e.g. from a dotfiles repo) is replaced at its target
+    target = os.path.realpath(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(render_profile(lines, aliases))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def valid_name(name):
+    return bool(ALIAS_NAME_PATTERN.match(name))
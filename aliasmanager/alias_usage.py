@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# @author madebycm (2025-01-23)
+
+"""
+Alias usage from shell history
+Streams ~/.zsh_history and ~/.bash_history in fixed-size chunks and counts commands whose
+first word is an alias. How far each file was read is checkpointed, so later runs only
+read what was appended since.
+"""
+
+import json
+import os
+import re
+import tempfile
+
+CACHE_DIR = os.path.expanduser("~/.cache/aliasmanager")
+CHECKPOINT_FILE = os.path.join(CACHE_DIR, "usage.json")
+CHECKPOINT_VERSION = 1
+
+CHUNK_SIZE = 1 << 20
+
+# The bytes just before a checkpoint offset are stored with it; if they differ on the next
+# run, the history was rewritten (trimmed or deduplicated) and is read again from the start
+ANCHOR_SIZE = 64
+
+# First word of a command line
+FIRST_WORD = re.compile(rb'\s*([^\s;|&()<>]+)')
+
+
+def history_files():
+    """Existing history files: $HISTFILE, ~/.zsh_history and ~/.bash_history"""
+    candidates = [os.environ.get('HISTFILE'), "~/.zsh_history", "~/.bash_history"]
+    paths = []
+    for candidate in candidates:
+        if not candidate:
+            continue
+        path = os.path.realpath(os.path.expanduser(candidate))
+        if path not in paths and os.path.isfile(path):
+            paths.append(path)
+    return paths
+
+
+def new_file_state():
+    return {'offset': 0, 'anchor': '', 'continued': False, 'pending_time': None, 'counts': {}}
+
+
+def scan_lines(lines, names, state):
+    """
+    Count the alias uses in complete history lines
+    Understands plain lines, zsh extended history (": <time>:<elapsed>;<command>"),
+    bash timestamps ("#<time>" before a command) and zsh's backslash-continued lines.
+    `names` maps encoded alias names to names; counts go to state['counts'] as
+    {name: [count, last used or None]}.
+    """
+    counts = state['counts']
+    continued = state['continued']
+    pending_time = state['pending_time']
+    for line in lines:
+        if continued:
+            continued = line.endswith(b'\\')
+            continue
+        continued = line.endswith(b'\\')
+
+        if line.startswith(b': '):
+            separator = line.find(b';')
+            if separator < 0:
+                continue
+            try:
+                timestamp = int(line[2:separator].split(b':', 1)[0])
+            except ValueError:
+                timestamp = None
+            command = line[separator + 1:]
+        elif line.startswith(b'#') and line[1:].isdigit():
+            pending_time = int(line[1:])
+            continue
+        else:
+            command = line
+            timestamp = pending_time
+            pending_time = None
+
+        match = FIRST_WORD.match(command)
+        if match is None:
+            continue
+        name = names.get(match.group(1))
+        if name is None:
+            continue
+        entry = counts.get(name)
+        if entry is None:
+            counts[name] = [1, timestamp]
+        else:
+            entry[0] += 1
+            if timestamp is not None and (entry[1] is None or timestamp > entry[1]):
+                entry[1] = timestamp
+
+    state['continued'] = continued
+    state['pending_time'] = pending_time
+
+
+def _anchor(f, offset):
+    start = max(0, offset - ANCHOR_SIZE)
+    f.seek(start)
+    return f.read(offset - start).hex()
+
+
+def scan_file(path, names, state):
+    """Read a history file from the checkpointed offset to its last complete line"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if state['offset'] > size or _anchor(f, state['offset']) != state['anchor']:
+            state = new_file_state()
+
+        offset = state['offset']
+        f.seek(offset)
+        pending = b''
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk = pending + chunk
+            end = chunk.rfind(b'\n')
+            if end < 0:
+                pending = chunk
+                continue
+            scan_lines(chunk[:end].split(b'\n'), names, state)
+            offset += end + 1
+            pending = chunk[end + 1:]
+
+        # A last line without newline is still being written; it is read next time
+        state['offset'] = offset
+        state['anchor'] = _anchor(f, offset)
+    return state
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != CHECKPOINT_VERSION:
+        return None
+    return data
+
+
+def save_checkpoint(path, data):
+    """Write the checkpoint atomically; failing only costs a full scan next time"""
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.usage.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def scan_usage(aliases, paths=None, checkpoint_path=CHECKPOINT_FILE, use_checkpoint=True):
+    """
+    How often each alias was used: {name: (count, last used as epoch seconds or None)}
+    Only history appended since the last run is read, unless aliases were added since;
+    their earlier uses are only found by reading everything again.
+    """
+    paths = history_files() if paths is None else [os.path.realpath(path) for path in paths]
+    checkpoint = load_checkpoint(checkpoint_path) if use_checkpoint else None
+    if checkpoint is None or not set(aliases) <= set(checkpoint['names']):
+        checkpoint = {'version': CHECKPOINT_VERSION, 'names': sorted(aliases), 'files': {}}
+    names = {name.encode('utf-8', 'surrogateescape'): name for name in checkpoint['names']}
+
+    files = {}
+    for path in paths:
+        state = checkpoint['files'].get(path) or new_file_state()
+        try:
+            files[path] = scan_file(path, names, state)
+        except OSError:
+            continue
+    # Files not read this time keep their checkpoints
+    checkpoint['files'].update(files)
+    if use_checkpoint:
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    usage = {name: (0, None) for name in aliases}
+    for state in files.values():
+        for name, (count, last_used) in state['counts'].items():
+            if name not in usage:
+                continue
+            total, last = usage[name]
+            if last_used is not None and (last is None or last_used > last):
+                last = last_used
+            usage[name] = (total + count, last)
+    return usage
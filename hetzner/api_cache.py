@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Response cache for the list calls of hetzner.sh
+`get` returns every page of a list endpoint as one JSON object ({"servers": [...]}, the
+shape hetzner.sh's jq filters expect). Answers younger than the endpoint's TTL come from
+~/.cache/hetzner/ without a request; older ones are revalidated with If-None-Match per
+page, and pages after the first are fetched concurrently. `lookup` resolves a server
+name from a small index written with the server list, without touching the network,
+for as long as the server list itself would be served from the cache.
+Creating or deleting servers calls `invalidate`.
+
+    api_cache.py get /servers servers
+    api_cache.py lookup NAME          # prints name|ip|status, exit 1 if not known
+    api_cache.py invalidate /servers
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Entries are kept per API URL and token, so two projects (or mock_api.py) never mix
+CACHE_ROOT = os.environ.get('HETZNER_CACHE_DIR') or os.path.expanduser("~/.cache/hetzner")
+CACHE_VERSION = 1
+
+# Seconds an answer is used without asking the API; the first matching prefix wins.
+# HETZNER_CACHE_MAX_AGE caps all of them (0 revalidates every time, as --refresh does).
+TTLS = [
+    ('/servers', 30),
+    ('/images', 3600),
+    ('/locations', 86400),
+]
+DEFAULT_TTL = 60
+MAX_AGE = os.environ.get('HETZNER_CACHE_MAX_AGE')
+
+PER_PAGE = 50
+
+
+def api_base():
+    return os.environ.get('HETZNER_API_BASE', "https://api.hetzner.cloud/v1")
+
+
+def cache_dir(token: str) -> str:
+    scope = hashlib.sha256(f"{api_base()}\n{token}".encode()).hexdigest()[:16]
+    return os.path.join(CACHE_ROOT, scope)
+
+
+def entry_path(directory: str, endpoint: str) -> str:
+    name = endpoint.strip('/').replace('/', '_').replace('?', '.').replace('&', '.')
+    return os.path.join(directory, f"{name}.json")
+
+
+def index_path(directory: str) -> str:
+    return os.path.join(directory, "servers.index")
+
+
+def ttl_for(endpoint: str) -> float:
+    ttl = next((seconds for prefix, seconds in TTLS if endpoint.startswith(prefix)), DEFAULT_TTL)
+    return min(ttl, float(MAX_AGE)) if MAX_AGE else ttl
+
+
+def read_json(path: str):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(path: str, text: str):
+    """Replace path in one step; failing only costs a request next time"""
+    try:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp.')
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+async def revalidate(api, endpoint: str, key: str, cached):
+    """
+    All pages of endpoint, reusing cached pages the API answers 304 for
+    Returns the new entry: {"version", "fetched_at", "pages": [{"etag", "payload"}]}
+    """
+    import asyncio
+    from hcloud import decode, last_page, page_url
+
+    old_pages = cached['pages'] if cached else []
+
+    async def fetch_page(page):
+        old = old_pages[page - 1] if page <= len(old_pages) else None
+        headers = {'If-None-Match': old['etag']} if old and old.get('etag') else {}
+        response = await api.fetch('GET', page_url(endpoint, page, PER_PAGE), headers=headers)
+        if response.status == 304 and old:
+            return old
+        return {'etag': response.headers.get('etag'), 'payload': decode(response)}
+
+    first = await fetch_page(1)
+    rest = await asyncio.gather(*(fetch_page(page) for page in range(2, last_page(first['payload']) + 1)))
+    return {'version': CACHE_VERSION, 'fetched_at': time.time(), 'key': key, 'pages': [first, *rest]}
+
+
+def combine(entry, key: str):
+    """The pages of an entry as one response object, like an unpaginated answer"""
+    items = [item for page in entry['pages'] for item in page['payload'].get(key, [])]
+    return {key: items, 'meta': {'pagination': {'page': 1, 'per_page': len(items), 'last_page': 1,
+                                                'total_entries': len(items)}}}
+
+
+def write_index(directory: str, servers):
+    """name -> [ip, status] for lookup, small enough to read in a millisecond"""
+    index = {server['name']: [((server.get('public_net') or {}).get('ipv4') or {}).get('ip'), server.get('status')]
+             for server in servers}
+    write_atomic(index_path(directory), json.dumps(index))
+
+
+def get(token: str, endpoint: str, key: str) -> dict:
+    """All items of a list endpoint, from the cache while it is fresh; raises ApiError"""
+    directory = cache_dir(token)
+    path = entry_path(directory, endpoint)
+    cached = read_json(path)
+    if cached and (cached.get('version') != CACHE_VERSION or cached.get('key') != key):
+        cached = None
+    if cached and time.time() - cached['fetched_at'] < ttl_for(endpoint):
+        return combine(cached, key)
+
+    # Only a miss pays for importing asyncio and the client
+    import asyncio
+    from hcloud import Client
+
+    async def refresh():
+        async with Client(token, base=api_base()) as api:
+            return await revalidate(api, endpoint, key, cached)
+
+    entry = asyncio.run(refresh())
+    write_atomic(path, json.dumps(entry))
+    result = combine(entry, key)
+    if endpoint == '/servers':
+        write_index(directory, result['servers'])
+    return result
+
+
+def lookup(token: str, name: str):
+    """
+    (ip, status) of a server from the index while the server list is fresh, else None
+    Login connects as root without host key checks, so an address is never trusted for
+    longer than the /servers TTL: a server deleted elsewhere may have given its address
+    to someone else's host.
+    """
+    path = index_path(cache_dir(token))
+    try:
+        if time.time() - os.path.getmtime(path) >= ttl_for('/servers'):
+            return None
+    except OSError:
+        return None
+    entry = (read_json(path) or {}).get(name)
+    return tuple(entry) if entry else None
+
+
+def invalidate(token: str, endpoint: str = '/servers'):
+    """Drop the cached answers of endpoint (all its query variants) and, for servers, the index"""
+    directory = cache_dir(token)
+    prefix = os.path.basename(entry_path(directory, endpoint))[:-len('.json')]
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name == f"{prefix}.json" or name.startswith(f"{prefix}.") or \
+                (endpoint.startswith('/servers') and name == os.path.basename(index_path(directory))):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def main():
+    token = os.environ.get('HETZNER_API_TOKEN')
+    if len(sys.argv) < 3 or sys.argv[1] not in ('get', 'lookup', 'invalidate') or not token:
+        print(__doc__.strip().split('\n\n')[-1], file=sys.stderr)
+        sys.exit(2)
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == 'lookup':
+        found = lookup(token, args[0])
+        if found is None:
+            sys.exit(1)
+        ip, status = found
+        print(f"{args[0]}|{ip or 'N/A'}|{status}")
+    elif command == 'invalidate':
+        for endpoint in args:
+            invalidate(token, endpoint)
+    else:
+        from hcloud import ApiError
+        endpoint, key = args[0], args[1] if len(args) > 1 else args[0].strip('/').split('?')[0]
+        try:
+            result = get(token, endpoint, key)
+        except ApiError as e:
+            # Shaped like an API error, so check_api_error in hetzner.sh reports it
+            print(json.dumps({'error': {'code': e.code, 'message': e.message}}))
+            sys.exit(1)
+        except OSError as e:
+            print(json.dumps({'error': {'code': 'connection_error', 'message': str(e)}}))
+            sys.exit(1)
+        json.dump(result, sys.stdout)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Fleet provisioning for hetzner.sh (`hetzner.sh fleet create --count N`)
+Does what --auto does for one server - create it with defaults.txt, wait for SSH, run
+auto-postinstall-commands.txt - for many servers at once: all create requests go
+through one pooled API client, every server is probed for SSH concurrently with
+backoff, and the post-install script is pushed to up to --parallel hosts at a time as
+soon as each one answers.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import shlex
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import api_cache
+from hcloud import ApiError, Client
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULTS_FILE = os.path.join(SCRIPT_DIR, "defaults.txt")
+POSTINSTALL_FILE = os.path.join(SCRIPT_DIR, "auto-postinstall-commands.txt")
+# Post-install output of each server goes to servers/<name>.txt
+SERVERS_DIR = os.path.join(SCRIPT_DIR, "servers")
+
+# Same fallbacks as load_defaults in hetzner.sh
+FALLBACK_DEFAULTS = {
+    'SERVER_TYPE': 'cx22',
+    'IMAGE': 'ubuntu-24.04',
+    'LOCATION': 'hel1',
+    'SSH_KEY': 'majn0923@cm',
+    'START_AFTER_CREATE': 'true',
+    'DEFAULT_NAME_PREFIX': 'server',
+}
+CLOUDPANEL_VARIABLES = ['CLOUDPANEL_ADMIN_USERNAME', 'CLOUDPANEL_ADMIN_PASSWORD', 'CLOUDPANEL_ADMIN_EMAIL',
+                        'CLOUDPANEL_ADMIN_FIRSTNAME', 'CLOUDPANEL_ADMIN_LASTNAME', 'CLOUDPANEL_ADMIN_TIMEZONE']
+
+# HETZNER_SSH replaces the ssh command (e.g. with mock_ssh.py); HETZNER_SSH_PORT the port
+SSH_COMMAND = shlex.split(os.environ.get('HETZNER_SSH', 'ssh'))
+SSH_PORT = int(os.environ.get('HETZNER_SSH_PORT', 22))
+SSH_OPTIONS = ['-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null', '-o', 'LogLevel=ERROR',
+               '-o', 'BatchMode=yes', '-o', 'ConnectTimeout=5']
+
+# Waiting for SSH: 5 minutes per server like --auto, polled every 2 s at first and
+# backing off to 15 s, with jitter so the probes of many servers spread out
+SSH_TIMEOUT = 300
+PROBE_DELAY = 2.0
+PROBE_MAX_DELAY = 15.0
+PARALLEL = 10
+
+RED = '\033[0;31m'
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+BLUE = '\033[0;34m'
+NC = '\033[0m'
+
+
+class FleetError(Exception):
+    """Nothing was created: bad options, defaults or post-install commands"""
+
+
+def color(code: str, text: str) -> str:
+    return f"{code}{text}{NC}" if sys.stdout.isatty() else text
+
+
+def load_defaults(path: str = DEFAULTS_FILE) -> Dict[str, str]:
+    """KEY=value lines of defaults.txt, read like load_defaults in hetzner.sh"""
+    if not os.path.isfile(path):
+        print(color(YELLOW, "Warning: defaults.txt not found, using hardcoded defaults"))
+        return dict(FALLBACK_DEFAULTS)
+    defaults = {}
+    with open(path, 'r') as f:
+        for line in f:
+            key, _, value = line.rstrip('\n').partition('=')
+            if not key or key.startswith('#'):
+                continue
+            defaults[key] = value
+    return defaults
+
+
+def build_postinstall_script(path: str, defaults: Dict[str, str]) -> Optional[str]:
+    """
+    The script --auto uploads: CloudPanel variables, then each command of the file
+    between progress echoes. None if there is no file; raises FleetError if bash
+    cannot parse the result.
+    """
+    if not os.path.isfile(path):
+        return None
+    lines = ["#!/bin/bash"]
+    lines += [f"export {name}={shlex.quote(defaults.get(name, ''))}" for name in CLOUDPANEL_VARIABLES]
+    lines.append("")
+    with open(path, 'r') as f:
+        for command in f:
+            command = command.rstrip('\n')
+            if not command.strip() or command.lstrip().startswith('#'):
+                continue
+            lines += [f"echo {shlex.quote('Executing: ' + command)}", command, "echo 'Command completed'", ""]
+    script = "\n".join(lines) + "\n"
+    check = subprocess.run(['bash', '-n'], input=script, capture_output=True, text=True)
+    if check.returncode != 0:
+        raise FleetError(f"Post-install commands do not parse:\n{check.stderr.strip()}")
+    return script
+
+
+class Host:
+    """One server of the fleet and how far it got"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.id: Optional[int] = None
+        self.ip: Optional[str] = None
+        self.state = 'pending'
+        self.error = ''
+        self.created_at = 0.0
+        self.ready_after: Optional[float] = None
+        self.finished_after: Optional[float] = None
+
+    def fail(self, state: str, message: str):
+        self.state = state
+        self.error = message
+        print(color(RED, f"✗ {self.name}: {message}"))
+
+
+def ssh_args(ip: str, *command: str) -> List[str]:
+    port = ['-p', str(SSH_PORT)] if SSH_PORT != 22 else []
+    return [*SSH_COMMAND, *SSH_OPTIONS, *port, f"root@{ip}", *command]
+
+
+async def banner(ip: str) -> bool:
+    """Whether sshd answers on the address (one TCP connect, no ssh process)"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, SSH_PORT), 5)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        return (await asyncio.wait_for(reader.read(64), 5)).startswith(b'SSH-')
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+
+
+async def ssh_login(ip: str) -> bool:
+    """Whether root can log in with the key (cloud-init may not have installed it yet)"""
+    process = await asyncio.create_subprocess_exec(*ssh_args(ip, 'true'), stdin=subprocess.DEVNULL,
+                                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return await process.wait() == 0
+
+
+async def create(api: Client, host: Host, config: Dict[str, str]):
+    payload = {
+        'name': host.name,
+        'server_type': config['SERVER_TYPE'],
+        'image': config['IMAGE'],
+        'location': config['LOCATION'],
+        'start_after_create': config.get('START_AFTER_CREATE', 'true') == 'true',
+        'ssh_keys': [config['SSH_KEY']] if config.get('SSH_KEY') else [],
+    }
+    try:
+        response = await api.post('/servers', payload)
+    except (ApiError, OSError, asyncio.TimeoutError) as e:
+        host.fail('create failed', str(e))
+        return
+    server = response['server']
+    host.id = server['id']
+    host.ip = ((server.get('public_net') or {}).get('ipv4') or {}).get('ip')
+    host.created_at = time.monotonic()
+    host.state = 'created'
+    print(f"  created {host.name} (ID {host.id}, {host.ip or 'IP pending'})")
+
+
+async def wait_for_ssh(api: Client, host: Host, timeout: float) -> bool:
+    deadline = host.created_at + timeout
+    delay = PROBE_DELAY
+    while True:
+        if host.ip is None:
+            try:
+                server = (await api.get(f"/servers/{host.id}"))['server']
+                host.ip = ((server.get('public_net') or {}).get('ipv4') or {}).get('ip')
+            except (ApiError, OSError, asyncio.TimeoutError):
+                pass
+        # The cheap TCP probe runs until sshd answers; only then is an ssh process spent
+        if host.ip and await banner(host.ip) and await ssh_login(host.ip):
+            host.ready_after = time.monotonic() - host.created_at
+            host.state = 'ready'
+            print(color(GREEN, f"✓ {host.name} ({host.ip}) answers SSH after {host.ready_after:.0f}s"))
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            host.fail('no ssh', f"no SSH connection after {timeout / 60:.0f} minutes; "
+                                f"you can manually SSH later: ssh root@{host.ip}")
+            return False
+        await asyncio.sleep(min(remaining, delay * random.uniform(0.8, 1.2)))
+        delay = min(delay * 1.5, PROBE_MAX_DELAY)
+
+
+async def postinstall(host: Host, script: str, slots: asyncio.Semaphore):
+    """Upload and run the script in one ssh session, with its output in servers/<name>.txt"""
+    log_path = os.path.join(SERVERS_DIR, f"{host.name}.txt")
+    remote = "cat > /tmp/postinstall.sh && chmod +x /tmp/postinstall.sh && /tmp/postinstall.sh"
+    async with slots:
+        host.state = 'installing'
+        print(f"  running post-install commands on {host.name}")
+        with open(log_path, 'wb') as log:
+            log.write(f"# {host.name} (ID {host.id}, {host.ip})\n".encode())
+            log.flush()
+            process = await asyncio.create_subprocess_exec(*ssh_args(host.ip, remote), stdin=subprocess.PIPE,
+                                                           stdout=log, stderr=subprocess.STDOUT)
+            await process.communicate(script.encode())
+    if process.returncode != 0:
+        host.fail('post-install failed', f"post-install exited with {process.returncode}, see {log_path}")
+        return
+    host.state = 'done'
+    print(color(GREEN, f"✓ {host.name} post-install complete"))
+
+
+async def provision(api: Client, host: Host, config, script, slots, timeout):
+    await create(api, host, config)
+    if host.id is None:
+        return
+    if await wait_for_ssh(api, host, timeout) and script is not None:
+        await postinstall(host, script, slots)
+    elif host.state == 'ready':
+        host.state = 'done'
+    if host.state == 'done':
+        host.finished_after = time.monotonic() - host.created_at
+
+
+async def next_names(api: Client, prefix: str, count: int) -> List[str]:
+    """prefix-N names numbered on from the highest one already in the project"""
+    pattern = re.compile(rf'^{re.escape(prefix)}-(\d+)$')
+    servers = await api.get_all('/servers', 'servers')
+    taken = [int(match.group(1)) for match in (pattern.match(server['name']) for server in servers) if match]
+    start = max(taken, default=0) + 1
+    return [f"{prefix}-{number}" for number in range(start, start + count)]
+
+
+async def create_fleet(token: str, count: int, config: Dict[str, str], script: Optional[str],
+                       prefix: str, parallel: int, timeout: float, assume_yes: bool) -> List[Host]:
+    async with Client(token) as api:
+        names = await next_names(api, prefix, count)
+        print(color(YELLOW, f"Creating {count} server(s) with configuration:"))
+        print(f"Names: {names[0]} .. {names[-1]}" if count > 1 else f"Name: {names[0]}")
+        print(f"Type: {config['SERVER_TYPE']}")
+        print(f"Image: {config['IMAGE']}")
+        print(f"Location: {config['LOCATION']}")
+        print(f"SSH Key: {config.get('SSH_KEY', '')}")
+        print(f"Post-install: {'up to %d hosts at a time' % parallel if script else 'none'}")
+        print()
+        if not assume_yes:
+            answer = input(f"Create {count} server(s)? (y/N): ")
+            if answer not in ('y', 'Y'):
+                print(color(YELLOW, "Fleet creation cancelled"))
+                return []
+
+        os.makedirs(SERVERS_DIR, exist_ok=True)
+        hosts = [Host(name) for name in names]
+        slots = asyncio.Semaphore(parallel)
+        print(color(BLUE, "Creating servers..."))
+        try:
+            await asyncio.gather(*(provision(api, host, config, script, slots, timeout) for host in hosts))
+        finally:
+            api_cache.invalidate(token)
+        return hosts
+
+
+def print_summary(hosts: List[Host], elapsed: float):
+    print()
+    print(f"{'NAME':<20} {'ID':<10} {'IP':<16} {'SSH AFTER':<10} {'DONE AFTER':<11} STATUS")
+    for host in hosts:
+        ready = f"{host.ready_after:.0f}s" if host.ready_after is not None else "-"
+        finished = f"{host.finished_after:.0f}s" if host.finished_after is not None else "-"
+        print(f"{host.name:<20} {host.id or '-':<10} {host.ip or '-':<16} {ready:<10} {finished:<11} {host.state}")
+    done = sum(1 for host in hosts if host.state == 'done')
+    summary = f"{done}/{len(hosts)} server(s) ready in {elapsed:.0f}s"
+    print()
+    print(color(GREEN if done == len(hosts) else RED, summary))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='hetzner.sh fleet', description="Create and set up many servers at once")
+    commands = parser.add_subparsers(dest='command', required=True)
+    create_parser = commands.add_parser('create', help="create N servers with the defaults of --auto")
+    create_parser.add_argument('--count', type=int, required=True, help="number of servers")
+    create_parser.add_argument('--prefix', help="name prefix; servers are named PREFIX-1, PREFIX-2, ... "
+                                                "(default: DEFAULT_NAME_PREFIX from defaults.txt)")
+    create_parser.add_argument('--type', help="server type (default: from defaults.txt)")
+    create_parser.add_argument('--image', help="image (default: from defaults.txt)")
+    create_parser.add_argument('--location', help="location (default: from defaults.txt)")
+    create_parser.add_argument('--parallel', type=int, default=PARALLEL,
+                               help="hosts running post-install commands at once (default: %(default)s)")
+    create_parser.add_argument('--ssh-timeout', type=float, default=SSH_TIMEOUT,
+                               help="seconds to wait for SSH per server (default: %(default)s)")
+    create_parser.add_argument('--no-postinstall', action='store_true', help="skip auto-postinstall-commands.txt")
+    create_parser.add_argument('--yes', '-y', action='store_true', help="do not ask for confirmation")
+    args = parser.parse_args()
+
+    token = os.environ.get('HETZNER_API_TOKEN')
+    if not token:
+        print(color(RED, "Error: HETZNER_API_TOKEN environment variable is not set"))
+        sys.exit(1)
+    if args.count < 1 or args.parallel < 1:
+        print(color(RED, "Error: --count and --parallel must be at least 1"))
+        sys.exit(1)
+
+    defaults = load_defaults()
+    config = dict(defaults)
+    config['SERVER_TYPE'] = args.type or defaults.get('SERVER_TYPE', 'cx22')
+    config['IMAGE'] = args.image or defaults.get('IMAGE', 'ubuntu-24.04')
+    config['LOCATION'] = args.location or defaults.get('LOCATION', 'hel1')
+    prefix = args.prefix or defaults.get('DEFAULT_NAME_PREFIX') or 'server'
+    try:
+        script = None if args.no_postinstall else build_postinstall_script(POSTINSTALL_FILE, defaults)
+    except FleetError as e:
+        print(color(RED, str(e)))
+        sys.exit(1)
+
+    started = time.monotonic()
+    try:
+        hosts = asyncio.run(create_fleet(token, args.count, config, script, prefix, args.parallel,
+                                         args.ssh_timeout, args.yes))
+    except (ApiError, OSError) as e:
+        print(color(RED, f"API Error: {e}"))
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(color(YELLOW, "\nInterrupted; servers created so far are left running"))
+        sys.exit(130)
+    if not hosts:
+        return
+    print_summary(hosts, time.monotonic() - started)
+    sys.exit(0 if all(host.state == 'done' for host in hosts) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Hetzner Cloud API client for asyncio
+One Client keeps a small pool of keep-alive HTTP/1.1 connections to the API host, so
+many concurrent requests share a few TLS handshakes instead of paying one per curl call
+as make_api_request in hetzner.sh does. Standard library only.
+"""
+
+import asyncio
+import json
+import os
+import random
+import ssl
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# HETZNER_API_BASE points the client (and hetzner.sh) at another server, e.g. mock_api.py
+API_BASE = os.environ.get('HETZNER_API_BASE', "https://api.hetzner.cloud/v1")
+POOL_SIZE = 8
+REQUEST_TIMEOUT = 30
+
+# Rate limited (429) and unavailable (502-504) responses are retried with backoff.
+# A gateway's 502 or 504 may come after the API already acted on the request, so POST,
+# which is not idempotent (a repeated POST /servers fails with uniqueness_error and leaves
+# the first server running untracked), is only retried when the API refused it outright.
+RETRY_STATUSES = {429, 502, 503, 504}
+POST_RETRY_STATUSES = {429, 503}
+MAX_RETRIES = 4
+
+
+class ApiError(Exception):
+    """The API answered with an error object or an unexpected status"""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(f"{code}: {message} (HTTP {status})")
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class Response:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body.strip() else {}
+
+
+def decode(response: Response):
+    """The JSON body of a response; raises ApiError for an error object or a status >= 400"""
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = {}
+    error = payload.get('error') if isinstance(payload, dict) else None
+    if error or response.status >= 400:
+        error = error or {}
+        raise ApiError(response.status, error.get('code', 'http_error'),
+                       error.get('message', response.body[:200].decode('utf-8', 'replace')))
+    return payload
+
+
+def page_url(endpoint: str, page: int, per_page: int) -> str:
+    separator = '&' if '?' in endpoint else '?'
+    return f"{endpoint}{separator}page={page}&per_page={per_page}"
+
+
+def last_page(payload) -> int:
+    return ((payload.get('meta') or {}).get('pagination') or {}).get('last_page') or 1
+
+
+class Client:
+    """
+    Pooled API client; use as `async with Client(token) as api:`
+    At most pool_size requests are in flight; the rest wait for a free connection.
+    """
+
+    def __init__(self, token: str, base: str = API_BASE, pool_size: int = POOL_SIZE,
+                 timeout: float = REQUEST_TIMEOUT):
+        url = urlsplit(base)
+        self.token = token
+        self.host = url.hostname
+        self.tls = url.scheme == 'https'
+        self.port = url.port or (443 if self.tls else 80)
+        self.path = url.path.rstrip('/')
+        self.timeout = timeout
+        self.slots = asyncio.Semaphore(pool_size)
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.ssl_context = ssl.create_default_context() if self.tls else None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for _, writer in idle:
+            writer.close()
+
+    async def _connect(self):
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl_context)
+
+    def _encode(self, method: str, endpoint: str, body: Optional[bytes], headers: Dict[str, str]) -> bytes:
+        lines = [f"{method} {self.path}{endpoint} HTTP/1.1",
+                 f"Host: {self.host}",
+                 f"Authorization: Bearer {self.token}",
+                 "Accept: application/json",
+                 f"Content-Length: {len(body or b'')}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b'')
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader, method: str) -> Tuple[Response, bool]:
+        """Read one response; returns it and whether the connection can be reused"""
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the server")
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+        status = int(status)
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # Trailers, up to the blank line
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return Response(status, headers, body), keep_alive
+
+    async def send(self, method: str, endpoint: str, data=None, headers: Optional[Dict[str, str]] = None) -> Response:
+        """One request on a pooled connection; returns the raw Response whatever its status"""
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+        request = self._encode(method, endpoint, body, headers or {})
+        async with self.slots:
+            # An idle connection may have been closed by the server meanwhile; nothing
+            # was processed then, so the request is repeated once on a new connection
+            for attempt in range(2):
+                reused = bool(self.idle) and attempt == 0
+                reader, writer = self.idle.pop() if reused else await asyncio.wait_for(self._connect(), self.timeout)
+                try:
+                    writer.write(request)
+                    await writer.drain()
+                    response, keep_alive = await asyncio.wait_for(self._read_response(reader, method), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused:
+                        continue
+                    raise ConnectionError(f"{method} {endpoint}: {e}") from e
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self.idle.append((reader, writer))
+                else:
+                    writer.close()
+                return response
+
+    async def fetch(self, method: str, endpoint: str, data=None, headers: Optional[Dict[str, str]] = None) -> Response:
+        """send(), retrying rate limited and unavailable responses with backoff"""
+        retry_statuses = POST_RETRY_STATUSES if method == 'POST' else RETRY_STATUSES
+        for attempt in range(MAX_RETRIES + 1):
+            response = await self.send(method, endpoint, data, headers)
+            if response.status not in retry_statuses or attempt == MAX_RETRIES:
+                return response
+            delay = min(2 ** attempt, 30) * (0.5 + random.random())
+            if response.status == 429 and response.headers.get('retry-after', '').isdigit():
+                delay = int(response.headers['retry-after'])
+            await asyncio.sleep(delay)
+
+    async def request(self, method: str, endpoint: str, data=None):
+        """
+        Request an endpoint and return the decoded JSON body
+        Raises ApiError for an error object in the body or a status >= 400, after
+        retrying rate limited and unavailable responses.
+        """
+        return decode(await self.fetch(method, endpoint, data))
+
+    async def get_all(self, endpoint: str, key: str, per_page: int = 50) -> list:
+        """
+        Every item of a paginated list endpoint (e.g. '/servers', 'servers')
+        The first page gives the page count; the remaining pages are requested concurrently.
+        """
+        first = await self.get(page_url(endpoint, 1, per_page))
+        rest = await asyncio.gather(*(self.get(page_url(endpoint, page, per_page))
+                                      for page in range(2, last_page(first) + 1)))
+        return [item for payload in (first, *rest) for item in payload.get(key, [])]
+
+    async def get(self, endpoint: str):
+        return await self.request('GET', endpoint)
+
+    async def post(self, endpoint: str, data):
+        return await self.request('POST', endpoint, data)
+
+    async def delete(self, endpoint: str):
+        return await self.request('DELETE', endpoint)
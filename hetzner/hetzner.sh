@@ -99,10 +99,15 @@ show_usage() {
     echo "  $0 --interactive      # Interactive menu mode"
     echo "  $0 --login [NAME]     # SSH to server (list if no name provided)"
     echo "  $0 --delete [NAME]    # Delete server (interactive if no name)"
+    echo "  $0 --refresh ...      # Revalidate cached server/location/image lists first"
+    echo "  $0 fleet create --count N [--prefix NAME] [--parallel K] [--yes]"
+    echo "                        # Create N servers at once and run post-install on each"
     echo "  $0 --help            # Show this help"
     echo ""
     echo "Environment variables:"
     echo "  HETZNER_API_TOKEN     # Required: Your Hetzner Cloud API token"
+    echo "  HETZNER_API_BASE      # Optional: API URL (e.g. mock_api.py for offline testing)"
+    echo "  HETZNER_CACHE=off     # Optional: do not cache list responses in ~/.cache/hetzner"
     echo ""
     echo "Auto mode uses defaults from defaults.txt:"
     echo "  Server Type: $DEFAULT_SERVER_TYPE"
@@ -119,6 +124,15 @@ DELETE_MODE=false
 LIST_MODE=false
 SERVER_NAME=""
 
+# Fleet mode is handled by fleet.py
+if [ "$1" = "fleet" ]; then
+    if ! command -v python3 &> /dev/null; then
+        echo -e "${RED}Error: fleet mode requires python3${NC}"
+        exit 1
+    fi
+    exec python3 "$(dirname "$0")/fleet.py" "${@:2}"
+fi
+
 # If no arguments, default to login mode
 if [ $# -eq 0 ]; then
     LOGIN_MODE=true
@@ -164,6 +178,10 @@ while [[ $# -gt 0 ]]; do
             LOGIN_MODE=false
             shift
             ;;
+        --refresh)
+            export HETZNER_CACHE_MAX_AGE=0
+            shift
+            ;;
         --help|-h)
             load_defaults
             show_usage
@@ -196,7 +214,7 @@ fi
 
 
 # API base URL
-API_BASE="https://api.hetzner.cloud/v1"
+API_BASE="${HETZNER_API_BASE:-https://api.hetzner.cloud/v1}"
 
 # Function to make API requests
 make_api_request() {
@@ -213,6 +231,52 @@ make_api_request() {
     fi
 }
 
+# Response cache for list calls (api_cache.py, needs python3); HETZNER_CACHE=off disables it
+CACHE_AVAILABLE=false
+if [ -f "$(dirname "$0")/api_cache.py" ] && command -v python3 &> /dev/null; then
+    CACHE_AVAILABLE=true
+fi
+CACHE_ENABLED=$CACHE_AVAILABLE
+if [ "${HETZNER_CACHE:-on}" = "off" ]; then
+    CACHE_ENABLED=false
+fi
+
+# Function to fetch every page of a list endpoint as one response ({"<key>": [...]})
+api_list() {
+    local endpoint="$1"
+    local key="$2"
+    
+    if [ "$CACHE_ENABLED" = true ]; then
+        python3 "$(dirname "$0")/api_cache.py" get "$endpoint" "$key"
+        return
+    fi
+    
+    # Without the cache: page by page
+    local separator="?"
+    [[ "$endpoint" == *\?* ]] && separator="&"
+    local page=1
+    local last_page=1
+    local pages=()
+    while [ $page -le $last_page ]; do
+        local response=$(make_api_request "GET" "$endpoint${separator}page=$page&per_page=50")
+        if [ -n "$(echo "$response" | jq -r '.error // empty' 2>/dev/null)" ] || ! echo "$response" | jq -e . >/dev/null 2>&1; then
+            echo "$response"
+            return 1
+        fi
+        pages+=("$response")
+        last_page=$(echo "$response" | jq -r '.meta.pagination.last_page // 1')
+        page=$((page + 1))
+    done
+    printf '%s\n' "${pages[@]}" | jq -s --arg key "$key" '{($key): (map(.[$key]) | add)}'
+}
+
+# Function to drop cached server lists after a server was created or deleted
+invalidate_cache() {
+    if [ "$CACHE_AVAILABLE" = true ]; then
+        python3 "$(dirname "$0")/api_cache.py" invalidate "/servers"
+    fi
+}
+
 # Function to check API response for errors
 check_api_error() {
     local response="$1"
@@ -228,9 +292,20 @@ check_api_error() {
 
 # Function to handle login using API
 handle_login() {
+    # A server in the cached index is connected to without asking the API, as long as
+    # the server list is fresh (the /servers TTL); after that the list is fetched again
+    if [ -n "$SERVER_NAME" ] && [ "$CACHE_ENABLED" = true ]; then
+        local cached_ip=$(python3 "$(dirname "$0")/api_cache.py" lookup "$SERVER_NAME" | cut -d'|' -f2)
+        if [ -n "$cached_ip" ] && [ "$cached_ip" != "N/A" ]; then
+            echo -e "${BLUE}Connecting to $SERVER_NAME ($cached_ip)...${NC}"
+            ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null root@$cached_ip
+            return
+        fi
+    fi
+    
     echo -e "${BLUE}Fetching servers from Hetzner Cloud API...${NC}"
     
-    local response=$(make_api_request "GET" "/servers")
+    local response=$(api_list "/servers" "servers")
     if ! check_api_error "$response"; then
         echo -e "${RED}Failed to fetch servers from API${NC}"
         exit 1
@@ -317,7 +392,7 @@ list_servers() {
     echo -e "${BLUE}Fetching Hetzner Cloud servers...${NC}"
     echo ""
     
-    local response=$(make_api_request "GET" "/servers")
+    local response=$(api_list "/servers" "servers")
     
     if ! check_api_error "$response"; then
         return 1
@@ -346,7 +421,7 @@ list_servers() {
 
 # Function to get available locations
 get_locations() {
-    local response=$(make_api_request "GET" "/locations")
+    local response=$(api_list "/locations" "locations")
     if check_api_error "$response"; then
         echo "$response" | jq -r '.locations[] | "\(.name)\t\(.description)"'
     fi
@@ -354,7 +429,7 @@ get_locations() {
 
 # Function to get available images
 get_images() {
-    local response=$(make_api_request "GET" "/images?type=system")
+    local response=$(api_list "/images?type=system" "images")
     if check_api_error "$response"; then
         echo "$response" | jq -r '.images[] | select(.status == "available") | "\(.name)\t\(.description)"' | head -10
     fi
@@ -407,6 +482,7 @@ auto_create_cx22() {
     
     echo -e "${BLUE}Creating server...${NC}"
     local response=$(make_api_request "POST" "/servers" "$json_data")
+    invalidate_cache
     
     if check_api_error "$response"; then
         local server_id=$(echo "$response" | jq -r '.server.id')
@@ -490,6 +566,7 @@ create_cx22_server() {
     
     echo -e "${BLUE}Creating server...${NC}"
     local response=$(make_api_request "POST" "/servers" "$json_data")
+    invalidate_cache
     
     if check_api_error "$response"; then
         local server_id=$(echo "$response" | jq -r '.server.id')
@@ -511,7 +588,7 @@ delete_server() {
     echo ""
     
     # First list servers to show available options
-    local response=$(make_api_request "GET" "/servers")
+    local response=$(api_list "/servers" "servers")
     
     if ! check_api_error "$response"; then
         return 1
@@ -569,10 +646,13 @@ delete_server() {
     fi
     
     echo -e "${BLUE}Deleting server...${NC}"
-    local delete_response=$(make_api_request "DELETE" "/servers/$server_id")
+    local delete_response
+    delete_response=$(make_api_request "DELETE" "/servers/$server_id")
+    local delete_status=$?
     
     # For DELETE requests, success usually returns empty response or action object
-    if [ $? -eq 0 ]; then
+    if [ $delete_status -eq 0 ] && check_api_error "$delete_response"; then
+        invalidate_cache
         echo -e "${GREEN}Server $server_name (ID: $server_id) deleted successfully!${NC}"
         echo -e "${YELLOW}Note: It may take a few moments for the server to be completely removed${NC}"
     else
@@ -670,6 +750,7 @@ if [ "$AUTO_MODE" = true ]; then
     
     echo -e "${BLUE}Creating server...${NC}"
     response=$(make_api_request "POST" "/servers" "$json_data")
+    invalidate_cache
     
     if check_api_error "$response"; then
         server_id=$(echo "$response" | jq -r '.server.id')
@@ -761,7 +842,7 @@ if [ "$DELETE_MODE" = true ]; then
     if [ -n "$SERVER_NAME" ]; then
         # Direct delete by name
         echo -e "${BLUE}Looking up server: $SERVER_NAME${NC}"
-        response=$(make_api_request "GET" "/servers")
+        response=$(api_list "/servers" "servers")
         
         if ! check_api_error "$response"; then
             echo -e "${RED}Failed to fetch servers${NC}"
@@ -782,10 +863,18 @@ if [ "$DELETE_MODE" = true ]; then
         if [ "$confirm" = "DELETE" ]; then
             echo -e "${BLUE}Deleting server...${NC}"
             delete_response=$(make_api_request "DELETE" "/servers/$server_id")
-            if [ $? -eq 0 ]; then
+            delete_status=$?
+            
+            # curl -s exits 0 on 404/409 too, so the response decides
+            if [ $delete_status -eq 0 ] && check_api_error "$delete_response"; then
+                invalidate_cache
                 echo -e "${GREEN}Server '$SERVER_NAME' deleted successfully!${NC}"
             else
                 echo -e "${RED}Failed to delete server${NC}"
+                if [ -n "$delete_response" ]; then
+                    echo "Response: $delete_response"
+                fi
+                exit 1
             fi
         else
             echo -e "${YELLOW}Delete cancelled${NC}"
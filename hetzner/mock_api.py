@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Local stand-in for the Hetzner Cloud API, for testing hetzner.sh and fleet.py offline
+Serves the endpoints those scripts use (servers, locations, images) from memory with
+keep-alive HTTP/1.1, the API's pagination and ETags. Created servers get loopback addresses
+(127.0.1.x) and become reachable through mock_ssh.py after --boot-delay seconds.
+
+    python3 mock_api.py --port 8080 --ssh-state /tmp/hetzner-mock.json &
+    HETZNER_API_BASE=http://127.0.0.1:8080/v1 HETZNER_API_TOKEN=test ./hetzner.sh --list
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 50
+
+LOCATIONS = [
+    {'id': 1, 'name': 'fsn1', 'description': 'Falkenstein DC Park 1', 'country': 'DE', 'city': 'Falkenstein'},
+    {'id': 2, 'name': 'nbg1', 'description': 'Nuremberg DC Park 1', 'country': 'DE', 'city': 'Nuremberg'},
+    {'id': 3, 'name': 'hel1', 'description': 'Helsinki DC Park 1', 'country': 'FI', 'city': 'Helsinki'},
+    {'id': 4, 'name': 'ash', 'description': 'Ashburn, VA', 'country': 'US', 'city': 'Ashburn, VA'},
+]
+IMAGES = [
+    {'id': 1, 'name': 'ubuntu-22.04', 'description': 'Ubuntu 22.04', 'type': 'system', 'status': 'available'},
+    {'id': 2, 'name': 'ubuntu-24.04', 'description': 'Ubuntu 24.04', 'type': 'system', 'status': 'available'},
+    {'id': 3, 'name': 'debian-12', 'description': 'Debian 12', 'type': 'system', 'status': 'available'},
+    {'id': 4, 'name': 'rocky-9', 'description': 'Rocky Linux 9', 'type': 'system', 'status': 'available'},
+]
+SERVER_TYPES = {
+    'cx22': {'id': 104, 'name': 'cx22', 'cores': 2, 'memory': 4.0, 'disk': 40,
+             'prices': [{'location': location['name'],
+                         'price_monthly': {'net': '3.7900', 'gross': '4.5101'}} for location in LOCATIONS]},
+    'cx32': {'id': 105, 'name': 'cx32', 'cores': 4, 'memory': 8.0, 'disk': 80,
+             'prices': [{'location': location['name'],
+                         'price_monthly': {'net': '6.8000', 'gross': '8.0920'}} for location in LOCATIONS]},
+}
+SERVER_NAME = re.compile(r'^[a-zA-Z0-9]([a-zA-Z0-9.-]*[a-zA-Z0-9])?$')
+
+
+class MockCloud:
+    """The project's state; shared by all handler threads under one lock"""
+
+    def __init__(self, boot_delay, ssh_state=None):
+        self.boot_delay = boot_delay
+        self.ssh_state = ssh_state
+        self.lock = threading.Lock()
+        self.servers = {}
+        self.next_id = 1000
+        self.next_action = 1
+        self.requests = 0
+        self.connections = 0
+        self.not_modified = 0
+
+    def _address(self, server_id):
+        # 127.0.1.1, 127.0.1.2, ... 127.0.1.254, 127.0.2.1, ...
+        index = server_id - 1000
+        return f"127.0.{1 + index // 254}.{1 + index % 254}"
+
+    def _write_ssh_state(self):
+        """Publish when each address starts answering, for mock_ssh.py (atomically)"""
+        if not self.ssh_state:
+            return
+        state = {server['public_net']['ipv4']['ip']: {'name': server['name'], 'ready_at': server['_ready_at']}
+                 for server in self.servers.values()}
+        directory = os.path.dirname(os.path.abspath(self.ssh_state))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.mock-ssh.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.ssh_state)
+
+    def _action(self, command, resource_id):
+        action = {'id': self.next_action, 'command': command, 'status': 'running', 'progress': 0,
+                  'started': now(), 'finished': None, 'error': None,
+                  'resources': [{'id': resource_id, 'type': 'server'}]}
+        self.next_action += 1
+        return action
+
+    def server_view(self, server):
+        view = {key: value for key, value in server.items() if not key.startswith('_')}
+        if server['status'] == 'initializing' and time.time() >= server['_ready_at']:
+            server['status'] = view['status'] = 'running'
+        return view
+
+    def create_server(self, data):
+        name = data.get('name')
+        if not isinstance(name, str) or not SERVER_NAME.match(name):
+            return 400, error('invalid_input', "invalid input in field 'name'")
+        server_type = SERVER_TYPES.get(data.get('server_type'))
+        if server_type is None:
+            return 400, error('invalid_input', "invalid input in field 'server_type'")
+        location = next((item for item in LOCATIONS if item['name'] == data.get('location', 'fsn1')), None)
+        image = next((item for item in IMAGES if item['name'] == data.get('image')), None)
+        if location is None or image is None:
+            return 400, error('invalid_input', "unknown location or image")
+        with self.lock:
+            if any(server['name'] == name for server in self.servers.values()):
+                return 409, error('uniqueness_error', "server name is already used")
+            server_id = self.next_id
+            self.next_id += 1
+            server = {
+                'id': server_id,
+                'name': name,
+                'status': 'initializing',
+                'created': now(),
+                'public_net': {'ipv4': {'ip': self._address(server_id)}, 'ipv6': None},
+                'server_type': server_type,
+                'datacenter': {'name': f"{location['name']}-dc1", 'location': location},
+                'image': image,
+                'labels': data.get('labels') or {},
+                # A little jitter, as real servers do not all boot in the same time
+                '_ready_at': time.time() + self.boot_delay * random.uniform(0.8, 1.2),
+            }
+            self.servers[server_id] = server
+            self._write_ssh_state()
+            return 201, {'server': self.server_view(server), 'action': self._action('create_server', server_id),
+                         'next_actions': [], 'root_password': None}
+
+    def delete_server(self, server_id):
+        with self.lock:
+            if self.servers.pop(server_id, None) is None:
+                return 404, error('not_found', "server not found")
+            self._write_ssh_state()
+            return 200, {'action': self._action('delete_server', server_id)}
+
+
+def now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def error(code, message):
+    return {'error': {'code': code, 'message': message, 'details': {}}}
+
+
+def paginate(items, key, query):
+    """One page of items with the API's meta.pagination block"""
+    try:
+        page = max(1, int(query.get('page', ['1'])[0]))
+        per_page = min(MAX_PER_PAGE, max(1, int(query.get('per_page', [str(DEFAULT_PER_PAGE)])[0])))
+    except ValueError:
+        return 400, error('invalid_input', "invalid page or per_page")
+    last_page = max(1, math.ceil(len(items) / per_page))
+    return 200, {
+        key: items[(page - 1) * per_page:page * per_page],
+        'meta': {'pagination': {
+            'page': page, 'per_page': per_page, 'total_entries': len(items), 'last_page': last_page,
+            'previous_page': page - 1 if page > 1 else None,
+            'next_page': page + 1 if page < last_page else None,
+        }},
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'mock-hcloud/1.0'
+    cloud: MockCloud = None
+    token = None
+    latency = 0.0
+    verbose = False
+
+    def setup(self):
+        super().setup()
+        with self.cloud.lock:
+            self.cloud.connections += 1
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            sys.stderr.write(f"mock_api: {format % args}\n")
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        # Successful reads carry an ETag and are answered 304 when it matches If-None-Match
+        etag = None
+        if self.command == 'GET' and status == 200:
+            etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+            if self.headers.get('If-None-Match') == etag:
+                with self.cloud.lock:
+                    self.cloud.not_modified += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self, method):
+        with self.cloud.lock:
+            self.cloud.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if self.headers.get('Authorization') != f"Bearer {self.token}" and self.token is not None:
+            return self.reply(401, error('unauthorized', "unable to authenticate"))
+        url = urlsplit(self.path)
+        path = url.path[3:] if url.path.startswith('/v1') else url.path
+        query = parse_qs(url.query)
+        cloud = self.cloud
+
+        if method == 'GET' and path == '/servers':
+            with cloud.lock:
+                servers = [cloud.server_view(server) for server in sorted(cloud.servers.values(), key=lambda s: s['id'])]
+            if 'name' in query:
+                servers = [server for server in servers if server['name'] == query['name'][0]]
+            return self.reply(*paginate(servers, 'servers', query))
+        match = re.fullmatch(r'/servers/(\d+)', path)
+        if match and method == 'GET':
+            with cloud.lock:
+                server = cloud.servers.get(int(match.group(1)))
+                if server is None:
+                    return self.reply(404, error('not_found', "server not found"))
+                return self.reply(200, {'server': cloud.server_view(server)})
+        if match and method == 'DELETE':
+            return self.reply(*cloud.delete_server(int(match.group(1))))
+        if method == 'POST' and path == '/servers':
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return self.reply(400, error('json_error', "invalid JSON"))
+            return self.reply(*cloud.create_server(data if isinstance(data, dict) else {}))
+        if method == 'GET' and path == '/locations':
+            return self.reply(*paginate(LOCATIONS, 'locations', query))
+        if method == 'GET' and path == '/images':
+            images = [image for image in IMAGES if image['type'] in query.get('type', [image['type']])]
+            return self.reply(*paginate(images, 'images', query))
+        return self.reply(404, error('not_found', f"no route for {method} {path}"))
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_DELETE(self):
+        self.route('DELETE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Hetzner Cloud API")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--token', help="only accept this API token (default: any)")
+    parser.add_argument('--boot-delay', type=float, default=5.0,
+                        help="seconds until a new server is running and answers SSH (default: %(default)s)")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--servers', type=int, default=0, help="servers the project starts with (running)")
+    parser.add_argument('--ssh-state', help="file shared with mock_ssh.py: when each address answers SSH")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    Handler.cloud = MockCloud(args.boot_delay, args.ssh_state)
+    for number in range(1, args.servers + 1):
+        Handler.cloud.create_server({'name': f"existing-{number}", 'server_type': 'cx22', 'image': 'ubuntu-24.04',
+                                     'location': LOCATIONS[number % len(LOCATIONS)]['name']})
+        Handler.cloud.servers[Handler.cloud.next_id - 1]['_ready_at'] = 0
+    Handler.token = args.token
+    Handler.latency = args.latency
+    Handler.verbose = args.verbose
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), Handler)
+    server.daemon_threads = True
+    # kill (as when run in the background) prints the summary as well
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Mock Hetzner API on http://127.0.0.1:{args.port}/v1", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cloud = Handler.cloud
+        print(f"\n{cloud.requests} requests over {cloud.connections} connections, "
+              f"{cloud.not_modified} answered 304", file=sys.stderr)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
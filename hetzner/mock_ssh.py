@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Fake SSH target for the servers of mock_api.py
+`serve` listens on a port on all loopback addresses and answers with an SSH banner only
+for addresses whose server has booted (per the --ssh-state file of mock_api.py), so
+fleet.py's readiness probe sees servers come up one by one. `ssh` stands in for the ssh
+client: it refuses until the server has booted, then stores the remote command and its
+stdin under MOCK_SSH_ROOT/<ip>/ and syntax-checks uploaded scripts instead of running them.
+
+    python3 mock_ssh.py serve --port 2222 --state /tmp/hetzner-mock.json &
+    HETZNER_SSH="python3 mock_ssh.py ssh" HETZNER_SSH_PORT=2222 \\
+        MOCK_SSH_STATE=/tmp/hetzner-mock.json python3 fleet.py create --count 5 --yes
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+# How long the stand-in ssh takes to "run" a script
+RUN_SECONDS = float(os.environ.get('MOCK_SSH_RUN_SECONDS', 1.0))
+
+# ssh options that take a value, so the destination is found after them
+SSH_VALUE_OPTIONS = set('BbcDEeFIiJLlmOoPpQRSWw')
+
+
+def load_state(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_up(state_path, ip):
+    host = load_state(state_path).get(ip)
+    return host is not None and time.time() >= host['ready_at']
+
+
+async def serve(port, state_path):
+    async def greet(reader, writer):
+        ip = writer.get_extra_info('sockname')[0]
+        if is_up(state_path, ip):
+            writer.write(b"SSH-2.0-mock_ssh\r\n")
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(greet, '0.0.0.0', port)
+    print(f"Mock SSH on port {port} of 127.0.0.0/8", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def split_ssh_args(args):
+    """Destination host and remote command of an ssh command line"""
+    i = 0
+    while i < len(args) and args[i].startswith('-'):
+        option = args[i]
+        i += 1
+        if len(option) == 2 and option[1] in SSH_VALUE_OPTIONS:
+            i += 1
+    if i >= len(args):
+        return None, []
+    return args[i].rpartition('@')[2], args[i + 1:]
+
+
+def fake_ssh(args):
+    state_path = os.environ.get('MOCK_SSH_STATE', '')
+    host, command = split_ssh_args(args)
+    if host is None:
+        print("usage: mock_ssh.py ssh [options] destination [command]", file=sys.stderr)
+        return 255
+    if not is_up(state_path, host):
+        print(f"ssh: connect to host {host} port 22: Connection refused", file=sys.stderr)
+        return 255
+
+    root = os.environ.get('MOCK_SSH_ROOT') or os.path.join(os.path.dirname(os.path.abspath(state_path)), 'mock-hosts')
+    host_dir = os.path.join(root, host)
+    os.makedirs(host_dir, exist_ok=True)
+    remote_command = ' '.join(command)
+    stdin = sys.stdin.buffer.read() if not sys.stdin.isatty() else b''
+    with open(os.path.join(host_dir, 'commands.log'), 'a') as f:
+        f.write(remote_command + '\n')
+    if stdin:
+        with open(os.path.join(host_dir, 'stdin'), 'wb') as f:
+            f.write(stdin)
+
+    # An uploaded script is checked, not run: the real one upgrades and installs packages
+    if stdin and re.search(r'\.sh\b', remote_command):
+        check = subprocess.run(['bash', '-n'], input=stdin, capture_output=True)
+        if check.returncode != 0:
+            sys.stderr.write(check.stderr.decode('utf-8', 'replace'))
+            return check.returncode
+        steps = stdin.count(b'Executing: ')
+        time.sleep(RUN_SECONDS)
+        print(f"[mock {host}] script checked, {steps} commands not run")
+    return 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'ssh':
+        sys.exit(fake_ssh(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(description="Fake SSH target for mock_api.py servers")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="answer SSH banners for booted servers")
+    serve_parser.add_argument('--port', type=int, default=2222)
+    serve_parser.add_argument('--state', required=True, help="the --ssh-state file of mock_api.py")
+    commands.add_parser('ssh', help="stand-in ssh client (takes ssh's arguments)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.state))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
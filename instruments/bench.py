@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Benchmarks for QuickLoad Instruments
+Generates a synthetic Kontakt library tree, then times the scanner and the symlink
+builder on it. Every phase runs in its own process so wall time, filesystem calls and
+peak RSS are measured separately. Results are written as JSON tagged with the git
+commit, so runs can be compared across commits with --compare.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+import importlib.util
+import importlib.machinery
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Phases in run order; later phases reuse the index and structure left by earlier ones
+PHASES = ['scan', 'scan_index_cold', 'scan_index_warm', 'create', 'create_reconcile', 'memory']
+
+# os functions counted as filesystem calls during a phase
+FS_CALLS = ['scandir', 'listdir', 'stat', 'lstat', 'open', 'mkdir', 'rmdir', 'symlink', 'readlink',
+            'unlink', 'rename', 'replace']
+
+SAMPLES_PER_FOLDER = 500
+
+# Prune rules used unless --no-prune when config.PRUNE_DIR_PATTERNS is empty (the default)
+BENCH_PRUNE_PATTERNS = ["samples"]
+
+# Named tree sizes for --preset; explicit options still override them.
+# 500k: the memory benchmark tree, about 500,000 files that are nearly all .nki/.nksn
+# records (2000 libraries of ~250), so the scanner sees every one of them
+PRESETS = {
+    '500k': {'brands': 40, 'libraries': 50, 'instruments': 194, 'snapshots': 50, 'samples': 0},
+}
+
+
+def load_instruments():
+    """Import the extensionless instruments script as a module"""
+    sys.path.insert(0, SCRIPT_DIR)
+    loader = importlib.machinery.SourceFileLoader('instruments', os.path.join(SCRIPT_DIR, 'instruments'))
+    spec = importlib.util.spec_from_loader('instruments', loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def _touch(path):
+    os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o644))
+
+
+def generate_tree(root, brands=20, libraries=25, depth=1, instruments=40, snapshots=10, samples=200,
+                  duplicate_ratio=0.1, snapshot_only_ratio=0.05, seed=0):
+    """
+    Create a synthetic tree of empty files below root, laid out like a Kontakt archive:
+
+        Brand NNN/Library NNN/[Content/Part N/...]Instruments/*.nki
+                                                  Snapshots/*.nksn
+                                                  Samples/Part N/*.ncw
+
+    `libraries` is per brand and `depth` the number of folders between a library and
+    its Instruments folder. A `duplicate_ratio` share of libraries repeats its
+    instrument filenames in a nested folder and a `snapshot_only_ratio` share has
+    snapshots but no instruments.
+    Returns counts of the directories and files created
+    """
+    rng = random.Random(seed)
+    counts = {'dirs': 0, 'files': 0, 'nki': 0, 'nksn': 0, 'samples': 0}
+
+    def make_dir(path):
+        os.makedirs(path)
+        counts['dirs'] += 1
+        return path
+
+    for b in range(brands):
+        brand_dir = make_dir(os.path.join(root, f"Brand {b:03d}"))
+        for l in range(libraries):
+            library_dir = make_dir(os.path.join(brand_dir, f"Library {b:03d}-{l:03d}"))
+            _touch(os.path.join(library_dir, f"Library {b:03d}-{l:03d}.nicnt"))
+            counts['files'] += 1
+
+            content_dir = library_dir
+            for level in range(depth):
+                content_dir = make_dir(os.path.join(content_dir, "Content" if level == 0 else f"Part {level}"))
+
+            if rng.random() >= snapshot_only_ratio:
+                instruments_dir = make_dir(os.path.join(content_dir, "Instruments"))
+                folders = [instruments_dir]
+                if rng.random() < duplicate_ratio:
+                    folders.append(make_dir(os.path.join(instruments_dir, "Legacy")))
+                for folder in folders:
+                    for i in range(instruments):
+                        _touch(os.path.join(folder, f"Instrument {i:03d}.nki"))
+                    counts['nki'] += instruments
+
+            if snapshots:
+                snapshots_dir = make_dir(os.path.join(content_dir, "Snapshots"))
+                for i in range(snapshots):
+                    _touch(os.path.join(snapshots_dir, f"Snapshot {i:03d}.nksn"))
+                counts['nksn'] += snapshots
+
+            if samples:
+                samples_dir = make_dir(os.path.join(content_dir, "Samples"))
+                for i in range(samples):
+                    if i % SAMPLES_PER_FOLDER == 0:
+                        part_dir = make_dir(os.path.join(samples_dir, f"Part {i // SAMPLES_PER_FOLDER + 1}"))
+                    _touch(os.path.join(part_dir, f"Sample {i:05d}.ncw"))
+                counts['samples'] += samples
+
+    counts['files'] += counts['nki'] + counts['nksn'] + counts['samples']
+
+    # Backdate the directories, so the scan index does not treat them as just modified
+    mtime = time.time() - 3600
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (mtime, mtime))
+    return counts
+
+
+def count_fs_calls():
+    """
+    Wrap the os functions in FS_CALLS with counters
+    Returns the live {name: count} dict. Only calls made through the os module are
+    seen (this includes os.path, os.walk and shutil, but not sqlite or ctypes).
+    """
+    counts = dict.fromkeys(FS_CALLS, 0)
+    lock = threading.Lock()
+
+    def wrap(name, func):
+        def counted(*args, **kwargs):
+            with lock:
+                counts[name] += 1
+            return func(*args, **kwargs)
+        return counted
+
+    for name in FS_CALLS:
+        setattr(os, name, wrap(name, getattr(os, name)))
+    return counts
+
+
+def _peak_rss_kb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure_memory(instruments, search_path, jobs):
+    """
+    Scan, group and plan the tree under tracemalloc
+    Returns a dict of byte counts: memory retained by the grouped records and the
+    plan, the peak during the run, and what the same records take as plain dicts
+    """
+    tracemalloc.start()
+    try:
+        libraries = instruments.group_libraries(instruments.iter_kontakt_files([search_path], jobs=jobs))
+        grouped, _ = tracemalloc.get_traced_memory()
+        links, dirs = instruments.plan_instruments_structure(libraries)
+        planned, peak = tracemalloc.get_traced_memory()
+
+        # The same information as one dict per file, for comparison
+        before, _ = tracemalloc.get_traced_memory()
+        as_dicts = [{
+            'path': record.path,
+            'filename': record.filename,
+            'brand': record.brand,
+            'library': record.library,
+            'rel_path': record.rel_path
+        } for nki_files, nksn_files in libraries.values() for record in nki_files + nksn_files]
+        dicts, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'files': len(as_dicts),
+        'links': len(links),
+        'records_bytes': grouped,
+        'plan_bytes': planned - grouped,
+        'peak_bytes': peak,
+        'dict_records_bytes': dicts - before,
+    }
+
+
+def run_phase(phase, workdir, jobs, prune):
+    """Run one benchmark phase in this process and return its measurements"""
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    instruments = load_instruments()
+    config = instruments.config
+
+    tree = os.path.join(workdir, 'tree')
+    config.SEARCH_PATHS = [tree]
+    config.SCAN_INDEX_FILE = os.path.join(workdir, 'scan_index.sqlite')
+    config.SEARCH_INDEX_FILE = os.path.join(workdir, 'search_index.sqlite')
+    if prune:
+        # The synthetic Samples folders never hold instruments, so they are pruned even
+        # though config does not prune by default
+        config.PRUNE_DIR_PATTERNS = config.PRUNE_DIR_PATTERNS or BENCH_PRUNE_PATTERNS
+    else:
+        config.PRUNE_DIR_PATTERNS = []
+        config.DEFAULT_MAX_SCAN_DEPTH = None
+        config.MAX_SCAN_DEPTH = {}
+    instruments.INSTRUMENTS_DIR = os.path.join(workdir, 'Instruments')
+
+    if phase == 'memory':
+        return {'memory': measure_memory(instruments, tree, jobs)}
+
+    rss_before = _peak_rss_kb()
+    fs_calls = count_fs_calls()
+    started = time.perf_counter()
+
+    if phase == 'scan':
+        nki_files, nksn_files = instruments.find_kontakt_files([tree], jobs=jobs)
+        files = len(nki_files) + len(nksn_files)
+    elif phase in ('scan_index_cold', 'scan_index_warm'):
+        index = instruments.scanindex.ScanIndex(config.SCAN_INDEX_FILE)
+        try:
+            nki_files, nksn_files = instruments.find_kontakt_files([tree], jobs=jobs, index=index)
+        finally:
+            index.close()
+        files = len(nki_files) + len(nksn_files)
+    elif phase == 'create':
+        files = instruments.create_instruments_structure(jobs=jobs)
+    elif phase == 'create_reconcile':
+        files = instruments.create_instruments_structure(jobs=jobs, reconcile=True)
+    else:
+        raise ValueError(f"Unknown phase: {phase}")
+
+    seconds = time.perf_counter() - started
+    return {
+        'seconds': round(seconds, 4),
+        'files': files,
+        'files_per_sec': round(files / seconds) if seconds else None,
+        'fs_calls': dict(fs_calls),
+        'fs_calls_total': sum(fs_calls.values()),
+        'start_rss_kb': rss_before,
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def git_revision():
+    """Short commit hash of the working tree, with a -dirty suffix for local changes"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no', '.'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if status else revision
+
+
+def run_benchmark(args, workdir):
+    """Generate the tree and run every phase in a child process"""
+    tree = os.path.join(workdir, 'tree')
+    if not os.path.isdir(tree):
+        print(f"Generating tree in {tree}...", file=sys.stderr)
+        os.makedirs(tree)
+        tree_counts = generate_tree(tree, brands=args.brands, libraries=args.libraries, depth=args.depth,
+                                    instruments=args.instruments, snapshots=args.snapshots, samples=args.samples,
+                                    duplicate_ratio=args.duplicate_ratio,
+                                    snapshot_only_ratio=args.snapshot_only_ratio, seed=args.seed)
+        with open(os.path.join(workdir, 'tree.json'), 'w') as f:
+            json.dump(tree_counts, f)
+    else:
+        print(f"Reusing tree in {tree}", file=sys.stderr)
+        with open(os.path.join(workdir, 'tree.json')) as f:
+            tree_counts = json.load(f)
+
+    # Start every run from an empty index and structure
+    for leftover in ('scan_index.sqlite', 'Instruments'):
+        path = os.path.join(workdir, leftover)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    phases = {}
+    for phase in args.phases:
+        print(f"Running {phase}...", file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), '--phase', phase, '--workdir', workdir,
+                   '--jobs', str(args.jobs)]
+        if args.no_prune:
+            command.append('--no-prune')
+        output = subprocess.run(command, capture_output=True, text=True)
+        if output.returncode != 0:
+            sys.stderr.write(output.stderr)
+            raise RuntimeError(f"Phase {phase} failed")
+        phases[phase] = json.loads(output.stdout)
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'jobs': args.jobs,
+        'prune': not args.no_prune,
+        'params': {
+            'brands': args.brands,
+            'libraries': args.libraries,
+            'depth': args.depth,
+            'instruments': args.instruments,
+            'snapshots': args.snapshots,
+            'samples': args.samples,
+            'duplicate_ratio': args.duplicate_ratio,
+            'snapshot_only_ratio': args.snapshot_only_ratio,
+            'seed': args.seed,
+        },
+        'tree': tree_counts,
+        'phases': phases,
+    }
+
+
+def _change(old, new):
+    if not old or new is None:
+        return ""
+    return f"({(new - old) / old * 100:+.1f}%)"
+
+
+def print_summary(result, baseline=None, out=sys.stdout):
+    """Print a table of the phase measurements, with changes relative to a baseline run"""
+    tree = result['tree']
+    print(f"Revision {result['revision']}: {tree['files']} files in {tree['dirs']} directories "
+          f"({tree['nki']} .nki, {tree['nksn']} .nksn), {result['jobs']} jobs", file=out)
+    if baseline:
+        print(f"Compared with {baseline['revision']} ({baseline['timestamp']})", file=out)
+        if baseline['params'] != result['params'] or baseline['jobs'] != result['jobs']:
+            print("⚠️  Baseline was run with different parameters", file=out)
+
+    base_phases = baseline['phases'] if baseline else {}
+    for phase, values in result['phases'].items():
+        base = base_phases.get(phase, {})
+        if phase == 'memory':
+            memory = values['memory']
+            base_memory = base.get('memory', {})
+            print(f"  {phase:18} records {memory['records_bytes'] / 2**20:.1f} MiB "
+                  f"{_change(base_memory.get('records_bytes'), memory['records_bytes'])}, "
+                  f"plan {memory['plan_bytes'] / 2**20:.1f} MiB "
+                  f"{_change(base_memory.get('plan_bytes'), memory['plan_bytes'])}, "
+                  f"peak {memory['peak_bytes'] / 2**20:.1f} MiB "
+                  f"{_change(base_memory.get('peak_bytes'), memory['peak_bytes'])}", file=out)
+            continue
+        seconds = _change(base.get('seconds'), values['seconds'])
+        fs_calls = _change(base.get('fs_calls_total'), values['fs_calls_total'])
+        rss = _change(base.get('peak_rss_kb'), values['peak_rss_kb'])
+        print(f"  {phase:18} {values['seconds']:8.3f}s {seconds:10} {values['files_per_sec'] or 0:>9} files/s  "
+              f"{values['fs_calls_total']:>8} fs calls {fs_calls:10} {values['peak_rss_kb'] / 1024:7.1f} MiB RSS {rss}",
+              file=out)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark QuickLoad Instruments on a synthetic library tree')
+    parser.add_argument('-j', '--jobs', type=int, default=8,
+                        help='number of worker threads (default: %(default)s)')
+    parser.add_argument('--brands', type=int, default=20, help='number of brands (default: %(default)s)')
+    parser.add_argument('--libraries', type=int, default=25,
+                        help='libraries per brand (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=1,
+                        help='folders between a library and its Instruments folder (default: %(default)s)')
+    parser.add_argument('--instruments', type=int, default=40,
+                        help='.nki files per library (default: %(default)s)')
+    parser.add_argument('--snapshots', type=int, default=10,
+                        help='.nksn files per library (default: %(default)s)')
+    parser.add_argument('--samples', type=int, default=200,
+                        help='sample files in each Samples folder (default: %(default)s)')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1,
+                        help='share of libraries with duplicate instrument filenames (default: %(default)s)')
+    parser.add_argument('--snapshot-only-ratio', type=float, default=0.05,
+                        help='share of libraries with snapshots only (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    parser.add_argument('--preset', choices=PRESETS,
+                        help='tree size preset; 500k is the 500,000-file memory benchmark tree')
+    parser.add_argument('--no-prune', action='store_true',
+                        help='scan Samples folders too (by default they are pruned, see BENCH_PRUNE_PATTERNS)')
+    parser.add_argument('--phases', nargs='+', choices=PHASES, default=PHASES, metavar='PHASE',
+                        help=f"phases to run (default: all of {', '.join(PHASES)})")
+    parser.add_argument('--workdir', metavar='DIR',
+                        help='generate the tree in DIR and keep it; an existing tree in DIR is reused')
+    parser.add_argument('-o', '--output', metavar='FILE', help='write the JSON results to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare with the JSON results of an earlier run')
+    parser.add_argument('--phase', choices=PHASES, help=argparse.SUPPRESS)
+    preset = parser.parse_known_args()[0].preset
+    if preset:
+        parser.set_defaults(**PRESETS[preset])
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.phase:
+        # Child process: run a single phase and report it on stdout
+        json.dump(run_phase(args.phase, args.workdir, args.jobs, not args.no_prune), sys.stdout)
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='instruments-bench-')
+    try:
+        result = run_benchmark(args, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+        print_summary(result, baseline)
+    else:
+        # Keep stdout clean JSON
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        print_summary(result, baseline, out=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,49 @@ SEARCH_PATHS = [
 "/Volumes/FIRESPITTER/_INST_FS/"
 ]
 
+# Number of parallel workers used to scan SEARCH_PATHS (override with --jobs)
+SCAN_JOBS = 8
+
+# Scan index (directory mtimes and their Kontakt files) used for incremental rescans
+SCAN_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scan_index.sqlite")
+
+# Search index (patch names, brands and libraries) used by `instruments search`,
+# and the default number of hits shown
+SEARCH_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_index.sqlite")
+SEARCH_RESULTS = 20
+
+# Byte-identical .nki/.nksn files of the same library in several search paths (e.g. a library
+# copied to two volumes): "off", "report" them, or "link-one" to link only the copy found first.
+# File hashes are cached in SCAN_INDEX_FILE by path, size and mtime
+DEDUPE_POLICIES = ["off", "report", "link-one"]
+DEDUPE_POLICY = "report"
+
+# Directory names (case-insensitive globs) that are never descended into while scanning.
+# Off by default: some libraries keep .nki files inside their Samples folder. Sample folders
+# usually hold thousands of .ncw/.wav files and nothing else, so pruning them speeds up scans
+PRUNE_DIR_PATTERNS = [
+#    "samples", "ir samples",
+]
+
+# Maximum directory depth below a search path (brand folders are depth 1), None for no limit
+DEFAULT_MAX_SCAN_DEPTH = None
+MAX_SCAN_DEPTH = {
+#    "/Volumes/ZIMMER/_INST_Z/": 6,
+}
+
+# Watch mode (--watch): events are coalesced until nothing happened for WATCH_DEBOUNCE_SECONDS,
+# but never held back for more than WATCH_MAX_DELAY_SECONDS
+WATCH_DEBOUNCE_SECONDS = 2.0
+WATCH_MAX_DELAY_SECONDS = 30.0
+
+# Full reconcile in watch mode, as a safety net for missed events and unwatched folders
+WATCH_RESCAN_INTERVAL = 3600
+
+# Share of fs.inotify.max_user_watches watch mode may use (other apps need watches too),
+# and the number of watches to use when the limit cannot be read
+WATCH_LIMIT_FRACTION = 0.5
+WATCH_FALLBACK_BUDGET = 8192
+
 # File extensions to look for
 NKI_EXTENSION = ".nki"  # Instrument files
 NKM_EXTENSION = ".nkm"  # Multi files
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Duplicate detection for QuickLoad Instruments
+Finds byte-identical Kontakt files that exist in more than one search path (e.g. the
+same library on two archive volumes). Candidates are narrowed down in stages: equal
+size, then a hash of a few samples of each file, and only then a hash of the whole
+file. Hashes are cached by (path, size, mtime) so reruns only read changed files.
+"""
+
+import os
+import mmap
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes hashed at the start, middle and end of a file for the sample hash. Files up to
+# three samples long are hashed completely in the sample pass.
+SAMPLE_SIZE = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sample TEXT,
+    full TEXT
+);
+"""
+
+
+class FileInfo:
+    """Size, mtime and hashes of one candidate file"""
+    __slots__ = ('path', 'root', 'size', 'mtime_ns', 'sample', 'full')
+
+    def __init__(self, path, root):
+        self.path = path
+        self.root = root
+        self.size = None
+        self.mtime_ns = None
+        self.sample = None
+        self.full = None
+
+
+class HashCache:
+    """Hashes of previously read files, stored in SQLite"""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def fill(self, infos):
+        """Copy cached hashes into FileInfos whose size and mtime still match"""
+        by_path = {info.path: info for info in infos}
+        paths = list(by_path)
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            for path, size, mtime_ns, sample, full in self.conn.execute(
+                    f"SELECT path, size, mtime_ns, sample, full FROM hashes WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk):
+                info = by_path[path]
+                if info.size == size and info.mtime_ns == mtime_ns:
+                    info.sample = sample
+                    info.full = full
+
+    def store(self, infos):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, sample, full) VALUES (?, ?, ?, ?, ?)",
+                [(info.path, info.size, info.mtime_ns, info.sample, info.full)
+                 for info in infos if info.sample is not None])
+
+
+def _stat(info):
+    try:
+        st = os.stat(info.path)
+    except OSError:
+        return
+    info.size = st.st_size
+    info.mtime_ns = st.st_mtime_ns
+
+
+def _mapped(path):
+    """Open a file and map it read-only; returns (file, mmap)"""
+    f = open(path, 'rb')
+    try:
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        f.close()
+        raise
+
+
+def _sample_hash(info):
+    if info.sample is not None:
+        return
+    if info.size == 0:
+        # mmap cannot map empty files; they are all identical
+        info.sample = info.full = hashlib.blake2b(b'', digest_size=16).hexdigest()
+        return
+    try:
+        f, data = _mapped(info.path)
+    except (OSError, ValueError):
+        return
+    with f, data:
+        digest = hashlib.blake2b(digest_size=16)
+        if info.size <= 3 * SAMPLE_SIZE:
+            digest.update(data)
+            info.sample = info.full = digest.hexdigest()
+            return
+        middle = (info.size - SAMPLE_SIZE) // 2
+        for offset in (0, middle, info.size - SAMPLE_SIZE):
+            digest.update(data[offset:offset + SAMPLE_SIZE])
+        info.sample = digest.hexdigest()
+
+
+def _full_hash(info):
+    if info.full is not None:
+        return
+    try:
+        f, data = _mapped(info.path)
+    except (OSError, ValueError):
+        return
+    with f, data:
+        info.full = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _spanning(groups):
+    """Keep only groups with files from more than one search path"""
+    return [group for group in groups if len({info.root for info in group}) > 1]
+
+
+def _regroup(groups, key):
+    """Split each group by key(info), dropping files whose key is None"""
+    result = []
+    for group in groups:
+        buckets = {}
+        for info in group:
+            value = key(info)
+            if value is not None:
+                buckets.setdefault(value, []).append(info)
+        result.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return _spanning(result)
+
+
+def find_duplicates(groups, jobs=1, cache=None):
+    """
+    Find byte-identical files within groups of (path, search_root) pairs
+    Only files in different search paths count as duplicates; in each set of identical
+    files the first one listed is kept.
+    Returns a list of (size, kept_path, [duplicate_paths])
+    """
+    groups = _spanning([[FileInfo(path, root) for path, root in group] for group in groups])
+    infos = [info for group in groups for info in group]
+    if not infos:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        list(executor.map(_stat, infos))
+        groups = _regroup(groups, lambda info: info.size)
+
+        candidates = [info for group in groups for info in group]
+        if cache is not None:
+            cache.fill(candidates)
+        list(executor.map(_sample_hash, candidates))
+        groups = _regroup(groups, lambda info: info.sample)
+
+        list(executor.map(_full_hash, [info for group in groups for info in group]))
+        groups = _regroup(groups, lambda info: info.full)
+
+    if cache is not None:
+        cache.store(candidates)
+
+    duplicates = []
+    for group in groups:
+        kept = group[0]
+        copies = [info.path for info in group[1:] if info.root != kept.root]
+        if copies:
+            duplicates.append((kept.size, kept.path, copies))
+    return duplicates
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Persistent scan index for QuickLoad Instruments
+Stores each scanned directory's mtime together with the subdirectories and
+.nki/.nksn entries found in it, so later scans only re-list directories whose
+mtime changed since the previous run
+"""
+
+import os
+import sqlite3
+
+# Directories modified this recently are not trusted on the next run, because
+# a change within the same mtime tick (1s on HFS+/exFAT) would go unnoticed
+MTIME_GRACE_NS = 2 * 1_000_000_000
+
+# Stored instead of the real mtime for directories that must be re-listed next time
+UNSTABLE_MTIME = -1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    search_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_search_path ON dirs (search_path);
+CREATE TABLE IF NOT EXISTS files (
+    dir_path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    library TEXT NOT NULL,
+    rel_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir_path ON files (dir_path);
+"""
+
+
+class CachedDir:
+    """Cached listing of one directory"""
+    __slots__ = ('mtime_ns', 'subdirs', 'filenames', 'brand', 'library', 'rel_path')
+
+    def __init__(self, mtime_ns, subdirs, filenames, brand=None, library=None, rel_path=None):
+        self.mtime_ns = mtime_ns
+        self.subdirs = subdirs
+        # Kontakt filenames in listing order; they all share the directory's
+        # brand, library and rel_path
+        self.filenames = filenames
+        self.brand = brand
+        self.library = library
+        self.rel_path = rel_path
+
+
+class ScanIndex:
+    """SQLite-backed index of directory listings under the search paths"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def load(self, search_path, subtrees=None):
+        """
+        Load cached directories of a search path as {dir_path: CachedDir}
+        `subtrees` limits the result to the given directories and everything below them
+        """
+        if subtrees is None:
+            where = [("d.search_path = ?", (search_path,))]
+        else:
+            # Range on the primary key: every path starting with "<subtree>/" sorts
+            # between "<subtree>/" and "<subtree>0" ('0' follows '/')
+            where = [("d.search_path = ? AND (d.path = ? OR (d.path >= ? AND d.path < ?))",
+                      (search_path, subtree, subtree + os.sep, subtree + chr(ord(os.sep) + 1)))
+                     for subtree in subtrees]
+
+        cache = {}
+        for condition, params in where:
+            for path, mtime_ns, subdirs in self.conn.execute(
+                    f"SELECT d.path, d.mtime_ns, d.subdirs FROM dirs d WHERE {condition}", params):
+                cache[path] = CachedDir(mtime_ns, subdirs.split('\0') if subdirs else [], [])
+
+            for dir_path, filename, brand, library, rel_path in self.conn.execute(
+                    "SELECT f.dir_path, f.filename, f.brand, f.library, f.rel_path "
+                    f"FROM files f JOIN dirs d ON d.path = f.dir_path WHERE {condition} "
+                    "ORDER BY f.rowid", params):
+                cached = cache[dir_path]
+                cached.filenames.append(filename)
+                cached.brand, cached.library, cached.rel_path = brand, library, rel_path
+
+        return cache
+
+    def save(self, search_path, updates, removed, scan_started_ns):
+        """
+        Write re-listed directories and drop directories that no longer exist
+        `updates` is a list of (dir_path, CachedDir), `removed` an iterable of dir paths
+        """
+        with self.conn:
+            for dir_path in removed:
+                self.conn.execute("DELETE FROM files WHERE dir_path = ?", (dir_path,))
+                self.conn.execute("DELETE FROM dirs WHERE path = ?", (dir_path,))
+
+            for dir_path, cached in updates:
+                mtime_ns = cached.mtime_ns
+                if scan_started_ns - mtime_ns < MTIME_GRACE_NS:
+                    mtime_ns = UNSTABLE_MTIME
+
+                self.conn.execute("DELETE FROM files WHERE dir_path = ?", (dir_path,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dirs (path, search_path, mtime_ns, subdirs) VALUES (?, ?, ?, ?)",
+                    (dir_path, search_path, mtime_ns, '\0'.join(cached.subdirs)))
+                self.conn.executemany(
+                    "INSERT INTO files (dir_path, filename, brand, library, rel_path) VALUES (?, ?, ?, ?, ?)",
+                    [(dir_path, filename, cached.brand, cached.library, cached.rel_path)
+                     for filename in cached.filenames])
+
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Patch search index for QuickLoad Instruments
+Keeps a persistent token and trigram index over patch filenames and brand/library
+names, so substring and fuzzy queries over hundreds of thousands of patches come back
+without touching the archive volumes
+
+Every filename (without extension) and every "brand library" pair is normalized into
+a term. Terms are split into words, each word lists the terms it occurs in, and each
+trigram lists the words it occurs in. The vocabulary is far smaller than the number
+of patches, which keeps both updates and lookups cheap.
+"""
+
+import os
+import re
+import math
+import array
+import sqlite3
+import hashlib
+
+# Minimum trigram similarity for fuzzy hits
+FUZZY_THRESHOLD = 0.3
+
+# Term kinds (bit flags): a patch filename, a "brand library" name, or both
+NAME_TERM = 1
+LIBRARY_TERM = 2
+
+# Maximum number of SQL variables per IN (...) query
+SQL_CHUNK = 500
+
+# Terms whose patches are loaded per query while ranking
+TERM_BATCH = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE,
+    kind INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS words (
+    id INTEGER PRIMARY KEY,
+    word TEXT NOT NULL UNIQUE,
+    term_ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT PRIMARY KEY,
+    word_ids BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS patches (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    library TEXT NOT NULL,
+    source TEXT NOT NULL,
+    link TEXT,
+    name_term INTEGER NOT NULL,
+    library_term INTEGER NOT NULL
+);
+"""
+
+PATCH_INDEXES = {
+    'patches_name_term': 'patches (name_term)',
+    'patches_library_term': 'patches (library_term)',
+    'patches_brand': 'patches (brand)',
+}
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """Case-fold text and turn punctuation into single spaces"""
+    return _SEPARATORS.sub(' ', text.casefold()).strip()
+
+
+def trigrams(word):
+    """Trigrams of a word, padded like pg_trgm ("  w", " wo", ..., "rd ")"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _substring_trigrams(word):
+    """Trigrams every indexed word containing `word` must have"""
+    if len(word) < 3:
+        # Too short for an inner trigram: match words starting with it
+        return {f"  {word}"[-3:]}
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _word_matches(query_word, word):
+    if len(query_word) < 3:
+        return word.startswith(query_word)
+    return query_word in word
+
+
+def _ids(blob):
+    ids = array.array('I')
+    ids.frombytes(blob)
+    return ids
+
+
+def _chunks(items, size=SQL_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _placeholders(chunk):
+    return ','.join('?' * len(chunk))
+
+
+class Hit:
+    """A search result"""
+    __slots__ = ('score', 'filename', 'brand', 'library', 'source', 'link', 'fuzzy')
+
+    def __init__(self, score, filename, brand, library, source, link, fuzzy=False):
+        self.score = score
+        self.filename = filename
+        self.brand = brand
+        self.library = library
+        self.source = source
+        self.link = link
+        self.fuzzy = fuzzy
+
+
+class SearchIndex:
+    """SQLite-backed search index of the patches in the instruments structure"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self._create_indexes()
+
+    def _create_indexes(self):
+        for name, definition in PATCH_INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM patches").fetchone()[0]
+
+    def update(self, patches, brands=None):
+        """
+        Replace the indexed patches
+        `patches` is an iterable of (filename, brand, library, source, link) tuples, where
+        link is the path relative to INSTRUMENTS_DIR (or None if the patch is not linked).
+        With `brands`, only the patches of those brands are replaced.
+        Returns False if nothing changed since the last full update
+        """
+        patches = list(patches)
+        if brands is None:
+            digest = hashlib.blake2b(repr(patches).encode('utf-8', 'surrogateescape'), digest_size=16).hexdigest()
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'digest'").fetchone()
+            if row is not None and row[0] == digest:
+                return False
+
+        # Names repeat a lot across libraries and brand/library pairs even more
+        texts = {}
+        rows = []
+        kinds = {}
+        for filename, brand, library, source, link in patches:
+            name = os.path.splitext(filename)[0]
+            name_text = texts.get(name)
+            if name_text is None:
+                name_text = texts[name] = normalize(name)
+            library_key = (brand, library)
+            library_text = texts.get(library_key)
+            if library_text is None:
+                library_text = texts[library_key] = normalize(f"{brand} {library}")
+            rows.append((filename, brand, library, source, link, name_text, library_text))
+            kinds[name_text] = kinds.get(name_text, 0) | NAME_TERM
+            kinds[library_text] = kinds.get(library_text, 0) | LIBRARY_TERM
+
+        with self.conn:
+            if brands is None:
+                # A full update rebuilds everything, which also drops unused terms and words
+                for table in ('patches', 'terms', 'words', 'trigrams'):
+                    self.conn.execute(f"DELETE FROM {table}")
+                # Bulk loading is much faster with the indexes built afterwards
+                for name in PATCH_INDEXES:
+                    self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('digest', ?)", (digest,))
+                term_ids = {}
+            else:
+                for chunk in _chunks(brands):
+                    self.conn.execute(f"DELETE FROM patches WHERE brand IN ({_placeholders(chunk)})", chunk)
+                self.conn.execute("DELETE FROM meta WHERE key = 'digest'")
+                term_ids = {}
+                for chunk in _chunks(kinds):
+                    term_ids.update(self.conn.execute(
+                        f"SELECT text, id FROM terms WHERE text IN ({_placeholders(chunk)})", chunk))
+                # Existing terms may now also be used as the other kind
+                self.conn.executemany("UPDATE terms SET kind = kind | ? WHERE id = ?",
+                                      [(kinds[text], term_id) for text, term_id in term_ids.items()])
+
+            # Term ids follow (length, text), so ranking by id puts shorter, closer names
+            # first without loading their text. Terms added by brand updates go to the end
+            # until the next full update.
+            next_id = (self.conn.execute("SELECT MAX(id) FROM terms").fetchone()[0] or 0) + 1
+            new_terms = sorted(kinds.keys() - term_ids.keys(), key=lambda text: (len(text), text))
+            for text in new_terms:
+                term_ids[text] = next_id
+                next_id += 1
+            self.conn.executemany("INSERT INTO terms (id, text, kind) VALUES (?, ?, ?)",
+                                  [(term_ids[text], text, kinds[text]) for text in new_terms])
+
+            self.conn.executemany(
+                "INSERT INTO patches (filename, brand, library, source, link, name_term, library_term) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [row[:5] + (term_ids[row[5]], term_ids[row[6]]) for row in rows])
+
+            self._create_indexes()
+            self._add_words(new_terms, term_ids)
+
+            # Brand/library terms are few; keep their ids together for queries
+            library_ids = array.array('I', (term for term, in self.conn.execute(
+                "SELECT id FROM terms WHERE kind & ? ORDER BY id", (LIBRARY_TERM,))))
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('library_terms', ?)",
+                              (library_ids.tobytes(),))
+        return True
+
+    def _add_words(self, new_terms, term_ids):
+        """Add new terms to the word postings, and new words to the trigram postings"""
+        word_terms = {}
+        for text in new_terms:
+            term_id = term_ids[text]
+            for word in set(text.split()):
+                posting = word_terms.get(word)
+                if posting is None:
+                    posting = word_terms[word] = array.array('I')
+                posting.append(term_id)
+
+        word_ids = {}
+        for chunk in _chunks(word_terms):
+            for word_id, word, blob in self.conn.execute(
+                    f"SELECT id, word, term_ids FROM words WHERE word IN ({_placeholders(chunk)})", chunk):
+                word_ids[word] = word_id
+                existing = _ids(blob)
+                existing.extend(word_terms[word])
+                word_terms[word] = existing
+        self.conn.executemany("UPDATE words SET term_ids = ? WHERE id = ?",
+                              [(word_terms[word].tobytes(), word_id) for word, word_id in word_ids.items()])
+
+        next_id = (self.conn.execute("SELECT MAX(id) FROM words").fetchone()[0] or 0) + 1
+        trigram_words = {}
+        new_words = []
+        for word in word_terms.keys() - word_ids.keys():
+            new_words.append((next_id, word, word_terms[word].tobytes()))
+            for gram in trigrams(word):
+                posting = trigram_words.get(gram)
+                if posting is None:
+                    posting = trigram_words[gram] = array.array('I')
+                posting.append(next_id)
+            next_id += 1
+        self.conn.executemany("INSERT INTO words (id, word, term_ids) VALUES (?, ?, ?)", new_words)
+
+        for gram, existing in self._trigram_postings(trigram_words).items():
+            existing.extend(trigram_words[gram])
+            trigram_words[gram] = existing
+        self.conn.executemany("INSERT OR REPLACE INTO trigrams (trigram, word_ids) VALUES (?, ?)",
+                              [(gram, posting.tobytes()) for gram, posting in trigram_words.items()])
+
+    def _trigram_postings(self, grams):
+        """Load the word ids of the given trigrams as {trigram: array of word ids}"""
+        found = {}
+        for chunk in _chunks(grams):
+            for gram, blob in self.conn.execute(
+                    f"SELECT trigram, word_ids FROM trigrams WHERE trigram IN ({_placeholders(chunk)})", chunk):
+                found[gram] = _ids(blob)
+        return found
+
+    def _words(self, word_ids):
+        """Load words with their term postings as [(word, array of term ids)]"""
+        found = []
+        for chunk in _chunks(word_ids):
+            for word, blob in self.conn.execute(
+                    f"SELECT word, term_ids FROM words WHERE id IN ({_placeholders(chunk)})", chunk):
+                found.append((word, _ids(blob)))
+        return found
+
+    def _patches(self, column, term_ids):
+        """Patch rows whose name_term or library_term is one of term_ids"""
+        rows = []
+        for chunk in _chunks(term_ids):
+            rows.extend(self.conn.execute(
+                "SELECT filename, brand, library, source, link, name_term, library_term "
+                f"FROM patches WHERE {column} IN ({_placeholders(chunk)})", chunk))
+        return rows
+
+    def _library_terms(self):
+        """Ids of the terms used as a brand/library name"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'library_terms'").fetchone()
+        return set(_ids(row[0])) if row is not None else set()
+
+    def _matching_terms(self, query_word):
+        """Ids of the terms with a word containing `query_word` (starting with it, for short words)"""
+        grams = _substring_trigrams(query_word)
+        postings = self._trigram_postings(grams)
+        if len(postings) < len(grams):
+            return set()
+        candidates = None
+        for posting in sorted(postings.values(), key=len):
+            candidates = set(posting) if candidates is None else candidates.intersection(posting)
+            if not candidates:
+                return set()
+
+        terms = set()
+        for word, term_ids in self._words(candidates):
+            if _word_matches(query_word, word):
+                terms.update(term_ids)
+        return terms
+
+    def _substring_hits(self, words, limit):
+        """
+        Patches where every query word occurs in the filename or the brand/library
+
+        A patch scores one point per query word, one more per word found in its name and
+        two more if the name is the whole query. The score only depends on the name, so
+        names are visited best first (then by term id) and only the patches of the names
+        needed to fill `limit` are loaded.
+        """
+        matching = [self._matching_terms(word) for word in words]
+        if not all(matching):
+            return []
+
+        scores = {}
+        for terms in matching:
+            for term in terms:
+                scores[term] = scores.get(term, 0) + 1
+        exact = self.conn.execute("SELECT id FROM terms WHERE text = ?", (' '.join(words),)).fetchone()
+        if exact is not None and exact[0] in scores:
+            scores[exact[0]] += 2
+        tiers = {}
+        for term, score in scores.items():
+            tiers.setdefault(score, []).append(term)
+
+        # Query words missing from a name must all be in the brand/library:
+        # {missing word indexes: library term ids with all of them}
+        library_terms = {}
+
+        def libraries_for(missing):
+            found = library_terms.get(missing)
+            if found is None:
+                if not library_terms:
+                    library_terms[()] = self._library_terms()
+                found = library_terms[missing] = library_terms[()].intersection(*(matching[i] for i in missing))
+            return found
+
+        hits = []
+        for score in sorted(tiers, reverse=True):
+            for batch in _chunks(sorted(tiers[score]), TERM_BATCH):
+                allowed = {}
+                for term in batch:
+                    missing = tuple(i for i, terms in enumerate(matching) if term not in terms)
+                    libraries = libraries_for(missing) if missing else None
+                    if libraries is None or libraries:
+                        allowed[term] = libraries
+
+                batch_hits = []
+                for filename, brand, library, source, link, name_term, library_term in \
+                        self._patches('name_term', allowed):
+                    libraries = allowed[name_term]
+                    if libraries is None or library_term in libraries:
+                        batch_hits.append((name_term, brand, library, filename,
+                                           Hit(len(words) + score, filename, brand, library, source, link)))
+                batch_hits.sort(key=lambda hit: hit[:4])
+                hits.extend(hit[-1] for hit in batch_hits)
+                if len(hits) >= limit:
+                    return hits[:limit]
+
+        # Every query word only in the brand/library
+        library_hits = []
+        for filename, brand, library, source, link, name_term, _ in \
+                self._patches('library_term', libraries_for(tuple(range(len(words))))):
+            if name_term not in scores:
+                library_hits.append(Hit(len(words), filename, brand, library, source, link))
+        library_hits.sort(key=lambda hit: (hit.brand, hit.library, hit.filename))
+        return (hits + library_hits)[:limit]
+
+    def _similar_words(self, query_word):
+        """Indexed words similar to `query_word` as [(similarity, array of term ids)]"""
+        query_grams = trigrams(query_word)
+        counts = {}
+        for posting in self._trigram_postings(query_grams).values():
+            for word_id in posting:
+                counts[word_id] = counts.get(word_id, 0) + 1
+
+        # Only words sharing enough trigrams can reach the threshold
+        minimum = math.ceil(FUZZY_THRESHOLD * len(query_grams))
+        candidates = [word_id for word_id, count in counts.items() if count >= minimum]
+        similar = []
+        for word, term_ids in self._words(candidates):
+            word_grams = trigrams(word)
+            shared = len(query_grams & word_grams)
+            similarity = shared / (len(query_grams) + len(word_grams) - shared)
+            if similarity >= FUZZY_THRESHOLD:
+                similar.append((similarity, term_ids))
+        return similar
+
+    def _fuzzy_hits(self, words, limit, exclude):
+        """
+        Patches whose filename or brand/library is similar to the query
+        Each query word is matched to its most similar word in a term (trigram
+        similarity); a term scores the average over the query words.
+        """
+        totals = {}
+        for query_word in words:
+            best = {}
+            for similarity, term_ids in self._similar_words(query_word):
+                for term in term_ids:
+                    if best.get(term, 0) < similarity:
+                        best[term] = similarity
+            for term, similarity in best.items():
+                totals[term] = totals.get(term, 0) + similarity
+        similar = sorted((-total / len(words), term) for term, total in totals.items()
+                         if total / len(words) >= FUZZY_THRESHOLD)
+
+        # Most similar terms first, until enough patches are found
+        hits = []
+        seen = set(exclude)
+        for batch in _chunks(similar, TERM_BATCH):
+            scores = {term: -negated for negated, term in batch}
+            batch_hits = []
+            for column in ('name_term', 'library_term'):
+                for filename, brand, library, source, link, name_term, library_term in \
+                        self._patches(column, scores):
+                    if source in seen:
+                        continue
+                    seen.add(source)
+                    score = max(scores.get(name_term, 0), scores.get(library_term, 0))
+                    batch_hits.append(Hit(score, filename, brand, library, source, link, fuzzy=True))
+            batch_hits.sort(key=lambda hit: (-hit.score, hit.brand, hit.library, hit.filename))
+            hits.extend(batch_hits)
+            if len(hits) >= limit:
+                break
+        return hits[:limit]
+
+    def search(self, query, limit=20):
+        """
+        Find patches matching a query
+        Substring hits (every word found in the filename, brand or library) come first,
+        ranked by how much of the query the filename matches; if there are fewer than
+        `limit`, fuzzy hits ranked by trigram similarity fill up the list.
+        Returns a list of Hit
+        """
+        words = normalize(query).split()
+        if not words:
+            return []
+
+        hits = self._substring_hits(words, limit)
+        if len(hits) < limit:
+            hits.extend(self._fuzzy_hits(words, limit - len(hits), {hit.source for hit in hits}))
+        return hits
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Linux inotify support for QuickLoad Instruments watch mode
+Thin ctypes wrapper around inotify plus a recursive tree watcher that keeps
+track of watch descriptors and stays within the system's watch limit
+"""
+
+import os
+import ctypes
+import errno
+import struct
+import logging
+
+# inotify event masks (from <sys/inotify.h>)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# Events that can add or remove Kontakt files below a directory
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+EVENT_HEADER = struct.Struct('iIII')
+MAX_USER_WATCHES_FILE = "/proc/sys/fs/inotify/max_user_watches"
+
+
+class Inotify:
+    """Minimal inotify binding"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        os.close(self.fd)
+
+    def add_watch(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        # Fails harmlessly if the kernel already dropped the watch
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Read all pending events as (wd, mask, cookie, name) tuples"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, cookie, name))
+        return events
+
+
+def max_user_watches():
+    """System-wide inotify watch limit for this user, or None if unknown"""
+    try:
+        with open(MAX_USER_WATCHES_FILE) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+class TreeWatcher:
+    """
+    Watches directory trees below a set of roots
+    Watches are added breadth-first so that, when the budget runs out, the brand and
+    library levels are still covered and only the deepest folders go unwatched.
+    """
+
+    def __init__(self, budget):
+        self.logger = logging.getLogger(__name__)
+        self.inotify = Inotify()
+        self.budget = budget
+        self.paths = {}   # wd -> (root, rel_path)
+        self.wds = {}     # absolute path -> wd
+        self.roots = {}   # root -> (prune_pattern, max_depth)
+        self.exhausted = False
+
+    def fileno(self):
+        return self.inotify.fileno()
+
+    def close(self):
+        self.inotify.close()
+
+    def _descend(self, root, name, depth):
+        prune_pattern, max_depth = self.roots[root]
+        if max_depth is not None and depth > max_depth:
+            return False
+        return prune_pattern is None or not prune_pattern.match(name.lower())
+
+    def _add_watch(self, root, rel_path):
+        path = os.path.join(root, rel_path) if rel_path else root
+        if path in self.wds:
+            return True
+        try:
+            wd = self.inotify.add_watch(path, WATCH_MASK)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                self._exhaust()
+            # ENOENT/ENOTDIR: the directory went away before we got to it
+            return False
+        self.paths[wd] = (root, rel_path)
+        self.wds[path] = wd
+        return True
+
+    def _exhaust(self):
+        # Warn once; watches freed by deleted folders can be reused later
+        if not self.exhausted:
+            self.exhausted = True
+            self.logger.warning(f"⚠️  inotify watch budget reached ({len(self.wds)} watches); "
+                                f"deeper folders are only picked up by the periodic rescan")
+
+    def add_tree(self, root, rel_path='', prune=(None, None)):
+        """Watch a directory and everything below it that passes the prune rules"""
+        if root not in self.roots:
+            self.roots[root] = prune
+        queue = [rel_path]
+        while queue:
+            next_queue = []
+            for rel_dir in queue:
+                if len(self.wds) >= self.budget:
+                    self._exhaust()
+                    return
+                if not self._add_watch(root, rel_dir):
+                    continue
+                depth = rel_dir.count(os.sep) + 1 if rel_dir else 0
+                try:
+                    with os.scandir(os.path.join(root, rel_dir) if rel_dir else root) as entries:
+                        for entry in entries:
+                            if (entry.is_dir(follow_symlinks=False)
+                                    and self._descend(root, entry.name, depth + 1)):
+                                next_queue.append(os.path.join(rel_dir, entry.name) if rel_dir else entry.name)
+                except OSError:
+                    pass
+            queue = next_queue
+
+    def remove_tree(self, path):
+        """Stop watching a directory and everything below it"""
+        prefix = path + os.sep
+        for watched in [p for p in self.wds if p == path or p.startswith(prefix)]:
+            wd = self.wds.pop(watched)
+            self.paths.pop(wd, None)
+            self.inotify.rm_watch(wd)
+
+    def is_watched(self, path):
+        return path in self.wds
+
+    def read_events(self):
+        """
+        Read pending events as (root, rel_path, mask) tuples, where rel_path is the path
+        of the affected entry relative to its root
+        New directories are watched and removed ones forgotten automatically. A queue
+        overflow is reported as (None, None, IN_Q_OVERFLOW): events were lost.
+        """
+        events = []
+        for wd, mask, _, name in self.inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, None, IN_Q_OVERFLOW))
+                continue
+
+            watched = self.paths.get(wd)
+            if watched is None:
+                continue
+            root, rel_dir = watched
+
+            if mask & IN_IGNORED:
+                # Watch removed by the kernel (directory deleted or unmounted)
+                path = os.path.join(root, rel_dir) if rel_dir else root
+                self.paths.pop(wd, None)
+                if self.wds.get(path) == wd:
+                    del self.wds[path]
+                continue
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_UNMOUNT):
+                # The parent directory reports the same change by name
+                if not rel_dir:
+                    events.append((root, rel_dir, mask))
+                continue
+
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+            if mask & IN_ISDIR:
+                depth = rel_path.count(os.sep) + 1
+                if mask & (IN_CREATE | IN_MOVED_TO) and self._descend(root, name, depth):
+                    self.add_tree(root, rel_path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.remove_tree(os.path.join(root, rel_path))
+            events.append((root, rel_path, mask))
+        return events
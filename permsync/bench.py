@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Benchmarks for permsync
+Generates allow lists, blacklists and project settings of configurable size, then times
+one sync of each with every implementation (the shell path of permsync.sh, engine.py, and
+engine.py when the fingerprints say nothing changed). Each run is a separate permsync.sh
+process on a fresh copy of the files; wall time, forks and whether the output matches the
+shell path's are recorded. Results are written as JSON tagged with the git commit, so runs
+can be compared across commits with --compare.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# shell: the jq/grep loop in permsync.sh, engine: engine.py forced to sync,
+# engine-unchanged: engine.py with fingerprints from a previous sync
+ENGINES = ['shell', 'engine', 'engine-unchanged']
+
+# Files an installation directory needs to run
+INSTALL_FILES = ['permsync.sh', 'engine.py']
+
+TOOLS = ['git', 'npm', 'yarn', 'pnpm', 'cargo', 'go', 'python3', 'pip', 'make', 'docker', 'kubectl',
+         'ls', 'cat', 'grep', 'find', 'rm', 'curl', 'npx', 'node', 'jq', 'sed', 'terraform', 'gh', 'sudo']
+SUBCOMMANDS = ['run', 'test', 'build', 'install', 'add', 'status', 'log', 'diff', 'exec', 'push', 'get',
+               'apply', 'clean', 'list', 'show', 'check']
+
+
+def _command(rng, i):
+    words = [rng.choice(TOOLS), rng.choice(SUBCOMMANDS)]
+    if rng.random() < 0.6:
+        words.append(f"target-{i}")
+    return ' '.join(words)
+
+
+def generate_rules(rng, count, start=0):
+    """`count` distinct permissions, mostly Bash rules with a few other tools mixed in"""
+    rules = []
+    for i in range(start, start + count):
+        roll = rng.random()
+        if roll < 0.05:
+            rules.append(f"Read(/src/project-{i}/**)")
+        elif roll < 0.4:
+            rules.append(f"Bash({_command(rng, i)}:*)")
+        else:
+            rules.append(f"Bash({_command(rng, i)} --flag-{i})")
+    return rules
+
+
+def generate_patterns(rng, count):
+    """`count` distinct blacklist patterns; most contain a * wildcard"""
+    patterns = set()
+    while len(patterns) < count:
+        tool, sub = rng.choice(TOOLS), rng.choice(SUBCOMMANDS)
+        patterns.add(rng.choice([
+            f"Bash({tool}:*)",
+            f"Bash({tool} {sub}:*)",
+            f"*{tool} {sub}*",
+            f"Bash({tool} {sub} target-{rng.randrange(10**6)}*",
+            f"Bash({tool} {sub} --flag-{rng.randrange(10**6)})",
+        ]))
+    return sorted(patterns)
+
+
+def generate_case(case_dir, rules, patterns, local_ratio, seed):
+    """
+    Write allowed.json, blacklist.json and a project's settings.local.json to case_dir
+    The project holds `local_ratio` * rules permissions, half of them already in
+    allowed.json and half new. Returns counts of what was generated.
+    """
+    rng = random.Random(seed)
+    allowed = generate_rules(rng, rules)
+    local_count = max(1, int(rules * local_ratio))
+    local = rng.sample(allowed, min(len(allowed), local_count // 2))
+    local += generate_rules(rng, local_count - len(local), start=rules)
+    rng.shuffle(local)
+
+    os.makedirs(os.path.join(case_dir, 'project', '.claude'))
+    _write_json(os.path.join(case_dir, 'allowed.json'), {"permissions": {"allow": allowed, "deny": []}})
+    _write_json(os.path.join(case_dir, 'blacklist.json'),
+                {"permissions": {"blacklist": generate_patterns(rng, patterns)}})
+    _write_json(os.path.join(case_dir, 'project', '.claude', 'settings.local.json'),
+                {"permissions": {"allow": local, "deny": []}})
+    return {'allowed': len(allowed), 'local': len(local), 'patterns': patterns}
+
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def count_forks():
+    """Processes created system-wide since boot (Linux only, None elsewhere)"""
+    try:
+        with open('/proc/stat') as f:
+            for line in f:
+                if line.startswith('processes '):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def prepare_run(case_dir, run_dir):
+    """A fresh installation directory and project with the case's files"""
+    if os.path.exists(run_dir):
+        shutil.rmtree(run_dir)
+    os.makedirs(run_dir)
+    for name in INSTALL_FILES:
+        shutil.copy2(os.path.join(SCRIPT_DIR, name), run_dir)
+    for name in ('allowed.json', 'blacklist.json'):
+        shutil.copy2(os.path.join(case_dir, name), run_dir)
+    shutil.copytree(os.path.join(case_dir, 'project'), os.path.join(run_dir, 'project'))
+
+
+def run_sync(run_dir, home, engine, timeout):
+    """
+    Run permsync.sh once in the run's project
+    Returns (seconds, forks, stdout); seconds is None if the run timed out
+    """
+    env = dict(os.environ, HOME=home, PERMSYNC_ENGINE='shell' if engine == 'shell' else 'python')
+    command = [os.path.join(run_dir, 'permsync.sh')]
+    if engine == 'engine':
+        command.append('--force')
+
+    forks_before = count_forks()
+    started = time.perf_counter()
+    try:
+        output = subprocess.run(command, cwd=os.path.join(run_dir, 'project'), env=env, stdin=subprocess.DEVNULL,
+                                capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None, None, None
+    seconds = time.perf_counter() - started
+    # The permsync.sh process itself is not one of its forks
+    forks = count_forks() - forks_before - 1 if forks_before is not None else None
+    if output.returncode != 0:
+        sys.stderr.write(output.stdout + output.stderr)
+        raise RuntimeError(f"{engine} sync failed in {run_dir}")
+    return seconds, forks, output.stdout.replace(run_dir, '<dir>')
+
+
+def _outputs(run_dir, stdout):
+    files = {}
+    for name in ('allowed.json', os.path.join('project', '.claude', 'settings.local.json')):
+        with open(os.path.join(run_dir, name), 'rb') as f:
+            files[name] = f.read()
+    return files, stdout
+
+
+def benchmark_case(workdir, case_dir, engines, repeat, timeout, shell_max_rules, rules):
+    """Run every engine `repeat` times on one case; returns {engine: measurements}"""
+    home = os.path.join(workdir, 'home')
+    results = {}
+    reference = None
+    for engine in engines:
+        if engine == 'shell' and rules > shell_max_rules:
+            results[engine] = {'skipped': f"more than --shell-max-rules ({shell_max_rules}) rules"}
+            continue
+
+        run_dir = os.path.join(workdir, 'run')
+        times, forks = [], []
+        outputs = None
+        for _ in range(repeat):
+            prepare_run(case_dir, run_dir)
+            if engine == 'engine-unchanged':
+                # A first sync records the fingerprints the measured run finds unchanged
+                run_sync(run_dir, home, 'engine', timeout)
+            seconds, fork_count, stdout = run_sync(run_dir, home, engine, timeout)
+            if seconds is None:
+                break
+            times.append(seconds)
+            forks.append(fork_count)
+            outputs = _outputs(run_dir, stdout)
+
+        if not times:
+            results[engine] = {'timeout': timeout}
+            continue
+        result = {
+            'seconds': round(statistics.median(times), 4),
+            'seconds_min': round(min(times), 4),
+            'runs': len(times),
+            'forks': forks[0] if None in forks else round(statistics.median(forks)),
+        }
+        if engine == 'engine-unchanged':
+            # Nothing is written, so there is no output to compare
+            pass
+        elif reference is None:
+            reference = (engine, outputs)
+        else:
+            result['equivalent_to'] = reference[0]
+            result['files_equal'] = outputs[0] == reference[1][0]
+            result['stdout_equal'] = outputs[1] == reference[1][1]
+        results[engine] = result
+    return results
+
+
+def git_revision():
+    """Short commit hash of the working tree, with a -dirty suffix for local changes"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no', '.'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if status else revision
+
+
+def run_benchmark(args, workdir):
+    """Generate a case per (rules, patterns) combination and time every engine on it"""
+    engines = list(args.engines)
+    if 'shell' in engines and not shutil.which('jq'):
+        print("⚠️  jq not found, skipping the shell path", file=sys.stderr)
+        engines.remove('shell')
+
+    # permsync.sh offers to install itself unless the wrapper exists
+    home = os.path.join(workdir, 'home')
+    os.makedirs(os.path.join(home, '.local', 'bin'), exist_ok=True)
+    open(os.path.join(home, '.local', 'bin', 'permsync'), 'a').close()
+
+    cases = []
+    for rules in args.rules:
+        for patterns in args.patterns:
+            case_dir = os.path.join(workdir, f"case-{rules}-{patterns}")
+            print(f"Running {rules} rules, {patterns} patterns...", file=sys.stderr)
+            generated = generate_case(case_dir, rules, patterns, args.local_ratio, args.seed)
+            engine_results = benchmark_case(workdir, case_dir, engines, args.repeat, args.timeout,
+                                            args.shell_max_rules, rules)
+            cases.append({'rules': rules, 'patterns': patterns, 'generated': generated, 'engines': engine_results})
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'local_ratio': args.local_ratio,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'cases': cases,
+    }
+
+
+def _change(old, new):
+    if not old or new is None:
+        return ""
+    return f"({(new - old) / old * 100:+.1f}%)"
+
+
+def print_summary(result, baseline=None, out=sys.stdout):
+    """Print a table of the runs, with changes relative to a baseline run"""
+    print(f"Revision {result['revision']}", file=out)
+    if baseline:
+        print(f"Compared with {baseline['revision']} ({baseline['timestamp']})", file=out)
+        if baseline['params'] != result['params']:
+            print("⚠️  Baseline was run with different parameters", file=out)
+    base_cases = {(case['rules'], case['patterns']): case['engines'] for case in (baseline or {}).get('cases', [])}
+
+    for case in result['cases']:
+        base_engines = base_cases.get((case['rules'], case['patterns']), {})
+        shell_seconds = case['engines'].get('shell', {}).get('seconds')
+        print(f"  {case['rules']} rules ({case['generated']['local']} local), {case['patterns']} patterns", file=out)
+        for engine, values in case['engines'].items():
+            if 'skipped' in values:
+                print(f"    {engine:17} skipped, {values['skipped']}", file=out)
+                continue
+            if 'timeout' in values:
+                print(f"    {engine:17} timed out after {values['timeout']}s", file=out)
+                continue
+            base = base_engines.get(engine, {})
+            speedup = f"{shell_seconds / values['seconds']:7.1f}x" if shell_seconds and engine != 'shell' else " " * 8
+            forks = values['forks'] if values['forks'] is not None else '?'
+            if 'files_equal' not in values:
+                equivalent = ""
+            elif values['files_equal'] and values['stdout_equal']:
+                equivalent = f"✓ same output as {values['equivalent_to']}"
+            else:
+                equivalent = f"❌ output differs from {values['equivalent_to']}"
+            print(f"    {engine:17} {values['seconds']:9.3f}s {_change(base.get('seconds'), values['seconds']):10} "
+                  f"{speedup} {forks:>7} forks  {equivalent}", file=out)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark permsync syncs on generated rule lists')
+    parser.add_argument('--rules', type=int, nargs='+', default=[100, 1000], metavar='N',
+                        help='allowed.json sizes to run (default: %(default)s)')
+    parser.add_argument('--patterns', type=int, nargs='+', default=[20], metavar='N',
+                        help='blacklist sizes to run (default: %(default)s)')
+    parser.add_argument('--local-ratio', type=float, default=0.25,
+                        help='project rules as a share of allowed.json, half of them new (default: %(default)s)')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES, metavar='ENGINE',
+                        help=f"implementations to run (default: all of {', '.join(ENGINES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='runs per engine and case (default: %(default)s)')
+    parser.add_argument('--shell-max-rules', type=int, default=1000,
+                        help='skip the shell path above this many rules, it forks per rule and pattern '
+                             '(default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds before a run is abandoned (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    parser.add_argument('--workdir', metavar='DIR', help='generate the files in DIR and keep them')
+    parser.add_argument('-o', '--output', metavar='FILE', help='write the JSON results to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare with the JSON results of an earlier run')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    if args.workdir:
+        if os.path.exists(args.workdir) and os.listdir(args.workdir):
+            print(f"❌ {args.workdir} is not empty", file=sys.stderr)
+            return 1
+        workdir = args.workdir
+        os.makedirs(workdir, exist_ok=True)
+    else:
+        workdir = tempfile.mkdtemp(prefix='permsync-bench-')
+    try:
+        result = run_benchmark(args, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+        print_summary(result, baseline)
+    else:
+        # Keep stdout clean JSON
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        print_summary(result, baseline, out=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
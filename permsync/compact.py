@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+permsync compact
+Finds allow rules that add nothing: rules covered by a broader Bash(cmd:*) rule, and
+rules the blacklist already rules out. Reports them and optionally rewrites
+allowed.json, blacklist.json and project settings without them.
+
+`Bash(cmd)` allows exactly `cmd` and `Bash(cmd:*)` every command starting with the
+words of `cmd`. Rules are compared word by word through a trie, so checking thousands
+of rules costs one walk per rule instead of comparing every pair.
+"""
+
+import argparse
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from engine import (DEFAULT_ALLOWED, DEFAULT_BLACKLIST, Blacklist, LockTimeout, dump_json, load_json, locked,
+                    read_rules, write_file)
+
+# Trie node key holding the rule that ends there (tokens never equal it)
+RULE = None
+
+
+def parse_rule(rule: str) -> Optional[Tuple[Tuple[str, ...], bool]]:
+    """
+    Parse a Bash permission into (words, is_prefix)
+    Returns None for anything outside the Bash(cmd) / Bash(cmd:*) grammar, e.g. other
+    tools or rules with wildcards elsewhere; those are never reported
+    """
+    if not (rule.startswith('Bash(') and rule.endswith(')')):
+        return None
+    command = rule[5:-1]
+    is_prefix = command.endswith(':*')
+    if is_prefix:
+        command = command[:-2]
+    if '*' in command:
+        return None
+    words = tuple(command.split())
+    if not words:
+        return None
+    return words, is_prefix
+
+
+class PrefixTrie:
+    """Word trie of Bash(cmd:*) rules"""
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def add(self, words: Tuple[str, ...], rule: str):
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault(RULE, rule)  # the first of equivalent rules wins
+
+    def covering(self, words: Tuple[str, ...]) -> Optional[str]:
+        """The broadest prefix rule that allows the command `words`, if any"""
+        node = self.root
+        if RULE in node:
+            return node[RULE]
+        for word in words:
+            node = node.get(word)
+            if node is None:
+                return None
+            if RULE in node:
+                return node[RULE]
+        return None
+
+
+def find_redundant(rules: List[str]) -> Dict[str, str]:
+    """
+    Rules allowed by another rule of the same list
+    Returns {rule: covering rule}; of equivalent rules (same words) the shortest is kept
+    """
+    parsed = {}
+    trie = PrefixTrie()
+    for rule in sorted(set(rules), key=_shortest_first):
+        words_prefix = parse_rule(rule)
+        if words_prefix is None:
+            continue
+        parsed[rule] = words_prefix
+        if words_prefix[1]:
+            trie.add(words_prefix[0], rule)
+
+    redundant = {}
+    exact = {}
+    for rule, (words, is_prefix) in parsed.items():
+        cover = trie.covering(words)
+        if cover is None and not is_prefix:
+            cover = exact.setdefault(words, rule)
+        if cover is not None and cover != rule:
+            redundant[rule] = cover
+    return redundant
+
+
+def find_shadowed(rules: List[str], blacklist_patterns: List[str]) -> Dict[str, str]:
+    """
+    Allow rules the blacklist rules out
+    Exactly the rules sync filters: those engine.Blacklist matches. Patterns are globs
+    over the whole rule, so `Bash(rm:*)` does not shadow `Bash(rm -rf /tmp)` (sync keeps
+    it) but `Bash(rm *)` does. Returns {rule: blacklist pattern}
+    """
+    patterns = [pattern for pattern in blacklist_patterns if pattern]
+    matcher = Blacklist(patterns)
+    globs = [(pattern, _glob_regex(pattern)) for pattern in patterns]
+
+    shadowed = {}
+    for rule in rules:
+        if matcher.matches(rule):
+            # Name the pattern only for the rules that match at all
+            shadowed[rule] = next(pattern for pattern, regex in globs if regex.fullmatch(rule))
+    return shadowed
+
+
+def _shortest_first(rule: str):
+    return len(rule), rule
+
+
+def _glob_regex(pattern: str):
+    return re.compile('.*'.join(re.escape(part) for part in pattern.split('*')), re.DOTALL)
+
+
+def find_redundant_patterns(patterns: List[str]) -> Dict[str, str]:
+    """
+    Blacklist patterns whose matches are all matched by another pattern
+    For `*`-only globs, B covers everything A matches exactly when B matches A with A's
+    stars replaced by a symbol only B's stars can match. Returns {pattern: broader pattern}
+    """
+    unique = sorted({pattern for pattern in patterns if pattern}, key=_shortest_first)
+    regexes = [(pattern, _glob_regex(pattern)) for pattern in unique]
+    redundant = {}
+    for pattern in unique:
+        probe = pattern.replace('*', '\0')
+        for other, regex in regexes:
+            if other == pattern or other in redundant:
+                continue
+            if regex.fullmatch(probe):
+                # Equivalent patterns cover each other: keep the shortest
+                if (_glob_regex(pattern).fullmatch(other.replace('*', '\0'))
+                        and _shortest_first(pattern) < _shortest_first(other)):
+                    continue
+                redundant[pattern] = other
+                break
+    return redundant
+
+
+def _string_list(data, key: str) -> List[str]:
+    permissions = data.get('permissions') if isinstance(data, dict) else None
+    values = permissions.get(key) if isinstance(permissions, dict) else None
+    if not isinstance(values, list):
+        return []
+    return [value for value in values if isinstance(value, str)]
+
+
+def _rewrite(path: str, data, key: str, removed: set) -> int:
+    """Drop the removed rules from one list of a JSON file, keeping everything else"""
+    values = data['permissions'][key]
+    kept = [value for value in values if not (isinstance(value, str) and value in removed)]
+    if len(kept) == len(values):
+        return 0
+    data['permissions'][key] = kept
+    write_file(path, dump_json(data))
+    return len(values) - len(kept)
+
+
+def _print_section(title: str, found: Dict[str, str], relation: str, limit: int):
+    print(f"{title}: {len(found)}")
+    for rule in sorted(found)[:limit]:
+        print(f"  {rule}  {relation} {found[rule]}")
+    if len(found) > limit:
+        print(f"  ... and {len(found) - limit} more")
+
+
+def compact(allowed_file: str, blacklist_file: str, settings_files: List[str], write: bool = False,
+            limit: int = 50) -> int:
+    """Report (and with `write`, remove) redundant and shadowed rules; returns the exit status"""
+    if not write:
+        return _compact(allowed_file, blacklist_file, settings_files, write, limit)
+    try:
+        with locked(allowed_file):
+            return _compact(allowed_file, blacklist_file, settings_files, write, limit)
+    except LockTimeout as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def _compact(allowed_file: str, blacklist_file: str, settings_files: List[str], write: bool, limit: int) -> int:
+    allowed_data, _ = read_rules(allowed_file, 'allow', DEFAULT_ALLOWED)
+    blacklist_data, _ = read_rules(blacklist_file, 'blacklist', DEFAULT_BLACKLIST)
+    if allowed_data is None or blacklist_data is None:
+        print("Error: Invalid JSON in allowed.json or blacklist.json", file=sys.stderr)
+        return 1
+
+    allowed = _string_list(allowed_data, 'allow')
+    patterns = _string_list(blacklist_data, 'blacklist')
+
+    shadowed = find_shadowed(allowed, patterns)
+    # A rule covered only by a shadowed rule is still in effect after sync, so the
+    # shadowed rules cannot cover anything
+    redundant = find_redundant([rule for rule in allowed if rule not in shadowed])
+    redundant_patterns = find_redundant_patterns(patterns)
+
+    print(f"Allowed rules: {len(allowed)}, blacklist patterns: {len(patterns)}")
+    print("")
+    _print_section("Covered by a broader allow rule", redundant, "⊂", limit)
+    print("")
+    _print_section("Shadowed by the blacklist", shadowed, "⊘", limit)
+    print("")
+    _print_section("Blacklist patterns covered by another pattern", redundant_patterns, "⊂", limit)
+
+    # Project settings keep blacklisted rules (see README), so only covered rules go
+    settings_redundant = {}
+    for settings_file in settings_files:
+        try:
+            data = load_json(settings_file)
+        except (OSError, ValueError):
+            print(f"Error: Invalid JSON in {settings_file}", file=sys.stderr)
+            continue
+        rules = _string_list(data, 'allow')
+        shadowed_here = find_shadowed(rules, patterns)
+        found = find_redundant([rule for rule in rules if rule not in shadowed_here])
+        settings_redundant[settings_file] = (data, found)
+        print("")
+        _print_section(f"Covered rules in {settings_file}", found, "⊂", limit)
+
+    total = (len(redundant) + len(shadowed) + len(redundant_patterns)
+             + sum(len(found) for _, found in settings_redundant.values()))
+    print("")
+    if not write:
+        if total:
+            print(f"Run `permsync compact --write` to remove {total} rules")
+        else:
+            print("✓ Nothing to compact")
+        return 0
+
+    removed = _rewrite(allowed_file, allowed_data, 'allow', set(redundant) | set(shadowed)) if allowed else 0
+    removed += _rewrite(blacklist_file, blacklist_data, 'blacklist', set(redundant_patterns)) if patterns else 0
+    for settings_file, (data, found) in settings_redundant.items():
+        if found:
+            removed += _rewrite(settings_file, data, 'allow', set(found))
+    print(f"✓ Removed {removed} rules")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and remove redundant permsync rules")
+    parser.add_argument('settings_files', nargs='*', help="project settings.local.json files to compact too")
+    parser.add_argument('--allowed', required=True, help="path of allowed.json")
+    parser.add_argument('--blacklist', required=True, help="path of blacklist.json")
+    parser.add_argument('--write', action='store_true', help="rewrite the files without the reported rules")
+    parser.add_argument('--limit', type=int, default=50, help="rules listed per section (default: 50)")
+    args = parser.parse_args()
+    return compact(args.allowed, args.blacklist, args.settings_files, write=args.write, limit=args.limit)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
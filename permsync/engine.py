@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+permsync sync engine
+Does what sync_permissions in permsync.sh does - union of the local and global allow
+lists, blacklist filtering, rewriting both files - in a single process. The output
+files are byte-identical to the jq/grep path; permsync.sh calls this when python3 is
+available (PERMSYNC_ENGINE=shell forces the shell path).
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import locale
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Default contents of missing files, as written by permsync.sh
+DEFAULT_ALLOWED = {"permissions": {"allow": [], "deny": []}}
+DEFAULT_BLACKLIST = {"permissions": {"blacklist": []}}
+
+# Fingerprints (size, mtime, content hash) of the files as left by the last sync of each
+# settings file. Bump FINGERPRINT_VERSION when the sync output changes.
+FINGERPRINT_FILE = os.path.expanduser("~/.permsync/fingerprints.json")
+FINGERPRINT_VERSION = 1
+
+# Directories never searched by sync-all (dependency trees, VCS data, build output);
+# other hidden directories are skipped as well, except .claude itself
+PRUNE_DIRS = {"node_modules", "venv", "__pycache__", "build", "dist", "target", "vendor", "Pods",
+              "DerivedData", "Library"}
+DISCOVERY_JOBS = 8
+
+# An mtime this close to when the fingerprint was taken may hide a same-size edit made
+# within the filesystem's timestamp granularity, so such files are hashed anyway
+RACY_MTIME_NS = 2 * 10**9
+
+# Every writer of allowed.json and blacklist.json (sync, sync-all, compact, manage.py and
+# the shell path through flock(1)) holds an exclusive flock on allowed.json.lock and
+# re-reads the files under it. Waiting longer than this (seconds) gives up.
+LOCK_TIMEOUT = float(os.environ.get('PERMSYNC_LOCK_TIMEOUT', 30))
+
+
+class LockTimeout(Exception):
+    """Another permsync process held the lock for longer than the timeout"""
+
+
+def _parse_number(text: str):
+    """Parse a JSON float the way jq 1.6 prints it (integral values without .0)"""
+    value = float(text)
+    if value.is_integer() and abs(value) < 1e17:
+        return int(value)
+    return value
+
+
+def load_json(path: str):
+    """Parse a JSON file; raises ValueError for invalid JSON (and OSError if unreadable)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return json.load(f, parse_float=_parse_number)
+
+
+def dump_json(data) -> str:
+    """Serialize like jq's default output: 2-space indent, raw UTF-8, trailing newline"""
+    # jq escapes DEL, json.dumps does not; it can only occur inside strings
+    return json.dumps(data, indent=2, ensure_ascii=False).replace('\x7f', '\\u007f') + '\n'
+
+
+def write_file(path: str, text: str):
+    """Write through a per-process temp file, fsync it and rename it into place"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def lock_path(allowed_file: str) -> str:
+    return f"{allowed_file}.lock"
+
+
+@contextmanager
+def locked(allowed_file: str, timeout: float = LOCK_TIMEOUT):
+    """
+    Hold the permsync lock for the duration of the block
+    Polls with short randomized sleeps, so parallel syncs queue up without waking in step;
+    raises LockTimeout after `timeout` seconds
+    The holder removes the lock file before releasing it, so a waiter that gets the lock
+    on a file no longer at the path starts over with the current one.
+    """
+    path = lock_path(allowed_file)
+    deadline = time.monotonic() + timeout
+    delay = 0.002
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"{path} is held by another permsync") from None
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, 0.05)
+            continue
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            current = None
+        held = os.fstat(fd)
+        if current and (current.st_dev, current.st_ino) == (held.st_dev, held.st_ino):
+            break
+        os.close(fd)
+    try:
+        yield
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        os.close(fd)  # releases the lock
+
+
+def jq_raw_lines(data, key: str) -> List[str]:
+    """
+    Lines printed by `jq -r '.permissions.<key>[]'`
+    Strings are printed raw (so embedded newlines split them), other values as JSON;
+    anything jq cannot iterate yields nothing
+    """
+    permissions = data.get('permissions') if isinstance(data, dict) else None
+    values = permissions.get(key) if isinstance(permissions, dict) else None
+    if isinstance(values, dict):
+        values = list(values.values())
+    if not isinstance(values, list):
+        return []
+    lines = []
+    for value in values:
+        text = value if isinstance(value, str) else dump_json(value)[:-1]
+        lines.extend(text.split('\n'))
+    return lines
+
+
+def sort_unique(lines: List[str]) -> List[str]:
+    """`sort -u`: collate with the current locale and keep the first of equal lines"""
+    result = []
+    last_key = None
+    for line in sorted(lines, key=locale.strxfrm):
+        key = locale.strxfrm(line)
+        if key != last_key:
+            result.append(line)
+            last_key = key
+    return result
+
+
+def bash_rules(lines: List[str]) -> List[str]:
+    """Only Bash(...) rules are synced (`grep -E '^Bash\\('`)"""
+    return [line for line in lines if line.startswith('Bash(')]
+
+
+class Blacklist:
+    """
+    All blacklist patterns compiled into one matcher
+    `*` matches any characters and everything else is literal, as in the shell's
+    sed/grep translation. Patterns without `*` are looked up in a set, the rest are
+    joined into a single anchored regex.
+    """
+
+    def __init__(self, patterns: List[str]):
+        patterns = [pattern for pattern in patterns if pattern]
+        self.exact = {pattern for pattern in patterns if '*' not in pattern}
+        wildcards = ['.*'.join(re.escape(part) for part in pattern.split('*'))
+                     for pattern in patterns if '*' in pattern]
+        self.regex = re.compile('(?:' + '|'.join(wildcards) + ')') if wildcards else None
+
+    def matches(self, permission: str) -> bool:
+        if permission in self.exact:
+            return True
+        return self.regex is not None and self.regex.fullmatch(permission) is not None
+
+
+def read_rules(path: str, key: str, default) -> Tuple[object, List[str]]:
+    """
+    Load allowed.json or blacklist.json, creating it with `default` if missing
+    Returns (data, lines); data is None if the file is not valid JSON, which callers
+    must report (see invalid_rule_files) instead of writing over the file
+    """
+    if not os.path.isfile(path):
+        write_file(path, dump_json(default))
+    try:
+        data = load_json(path)
+    except (OSError, ValueError):
+        return None, []
+    return data, jq_raw_lines(data, key)
+
+
+def invalid_rule_files(*files) -> bool:
+    """
+    Report every (path, data) pair read_rules could not parse; True if there was one
+    The shell's jq aborts on these, so nothing may be written: an empty allow list would
+    replace the user's whole global list, an empty blacklist would let anything in.
+    """
+    invalid = [path for path, data in files if data is None]
+    for path in invalid:
+        print(f"Error: Invalid JSON in {path}", file=sys.stderr)
+    return bool(invalid)
+
+
+def read_settings(path: str) -> Tuple[str, object, bool]:
+    """
+    Read a settings.local.json; returns (text, data, valid)
+    A blank file is valid with data None, as it is for `jq empty`
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    if not text.strip():
+        return text, None, True
+    try:
+        return text, json.loads(text, parse_float=_parse_number), True
+    except ValueError:
+        return text, None, False
+
+
+def merge_rules(allowed: List[str], local: List[str], blacklist: Blacklist):
+    """
+    Union the global and local allow lists and apply the blacklist
+    Returns (all_perms, filtered_allowed, new_from_local, skipped_blacklisted)
+    """
+    allowed_set = set(allowed)
+    new_from_local = []
+    skipped = []
+    for permission in local:
+        if permission not in allowed_set:
+            (skipped if blacklist.matches(permission) else new_from_local).append(permission)
+
+    all_perms = sort_unique(allowed + local)
+    filtered = [permission for permission in all_perms if not blacklist.matches(permission)]
+    return all_perms, filtered, new_from_local, skipped
+
+
+def update_allowed(data, filtered: List[str]) -> Optional[str]:
+    """allowed.json with `.permissions.allow` replaced, or None if jq would fail"""
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return None
+    permissions = data.get('permissions')
+    if permissions is None:
+        permissions = data['permissions'] = {}
+    elif not isinstance(permissions, dict):
+        return None
+    permissions['allow'] = filtered
+    return dump_json(data)
+
+
+def update_settings(data, all_perms: List[str]) -> Optional[str]:
+    """
+    settings.local.json with the merged allow list and the deny list kept
+    Returns None where the shell's jq update fails and leaves the file alone
+    """
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return None
+    permissions = data.get('permissions')
+    if permissions is None:
+        permissions = data['permissions'] = {}
+    elif not isinstance(permissions, dict):
+        return None
+    deny = permissions.get('deny')
+    if deny is None or deny is False:
+        deny = []
+    permissions['allow'] = all_perms
+    permissions['deny'] = deny
+    return dump_json(data)
+
+
+def print_report(settings_file: str, allowed_file: str, blacklist_file: str, all_perms: List[str],
+                 filtered: List[str], blacklist_lines: List[str], new_from_local: List[str],
+                 skipped: List[str]):
+    """Print the same summary as permsync.sh"""
+    print("✓ Synchronized permissions:")
+    print(f"  - Total permissions: {len(all_perms)}")
+    print(f"  - Allowed (after blacklist): {len(filtered)}")
+    print(f"  - Blacklisted: {len([line for line in blacklist_lines if line])}")
+    print(f"  - Local settings: {settings_file}")
+    print(f"  - Global allowed: {allowed_file}")
+    print(f"  - Blacklist: {blacklist_file}")
+
+    if new_from_local:
+        print("")
+        print("✅ New commands added to allowed from local project:")
+        for permission in new_from_local:
+            print(f"  + {permission}")
+
+    if skipped:
+        print("")
+        print("🚫 Commands skipped due to blacklist:")
+        for permission in skipped:
+            print(f"  ⊘ {permission}")
+
+
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def take_fingerprint(paths: List[str]) -> Dict:
+    """Size, mtime and content hash of each file, keyed by real path"""
+    files = {}
+    for path in paths:
+        st = os.stat(path)
+        files[os.path.realpath(path)] = [st.st_size, st.st_mtime_ns, file_digest(path)]
+    return {'version': FINGERPRINT_VERSION, 'taken_ns': time.time_ns(), 'files': files}
+
+
+def is_unchanged(fingerprint: Optional[Dict], paths: List[str]) -> bool:
+    """True if the files still match the fingerprint (same set, size and content)"""
+    if not fingerprint or fingerprint.get('version') != FINGERPRINT_VERSION:
+        return False
+    files = fingerprint['files']
+    if set(files) != {os.path.realpath(path) for path in paths}:
+        return False
+    for path, (size, mtime_ns, digest) in files.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns == mtime_ns and mtime_ns < fingerprint['taken_ns'] - RACY_MTIME_NS:
+            continue
+        try:
+            if file_digest(path) != digest:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def load_fingerprints(path: str) -> Dict:
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_fingerprints(path: str, updates: Dict):
+    """Store fingerprints by settings file; failures only cost a full sync next time"""
+    # A bare relative name (--fingerprints fp.json) has no dirname for makedirs
+    path = os.path.abspath(path)
+    fingerprints = load_fingerprints(path)
+    fingerprints.update(updates)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(fingerprints, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def sync(settings_file: str, allowed_file: str, blacklist_file: str, force: bool = False,
+         fingerprint_file: str = FINGERPRINT_FILE) -> int:
+    """
+    Synchronize one settings.local.json with the global files; returns the exit status
+    If none of the three files changed since the last sync of this settings file, nothing
+    is read or written (unless `force`)
+    """
+    paths = [allowed_file, blacklist_file, settings_file]
+    key = os.path.realpath(settings_file)
+    if not force and is_unchanged(load_fingerprints(fingerprint_file).get(key), paths):
+        print("✓ Permissions already in sync (use --force to sync anyway)")
+        return 0
+
+    # Reading under the lock makes the union include whatever a concurrent sync just wrote
+    try:
+        with locked(allowed_file):
+            return _sync_locked(settings_file, allowed_file, blacklist_file, fingerprint_file)
+    except LockTimeout as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def _sync_locked(settings_file: str, allowed_file: str, blacklist_file: str, fingerprint_file: str) -> int:
+    paths = [allowed_file, blacklist_file, settings_file]
+    key = os.path.realpath(settings_file)
+    allowed_data, allowed_lines = read_rules(allowed_file, 'allow', DEFAULT_ALLOWED)
+    blacklist_data, blacklist_lines = read_rules(blacklist_file, 'blacklist', DEFAULT_BLACKLIST)
+    if invalid_rule_files((allowed_file, allowed_data), (blacklist_file, blacklist_data)):
+        return 2
+
+    try:
+        settings_text, settings_data, settings_valid = read_settings(settings_file)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    allowed = sort_unique(bash_rules(allowed_lines))
+    local = sort_unique(bash_rules(jq_raw_lines(settings_data, 'allow')))
+    blacklist_lines = sort_unique(blacklist_lines)
+    blacklist = Blacklist(blacklist_lines)
+
+    all_perms, filtered, new_from_local, skipped = merge_rules(allowed, local, blacklist)
+
+    allowed_text = update_allowed(allowed_data, filtered)
+    if allowed_text is None:
+        print(f"Error: Invalid JSON in {allowed_file}", file=sys.stderr)
+        return 2
+    write_file(allowed_file, allowed_text)
+
+    if not settings_valid:
+        print(f"Error: Invalid JSON in {settings_file}")
+        print("Please fix the JSON syntax and try again.")
+        return 1
+
+    # An empty settings file passes the shell's validation but is never rewritten
+    if settings_text.strip():
+        settings_text = update_settings(settings_data, all_perms)
+        if settings_text is not None:
+            write_file(settings_file, settings_text)
+
+    print_report(settings_file, allowed_file, blacklist_file, all_perms, filtered, blacklist_lines,
+                 new_from_local, skipped)
+    save_fingerprints(fingerprint_file, {key: take_fingerprint(paths)})
+    return 0
+
+
+def _scan_for_settings(path: str) -> Tuple[Optional[str], List[str]]:
+    """List one directory: its .claude/settings.local.json (or None) and the subdirectories to search"""
+    settings_file = None
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                except OSError:
+                    continue
+                if entry.name == '.claude':
+                    candidate = os.path.join(entry.path, 'settings.local.json')
+                    if os.path.isfile(candidate):
+                        settings_file = candidate
+                elif not entry.name.startswith('.') and entry.name not in PRUNE_DIRS:
+                    subdirs.append(entry.path)
+    except OSError:
+        pass
+    return settings_file, subdirs
+
+
+def find_settings_files(root: str, jobs: int = DISCOVERY_JOBS) -> List[str]:
+    """
+    Find every .claude/settings.local.json below root
+    Directories are listed in parallel, each as soon as its parent has been listed;
+    symlinks are not followed and PRUNE_DIRS and hidden directories are skipped
+    """
+    found = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        pending = {executor.submit(_scan_for_settings, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                settings_file, subdirs = future.result()
+                if settings_file:
+                    found.append(settings_file)
+                pending.update(executor.submit(_scan_for_settings, subdir) for subdir in subdirs)
+    return sorted(found)
+
+
+def sync_all(root: str, allowed_file: str, blacklist_file: str, jobs: int = DISCOVERY_JOBS,
+             fingerprint_file: str = FINGERPRINT_FILE) -> int:
+    """
+    Synchronize every project below root with the global files in one pass
+    allowed.json receives the union of all projects (minus the blacklist) and every
+    project receives that union plus its own rules, which is what running `permsync` in
+    each project until nothing changes would produce. Each file is written at most once.
+    """
+    settings_files = find_settings_files(root, jobs)
+    print(f"Found {len(settings_files)} projects under {root}")
+    if not settings_files:
+        print(f"Error: No .claude/settings.local.json files found under {root}")
+        return 1
+
+    try:
+        with locked(allowed_file):
+            return _sync_all_locked(settings_files, allowed_file, blacklist_file, fingerprint_file)
+    except LockTimeout as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def _sync_all_locked(settings_files: List[str], allowed_file: str, blacklist_file: str,
+                     fingerprint_file: str) -> int:
+    allowed_data, allowed_lines = read_rules(allowed_file, 'allow', DEFAULT_ALLOWED)
+    blacklist_data, blacklist_lines = read_rules(blacklist_file, 'blacklist', DEFAULT_BLACKLIST)
+    # No project is touched either: they would all receive the truncated list
+    if invalid_rule_files((allowed_file, allowed_data), (blacklist_file, blacklist_data)):
+        return 2
+    allowed = sort_unique(bash_rules(allowed_lines))
+    blacklist_lines = sort_unique(blacklist_lines)
+    blacklist = Blacklist(blacklist_lines)
+
+    projects = []
+    invalid = []
+    for settings_file in settings_files:
+        try:
+            settings_text, settings_data, settings_valid = read_settings(settings_file)
+        except OSError:
+            settings_valid = False
+        if not settings_valid:
+            invalid.append(settings_file)
+            continue
+        local = sort_unique(bash_rules(jq_raw_lines(settings_data, 'allow')))
+        projects.append((settings_file, settings_text, settings_data, local))
+
+    all_perms = sort_unique(allowed + [permission for *_, local in projects for permission in local])
+    blocked = {permission for permission in all_perms if blacklist.matches(permission)}
+    filtered = [permission for permission in all_perms if permission not in blocked]
+
+    allowed_text = update_allowed(allowed_data, filtered)
+    if allowed_text is None:
+        print(f"Error: Invalid JSON in {allowed_file}", file=sys.stderr)
+        return 2
+    write_file(allowed_file, allowed_text)
+
+    allowed_set = set(allowed)
+    added_by = {}
+    report = []
+    fingerprints = {}
+    for settings_file, settings_text, settings_data, local in projects:
+        new_from_local = [permission for permission in local
+                          if permission not in allowed_set and permission not in blocked]
+        skipped = [permission for permission in local if permission not in allowed_set and permission in blocked]
+        for permission in new_from_local:
+            added_by.setdefault(permission, []).append(settings_file)
+
+        written = False
+        if settings_text.strip():
+            new_text = update_settings(settings_data, sort_unique(filtered + local))
+            if new_text is not None and new_text != settings_text:
+                write_file(settings_file, new_text)
+                written = True
+        report.append((settings_file, len(new_from_local), len(skipped), written))
+        fingerprints[os.path.realpath(settings_file)] = take_fingerprint(
+            [allowed_file, blacklist_file, settings_file])
+    save_fingerprints(fingerprint_file, fingerprints)
+
+    print("✓ Synchronized permissions:")
+    print(f"  - Projects: {len(projects)} ({sum(1 for *_, written in report if written)} updated)")
+    print(f"  - Total permissions: {len(all_perms)}")
+    print(f"  - Allowed (after blacklist): {len(filtered)}")
+    print(f"  - Blacklisted: {len([line for line in blacklist_lines if line])}")
+    print(f"  - Global allowed: {allowed_file}")
+    print(f"  - Blacklist: {blacklist_file}")
+
+    print("")
+    print("Per project (new to allowed / skipped by blacklist):")
+    for settings_file, new_count, skipped_count, written in report:
+        status = "updated" if written else "unchanged"
+        print(f"  +{new_count:<4} ⊘{skipped_count:<4} {status:<9} {settings_file}")
+
+    if added_by:
+        print("")
+        print("✅ New commands added to allowed:")
+        for permission in sort_unique(list(added_by)):
+            projects_text = ", ".join(os.path.dirname(os.path.dirname(path)) for path in added_by[permission])
+            print(f"  + {permission}  ({projects_text})")
+
+    if invalid:
+        print("")
+        print("❌ Skipped, invalid JSON:")
+        for settings_file in invalid:
+            print(f"  {settings_file}")
+        return 1
+    return 0
+
+
+def main():
+    try:
+        # Collate like `sort` does in the user's locale
+        locale.setlocale(locale.LC_COLLATE, '')
+    except locale.Error:
+        pass
+
+    parser = argparse.ArgumentParser(description="permsync sync engine")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sync_parser = commands.add_parser('sync', help="sync one settings.local.json with the global lists")
+    sync_parser.add_argument('settings_file')
+    sync_parser.add_argument('--allowed', required=True, help="path of allowed.json")
+    sync_parser.add_argument('--blacklist', required=True, help="path of blacklist.json")
+    sync_parser.add_argument('--force', action='store_true', help="sync even if nothing changed since the last run")
+    sync_parser.add_argument('--fingerprints', default=FINGERPRINT_FILE,
+                             help=f"fingerprint cache (default: {FINGERPRINT_FILE})")
+    sync_all_parser = commands.add_parser('sync-all', help="sync every project below a directory in one pass")
+    sync_all_parser.add_argument('root')
+    sync_all_parser.add_argument('--allowed', required=True, help="path of allowed.json")
+    sync_all_parser.add_argument('--blacklist', required=True, help="path of blacklist.json")
+    sync_all_parser.add_argument('-j', '--jobs', type=int, default=DISCOVERY_JOBS,
+                                 help=f"parallel directory listings (default: {DISCOVERY_JOBS})")
+    sync_all_parser.add_argument('--fingerprints', default=FINGERPRINT_FILE,
+                                 help=f"fingerprint cache (default: {FINGERPRINT_FILE})")
+    args = parser.parse_args()
+
+    if args.command == 'sync-all':
+        return sync_all(args.root, args.allowed, args.blacklist, jobs=args.jobs,
+                        fingerprint_file=args.fingerprints)
+    if args.command == 'sync':
+        return sync(args.settings_file, args.allowed, args.blacklist, force=args.force,
+                    fingerprint_file=args.fingerprints)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,65 +4,182 @@
 import json
 import os
 import sys
+import time
 import curses
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable
 from enum import Enum
 
+from engine import LOCK_TIMEOUT, LockTimeout, locked
+
+# Changes are written once no further edit happened for this long
+SAVE_DELAY = 0.5
+
 class Mode(Enum):
     ALLOWED = "allowed"
     BLACKLIST = "blacklist"
 
+class RuleFile:
+    """
+    In-memory copy of one rule list (allowed.json or blacklist.json)
+    The file is only parsed again when its mtime changes. Edits are kept in memory and
+    written atomically once no further edit happened for SAVE_DELAY seconds, merged with
+    whatever a concurrent permsync wrote in the meantime.
+    """
+    
+    def __init__(self, path: str, key: str, lock_file: str, extra: Optional[Dict] = None):
+        self.path = path
+        self.key = key
+        self.lock_file = lock_file  # allowed.json; its lock guards both rule files
+        self.extra = extra or {}  # other "permissions" fields written after the list
+        self.items: List[str] = []
+        self.base: List[str] = []  # items as last read from or written to the file
+        self.mtime_ns = None
+        self.last_edit = None  # time of the latest unsaved edit, None when everything is saved
+        self.version = 0  # bumped whenever items change
+        self._lowered = None
+    
+    @property
+    def dirty(self) -> bool:
+        return self.last_edit is not None
+    
+    def refresh(self):
+        """Reload the list if the file changed on disk (unsaved edits take precedence)"""
+        if self.dirty:
+            return
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns == self.mtime_ns:
+            return
+        self.mtime_ns = mtime_ns
+        self.items = self._read()
+        if self.items is None:
+            self.items = []
+        self.base = self.items
+        self._changed()
+    
+    def _read(self) -> Optional[List[str]]:
+        """The list as currently on disk, None if the file is missing or unreadable"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+                return sorted(data.get('permissions', {}).get(self.key, []))
+        except:
+            return None
+    
+    def set_items(self, items: Iterable[str]):
+        self.items = sorted(items)
+        self.last_edit = time.monotonic()
+        self._changed()
+    
+    def _changed(self):
+        self.version += 1
+        self._lowered = None
+    
+    def lowered(self) -> List[str]:
+        """Lowercased items for filtering, built once per version"""
+        if self._lowered is None:
+            self._lowered = [item.lower() for item in self.items]
+        return self._lowered
+    
+    def save_due(self, now: float) -> bool:
+        return self.dirty and now - self.last_edit >= SAVE_DELAY
+    
+    def save(self, timeout: float = 0.1) -> bool:
+        """
+        Write pending edits under the permsync lock: temp file, fsync, then rename
+        If the file changed since it was read, our additions and removals are applied to
+        the new contents (three-way merge) instead of overwriting them. Returns False if
+        the lock could not be taken; the edits stay pending.
+        """
+        if not self.dirty:
+            return True
+        try:
+            with locked(self.lock_file, timeout):
+                items = self.items
+                current = self._read()
+                if current is not None and current != self.base:
+                    added = set(self.items) - set(self.base)
+                    removed = set(self.base) - set(self.items)
+                    items = sorted((set(current) - removed) | added)
+                data = {"permissions": {self.key: items, **self.extra}}
+                tmp_path = f"{self.path}.tmp-{os.getpid()}"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f, indent=2)
+                    f.write('\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self.mtime_ns = os.stat(self.path).st_mtime_ns
+        except LockTimeout:
+            return False
+        self.last_edit = None
+        self.base = items
+        if items != self.items:
+            self.items = items
+            self._changed()
+        return True
+
 class PermsyncManager:
     def __init__(self):
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.allowed_file = os.path.join(self.script_dir, "allowed.json")
         self.blacklist_file = os.path.join(self.script_dir, "blacklist.json")
+        self.allowed = RuleFile(self.allowed_file, 'allow', self.allowed_file, {"deny": []})
+        self.blacklist = RuleFile(self.blacklist_file, 'blacklist', self.allowed_file)
         self.mode = Mode.ALLOWED
         self.selected_index = 0
+        self.selected_items = set()  # multi-selection (bulk mode), by value
         self.editing = False
         self.edit_buffer = ""
         self.adding_new = False
+        self.filtering = False  # typing a / filter
+        self.filter_query = ""
+        self._filter_cache = None  # (rule file, version, query, indices, items)
+        self._rows = {}  # y -> (x, text, attr) currently on screen
+        self._screen_size = None
+        self.page_size = 1
         
     def load_allowed(self) -> List[str]:
-        """Load allowed permissions from allowed.json"""
-        try:
-            with open(self.allowed_file, 'r') as f:
-                data = json.load(f)
-                return sorted(data.get('permissions', {}).get('allow', []))
-        except:
-            return []
+        """Allowed permissions from allowed.json (cached until the file changes)"""
+        self.allowed.refresh()
+        return self.allowed.items
     
     def load_blacklist(self) -> List[str]:
-        """Load blacklisted permissions from blacklist.json"""
-        try:
-            with open(self.blacklist_file, 'r') as f:
-                data = json.load(f)
-                return sorted(data.get('permissions', {}).get('blacklist', []))
-        except:
-            return []
+        """Blacklisted permissions from blacklist.json (cached until the file changes)"""
+        self.blacklist.refresh()
+        return self.blacklist.items
     
     def save_allowed(self, permissions: List[str]):
-        """Save allowed permissions to allowed.json"""
-        data = {
-            "permissions": {
-                "allow": sorted(permissions),
-                "deny": []
-            }
-        }
-        with open(self.allowed_file, 'w') as f:
-            json.dump(data, f, indent=2)
-            f.write('\n')
+        """Queue allowed permissions to be saved to allowed.json"""
+        self.allowed.set_items(permissions)
     
     def save_blacklist(self, permissions: List[str]):
-        """Save blacklisted permissions to blacklist.json"""
-        data = {
-            "permissions": {
-                "blacklist": sorted(permissions)
-            }
-        }
-        with open(self.blacklist_file, 'w') as f:
-            json.dump(data, f, indent=2)
-            f.write('\n')
+        """Queue blacklisted permissions to be saved to blacklist.json"""
+        self.blacklist.set_items(permissions)
+    
+    def save_pending(self, force: bool = False) -> bool:
+        """
+        Write the rule files whose edits are due (or all pending edits with `force`)
+        While another permsync holds the lock, due edits are retried on the next tick;
+        `force` waits up to LOCK_TIMEOUT. Returns False if edits are still pending.
+        """
+        now = time.monotonic()
+        saved = True
+        for rule_file in (self.allowed, self.blacklist):
+            if force or rule_file.save_due(now):
+                saved = rule_file.save(LOCK_TIMEOUT if force else 0.1) and saved
+        return saved
+    
+    def has_pending_save(self) -> bool:
+        return self.allowed.dirty or self.blacklist.dirty
+    
+    def current_file(self) -> RuleFile:
+        return self.allowed if self.mode == Mode.ALLOWED else self.blacklist
+    
+    def other_file(self) -> RuleFile:
+        return self.blacklist if self.mode == Mode.ALLOWED else self.allowed
     
     def get_current_list(self) -> List[str]:
         """Get the current list based on mode"""
@@ -71,27 +188,64 @@ class PermsyncManager:
         else:
             return self.load_blacklist()
     
-    def delete_item(self, index: int):
-        """Delete item at given index"""
+    def visible_items(self) -> List[str]:
+        """
+        The current list narrowed by the / filter
+        Every whitespace-separated word of the filter must occur in the rule (case-insensitive).
+        When the filter is extended, only the previous matches are checked again.
+        """
         items = self.get_current_list()
+        if not self.filter_query.strip():
+            return items
+        rule_file = self.current_file()
+        query = self.filter_query.lower()
+        candidates = range(len(items))
+        cache = self._filter_cache
+        if cache is not None and cache[0] is rule_file and cache[1] == rule_file.version:
+            if cache[2] == query:
+                return cache[4]
+            if query.startswith(cache[2]):
+                candidates = cache[3]
+        terms = query.split()
+        lowered = rule_file.lowered()
+        indices = [i for i in candidates if all(term in lowered[i] for term in terms)]
+        visible = [items[i] for i in indices]
+        self._filter_cache = (rule_file, rule_file.version, query, indices, visible)
+        return visible
+    
+    def target_items(self) -> List[str]:
+        """The multi-selection if there is one, else the item under the cursor"""
+        if self.selected_items:
+            return [item for item in self.get_current_list() if item in self.selected_items]
+        items = self.visible_items()
+        if 0 <= self.selected_index < len(items):
+            return [items[self.selected_index]]
+        return []
+    
+    def delete_items(self, values: List[str]):
+        """Delete several items from the current list with a single write"""
+        values = set(values)
+        items = self.get_current_list()
+        remaining = [item for item in items if item not in values]
+        if len(remaining) == len(items):
+            return False
+        self.current_file().set_items(remaining)
+        self.selected_items -= values
+        return True
+    
+    def delete_item(self, index: int):
+        """Delete item at given index of the visible list"""
+        items = self.visible_items()
         if 0 <= index < len(items):
-            del items[index]
-            if self.mode == Mode.ALLOWED:
-                self.save_allowed(items)
-            else:
-                self.save_blacklist(items)
-            return True
+            return self.delete_items([items[index]])
         return False
     
     def edit_item(self, index: int, new_value: str):
-        """Edit item at given index"""
-        items = self.get_current_list()
-        if 0 <= index < len(items):
-            items[index] = new_value
-            if self.mode == Mode.ALLOWED:
-                self.save_allowed(items)
-            else:
-                self.save_blacklist(items)
+        """Edit item at given index of the visible list"""
+        visible = self.visible_items()
+        if 0 <= index < len(visible):
+            items = [new_value if item == visible[index] else item for item in self.get_current_list()]
+            self.current_file().set_items(items)
             return True
         return False
     
@@ -99,89 +253,93 @@ class PermsyncManager:
         """Add new item to current list"""
         items = self.get_current_list()
         if value not in items:
-            items.append(value)
-            if self.mode == Mode.ALLOWED:
-                self.save_allowed(items)
-            else:
-                self.save_blacklist(items)
+            self.current_file().set_items(items + [value])
             return True
         return False
     
+    def toggle_blacklist_items(self, values: List[str]):
+        """Move several items between allowed and blacklist, one write per file"""
+        values = set(values)
+        source = self.current_file()
+        target = self.other_file()
+        self.get_current_list()
+        target.refresh()
+        moved = [item for item in source.items if item in values]
+        if not moved:
+            return False
+        source.set_items([item for item in source.items if item not in values])
+        target.set_items(set(target.items) | set(moved))
+        self.selected_items -= values
+        return True
+    
     def toggle_blacklist(self, index: int):
-        """Move item between allowed and blacklist"""
-        if self.mode == Mode.ALLOWED:
-            # Move from allowed to blacklist
-            allowed_items = self.load_allowed()
-            if 0 <= index < len(allowed_items):
-                item = allowed_items[index]
-                # Remove from allowed
-                del allowed_items[index]
-                self.save_allowed(allowed_items)
-                # Add to blacklist
-                blacklist_items = self.load_blacklist()
-                if item not in blacklist_items:
-                    blacklist_items.append(item)
-                    self.save_blacklist(blacklist_items)
-                return True
-        else:
-            # Move from blacklist to allowed
-            blacklist_items = self.load_blacklist()
-            if 0 <= index < len(blacklist_items):
-                item = blacklist_items[index]
-                # Remove from blacklist
-                del blacklist_items[index]
-                self.save_blacklist(blacklist_items)
-                # Add to allowed
-                allowed_items = self.load_allowed()
-                if item not in allowed_items:
-                    allowed_items.append(item)
-                    self.save_allowed(allowed_items)
-                return True
+        """Move item at given index of the visible list between allowed and blacklist"""
+        items = self.visible_items()
+        if 0 <= index < len(items):
+            return self.toggle_blacklist_items([items[index]])
         return False
     
+    def confirm(self, stdscr, message: str) -> bool:
+        """Ask a y/n question on the last line"""
+        height, width = stdscr.getmaxyx()
+        stdscr.addstr(height - 1, 0, (message + " " * width)[:width - 1])
+        self._rows.pop(height - 1, None)  # drawn outside draw_screen
+        stdscr.refresh()
+        stdscr.timeout(-1)  # wait for the answer even while a save is pending
+        answer = stdscr.getch()
+        return answer == ord('y') or answer == ord('Y')
+    
     def draw_screen(self, stdscr):
-        """Draw the main screen"""
-        curses.curs_set(0)  # Hide cursor
-        stdscr.clear()
+        """
+        Draw the main screen
+        Only rows whose content changed since the last call are rewritten, and the terminal
+        is updated once through noutrefresh/doupdate, so a key press costs a few rows of
+        output instead of a full repaint.
+        """
         height, width = stdscr.getmaxyx()
+        if (height, width) != self._screen_size:
+            # New or resized terminal: start from a blank screen
+            stdscr.clear()
+            self._rows = {}
+            self._screen_size = (height, width)
+        rows = {}
         
         # Title
         title = f"Permsync Manager - {self.mode.value.capitalize()} Rules"
-        stdscr.addstr(0, (width - len(title)) // 2, title, curses.A_BOLD)
+        rows[0] = (max(0, (width - len(title)) // 2), title, curses.A_BOLD)
         
         # Instructions
-        instructions = [
-            "↑/↓: Navigate | TAB: Switch mode | a: Add | e: Edit | d: Delete | b: Toggle Blacklist | q: Quit",
-            ""
-        ]
-        for i, inst in enumerate(instructions):
-            if i + 1 < height:
-                stdscr.addstr(i + 1, 0, inst[:width-1])
+        rows[1] = (0, "↑/↓/PgUp/PgDn/Home/End: Navigate | /: Filter | Space: Select | TAB: Switch mode | "
+                      "a: Add | e: Edit | d: Delete | b: Toggle Blacklist | q: Quit", 0)
         
         # Get current list
-        items = self.get_current_list()
+        items = self.visible_items()
+        total = len(self.get_current_list())
         
         # Status line
         status_y = 3
-        if self.adding_new:
-            prompt = "New permission: "
-            stdscr.addstr(status_y, 0, prompt)
-            stdscr.addstr(status_y, len(prompt), self.edit_buffer)
-            curses.curs_set(1)  # Show cursor when editing
-            stdscr.move(status_y, len(prompt) + len(self.edit_buffer))
-        elif self.editing:
-            prompt = "Edit permission: "
-            stdscr.addstr(status_y, 0, prompt)
-            stdscr.addstr(status_y, len(prompt), self.edit_buffer)
-            curses.curs_set(1)  # Show cursor when editing
-            stdscr.move(status_y, len(prompt) + len(self.edit_buffer))
+        cursor_x = None
+        if self.adding_new or self.editing or self.filtering:
+            if self.adding_new:
+                prompt = "New permission: "
+            elif self.editing:
+                prompt = "Edit permission: "
+            else:
+                prompt = "Filter: "
+            rows[status_y] = (0, prompt + self.edit_buffer, 0)
+            cursor_x = len(prompt) + len(self.edit_buffer)
         else:
-            status = f"Total: {len(items)} items"
-            stdscr.addstr(status_y, 0, status)
+            status = f"Total: {total} items"
+            if self.filter_query.strip():
+                status += f" | {len(items)} match '{self.filter_query}' (/ to change, Esc clears)"
+            if self.selected_items:
+                status += f" | {len(self.selected_items)} selected (d/b apply to all, Esc clears)"
+            rows[status_y] = (0, status, 0)
         
         # List items
         list_start_y = 5
-        max_items = height - list_start_y - 2
+        max_items = max(1, height - list_start_y - 2)
+        self.page_size = max_items
         
         # Calculate scroll position
         if len(items) > max_items:
@@ -194,7 +352,7 @@ class PermsyncManager:
         else:
             start_idx = 0
         
-        # Draw items
+        # Only the rows in view are drawn, however long the list is
         for i in range(max_items):
             y = list_start_y + i
             if y >= height - 1:
@@ -206,24 +364,56 @@ class PermsyncManager:
                 if len(item) > width - 5:
                     item = item[:width-8] + "..."
                 
+                mark = "*" if items[idx] in self.selected_items else " "
                 if idx == self.selected_index:
-                    stdscr.addstr(y, 2, f"> {item}", curses.A_REVERSE)
+                    rows[y] = (1, f"{mark}> {item}", curses.A_REVERSE)
                 else:
-                    stdscr.addstr(y, 4, item)
+                    rows[y] = (1, f"{mark}  {item}", 0)
         
         # Scroll indicators
         if start_idx > 0:
-            stdscr.addstr(list_start_y - 1, width // 2, "↑ More above ↑")
+            rows[list_start_y - 1] = (width // 2, "↑ More above ↑", 0)
         if start_idx + max_items < len(items):
-            stdscr.addstr(height - 2, width // 2 - 6, "↓ More below ↓")
+            rows[height - 2] = (max(0, width // 2 - 6), "↓ More below ↓", 0)
         
-        stdscr.refresh()
+        for y in range(height):
+            row = rows.get(y, (0, "", 0))
+            if self._rows.get(y) == row:
+                continue
+            x, text, attr = row
+            stdscr.move(y, 0)
+            stdscr.clrtoeol()
+            text = text[:max(0, width - 1 - x)]
+            if text:
+                stdscr.addstr(y, x, text, attr)
+            self._rows[y] = row
+        
+        if cursor_x is not None:
+            curses.curs_set(1)  # Show cursor when editing
+            stdscr.move(status_y, min(cursor_x, width - 1))
+        else:
+            curses.curs_set(0)  # Hide cursor
+        stdscr.noutrefresh()
+        curses.doupdate()
     
     def handle_input(self, stdscr, key):
         """Handle keyboard input"""
-        items = self.get_current_list()
+        items = self.visible_items()
         
-        if self.editing or self.adding_new:
+        if self.filtering:
+            # The list narrows on every key; Enter keeps the filter, Escape drops it
+            if key == ord('\n'):
+                self.filtering = False
+            elif key == 27:
+                self.filtering = False
+                self.filter_query = ""
+            elif key == curses.KEY_BACKSPACE or key == 127:
+                self.filter_query = self.filter_query[:-1]
+            elif 32 <= key <= 126:
+                self.filter_query += chr(key)
+            self.edit_buffer = self.filter_query if self.filtering else ""
+            self.selected_index = 0
+        elif self.editing or self.adding_new:
             if key == ord('\n'):  # Enter - save
                 if self.adding_new:
                     if self.edit_buffer.strip():
@@ -254,9 +444,37 @@ class PermsyncManager:
             elif key == curses.KEY_DOWN:
                 if self.selected_index < len(items) - 1:
                     self.selected_index += 1
+            elif key == curses.KEY_PPAGE:
+                self.selected_index = max(0, self.selected_index - self.page_size)
+            elif key == curses.KEY_NPAGE:
+                self.selected_index = max(0, min(len(items) - 1, self.selected_index + self.page_size))
+            elif key == curses.KEY_HOME:
+                self.selected_index = 0
+            elif key == curses.KEY_END:
+                self.selected_index = max(0, len(items) - 1)
+            elif key == ord('/'):  # Filter
+                self.filtering = True
+                self.edit_buffer = self.filter_query
+            elif key == ord(' '):  # Space - select for bulk delete/toggle
+                if items and 0 <= self.selected_index < len(items):
+                    item = items[self.selected_index]
+                    if item in self.selected_items:
+                        self.selected_items.discard(item)
+                    else:
+                        self.selected_items.add(item)
+                    if self.selected_index < len(items) - 1:
+                        self.selected_index += 1
+            elif key == 27:  # Escape - clear selection, then the filter
+                if self.selected_items:
+                    self.selected_items.clear()
+                else:
+                    self.filter_query = ""
+                    self.selected_index = 0
             elif key == ord('\t'):  # Tab - switch mode
                 self.mode = Mode.BLACKLIST if self.mode == Mode.ALLOWED else Mode.ALLOWED
                 self.selected_index = 0
+                self.selected_items.clear()
+                self.filter_query = ""
             elif key == ord('a') or key == ord('A'):  # Add new
                 self.adding_new = True
                 self.edit_buffer = ""
@@ -265,32 +483,28 @@ class PermsyncManager:
                     self.editing = True
                     self.edit_buffer = items[self.selected_index]
             elif key == ord('d') or key == ord('D'):  # Delete
-                if items and 0 <= self.selected_index < len(items):
+                targets = self.target_items()
+                if targets:
                     # Confirm deletion
-                    height, width = stdscr.getmaxyx()
-                    confirm_msg = "Delete this item? (y/n)"
-                    stdscr.addstr(height - 1, 0, confirm_msg)
-                    stdscr.refresh()
-                    confirm = stdscr.getch()
-                    if confirm == ord('y') or confirm == ord('Y'):
-                        self.delete_item(self.selected_index)
-                        if self.selected_index >= len(self.get_current_list()) and self.selected_index > 0:
-                            self.selected_index -= 1
+                    if len(targets) == 1:
+                        confirm_msg = "Delete this item? (y/n)"
+                    else:
+                        confirm_msg = f"Delete {len(targets)} selected items? (y/n)"
+                    if self.confirm(stdscr, confirm_msg):
+                        self.delete_items(targets)
+                        self.selected_index = max(0, min(self.selected_index, len(self.visible_items()) - 1))
             elif key == ord('b') or key == ord('B'):  # Toggle blacklist
-                if items and 0 <= self.selected_index < len(items):
+                targets = self.target_items()
+                if targets:
                     # Confirm toggle
-                    height, width = stdscr.getmaxyx()
+                    count = "" if len(targets) == 1 else f" {len(targets)} selected items"
                     if self.mode == Mode.ALLOWED:
-                        confirm_msg = "Move to blacklist? (y/n)"
+                        confirm_msg = f"Move{count} to blacklist? (y/n)"
                     else:
-                        confirm_msg = "Remove from blacklist and allow? (y/n)"
-                    stdscr.addstr(height - 1, 0, confirm_msg + " " * (width - len(confirm_msg) - 1))
-                    stdscr.refresh()
-                    confirm = stdscr.getch()
-                    if confirm == ord('y') or confirm == ord('Y'):
-                        self.toggle_blacklist(self.selected_index)
-                        if self.selected_index >= len(self.get_current_list()) and self.selected_index > 0:
-                            self.selected_index -= 1
+                        confirm_msg = f"Remove{count} from blacklist and allow? (y/n)"
+                    if self.confirm(stdscr, confirm_msg):
+                        self.toggle_blacklist_items(targets)
+                        self.selected_index = max(0, min(self.selected_index, len(self.visible_items()) - 1))
         
         return True
     
@@ -301,14 +515,29 @@ class PermsyncManager:
             curses.start_color()
             curses.use_default_colors()
             
-            # Main loop
-            while True:
-                self.draw_screen(stdscr)
-                key = stdscr.getch()
-                if not self.handle_input(stdscr, key):
-                    break
+            # Main loop; while edits are pending, getch times out so they get saved
+            try:
+                while True:
+                    self.draw_screen(stdscr)
+                    stdscr.timeout(int(SAVE_DELAY * 1000) if self.has_pending_save() else -1)
+                    key = stdscr.getch()
+                    self.save_pending()
+                    if key == -1:
+                        continue
+                    if key == curses.KEY_RESIZE:
+                        self._screen_size = None
+                        continue
+                    if not self.handle_input(stdscr, key):
+                        break
+            finally:
+                if not self.save_pending(force=True):
+                    self.save_failed = True
         
+        self.save_failed = False
         curses.wrapper(main)
+        if self.save_failed:
+            print(f"❌ Could not save changes: {self.allowed_file}.lock is held by another permsync", file=sys.stderr)
+            sys.exit(1)
 
 def main():
     manager = PermsyncManager()
@@ -3,11 +3,21 @@
 
 set -e
 
+# Temp files of this run (<file>.tmp.<pid>); other runs may be writing theirs right now
+TMP_FILES=()
+# Lock file this run holds (see acquire_lock)
+LOCK_FILE=""
+
 # Cleanup function
 cleanup() {
-    rm -f /tmp/permsync.*.tmp 2>/dev/null
-    # Clean up any tmp files in current directory
-    find . -name "*.json.tmp*" -type f -delete 2>/dev/null || true
+    if [ ${#TMP_FILES[@]} -gt 0 ]; then
+        rm -f "${TMP_FILES[@]}" 2>/dev/null
+    fi
+    # Removed while still held; fd 9 closes, and the lock is released, when we exit
+    if [ -n "$LOCK_FILE" ]; then
+        rm -f "$LOCK_FILE" 2>/dev/null
+    fi
+    return 0
 }
 
 # Set trap to cleanup on exit
@@ -145,6 +155,36 @@ find_settings_file() {
     return 1
 }
 
+# Take the lock shared with engine.py and manage.py (flock on allowed.json.lock) before
+# reading anything, so concurrent syncs see each other's writes. Held until exit.
+# The holder removes the lock file on exit, so a waiter that got the lock on a file
+# no longer at the path starts over with the current one.
+acquire_lock() {
+    if ! command -v flock &> /dev/null; then
+        echo "⚠️  flock not found, concurrent permsync runs may lose updates" >&2
+        return 0
+    fi
+    local deadline=$((SECONDS + ${PERMSYNC_LOCK_TIMEOUT:-30}))
+    while true; do
+        exec 9>>"$ALLOWED_FILE.lock"
+        if ! flock -w "$((deadline > SECONDS ? deadline - SECONDS : 0))" 9; then
+            echo "Error: $ALLOWED_FILE.lock is held by another permsync" >&2
+            exit 1
+        fi
+        if [ /dev/fd/9 -ef "$ALLOWED_FILE.lock" ]; then
+            LOCK_FILE="$ALLOWED_FILE.lock"
+            return 0
+        fi
+        exec 9>&-
+    done
+}
+
+# Flush a written temp file to disk and rename it over the target
+commit_file() {
+    sync "$1" 2>/dev/null || true
+    mv "$1" "$2"
+}
+
 # Read permissions from allowed.json
 read_allowed_permissions() {
     if [[ ! -f "$ALLOWED_FILE" ]]; then
@@ -180,15 +220,25 @@ write_allowed_permissions() {
     done <<< "$perms"
     
     # Update allowed.json
-    jq --argjson perms "$json_array" '.permissions.allow = $perms' "$ALLOWED_FILE" > "$ALLOWED_FILE.tmp" && mv "$ALLOWED_FILE.tmp" "$ALLOWED_FILE"
+    local tmp="$ALLOWED_FILE.tmp.$$"
+    TMP_FILES+=("$tmp")
+    jq --argjson perms "$json_array" '.permissions.allow = $perms' "$ALLOWED_FILE" > "$tmp" && commit_file "$tmp" "$ALLOWED_FILE"
 }
 
 # Main sync function
 sync_permissions() {
     local settings_file="$1"
+    local force="$2"
     
-    # Clean up any leftover tmp files first
-    rm -f "$settings_file.tmp" "$settings_file.tmp2" "$ALLOWED_FILE.tmp" 2>/dev/null
+    # The Python engine does the same sync in one process instead of forking per rule;
+    # PERMSYNC_ENGINE=shell forces the jq/grep implementation below
+    if [[ "${PERMSYNC_ENGINE:-}" != "shell" ]] && [[ -f "$ROOT_INSTALL_DIR/engine.py" ]] && command -v python3 &> /dev/null; then
+        python3 "$ROOT_INSTALL_DIR/engine.py" sync --allowed "$ALLOWED_FILE" --blacklist "$BLACKLIST_FILE" \
+            ${force:+--force} "$settings_file"
+        return
+    fi
+    
+    acquire_lock
     
     # Read permissions from all files
     local allowed_perms=$(read_allowed_permissions)
@@ -297,8 +347,10 @@ sync_permissions() {
     perms_array="${perms_array}]"
     
     # Update settings file preserving deny list and other fields
+    local settings_tmp="$settings_file.tmp.$$"
+    TMP_FILES+=("$settings_tmp")
     echo "$current_json" | jq --argjson allow "$perms_array" --argjson deny "$deny_list" \
-        '.permissions.allow = $allow | .permissions.deny = $deny' > "$settings_file.tmp" && mv "$settings_file.tmp" "$settings_file"
+        '.permissions.allow = $allow | .permissions.deny = $deny' > "$settings_tmp" && commit_file "$settings_tmp" "$settings_file"
     
     echo "✓ Synchronized permissions:"
     echo "  - Total permissions: $(echo "$all_perms" | grep -v '^$' | wc -l | tr -d ' ')"
@@ -333,11 +385,17 @@ sync_permissions() {
 
 # Main execution
 main() {
+    # --force skips the fingerprint check and always syncs
+    local force=""
+    if [ "$1" = "--force" ]; then
+        force=1
+    fi
+    
     echo "Scanning for .claude/settings.local.json..."
     
     if settings_file=$(find_settings_file); then
         echo "Found: $settings_file"
-        sync_permissions "$settings_file"
+        sync_permissions "$settings_file" "$force"
     else
         echo "Error: No .claude/settings.local.json file found in current directory or parent directories"
         exit 1
@@ -358,4 +416,37 @@ if [ "$1" = "manage" ]; then
     exit 0
 fi
 
+# Handle sync-all command
+if [ "$1" = "sync-all" ]; then
+    if ! command -v python3 &> /dev/null; then
+        echo "Error: Python 3 is required for sync-all"
+        exit 1
+    fi
+
+    if [ -z "$2" ] || [ ! -d "$2" ]; then
+        echo "Usage: permsync sync-all ROOT"
+        exit 1
+    fi
+
+    python3 "$ROOT_INSTALL_DIR/engine.py" sync-all --allowed "$ALLOWED_FILE" --blacklist "$BLACKLIST_FILE" "$2"
+    exit $?
+fi
+
+# Handle compact command
+if [ "$1" = "compact" ]; then
+    if ! command -v python3 &> /dev/null; then
+        echo "Error: Python 3 is required for compact"
+        exit 1
+    fi
+
+    # The nearest project's settings are compacted along with the global lists
+    compact_args=()
+    if settings_file=$(find_settings_file); then
+        compact_args+=("$settings_file")
+    fi
+
+    python3 "$ROOT_INSTALL_DIR/compact.py" --allowed "$ALLOWED_FILE" --blacklist "$BLACKLIST_FILE" "${@:2}" "${compact_args[@]}"
+    exit $?
+fi
+
 main "$@"
\ No newline at end of file
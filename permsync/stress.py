@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Stress test for concurrent permsync runs
+Starts many `permsync.sh --force` processes at once, each in its own project with one rule
+nobody else has, all sharing one allowed.json in a temp installation. Afterwards
+allowed.json must be valid JSON holding every project's rule, every project must have
+received the rules synced before it, and no temp files (<file>.tmp.<pid>) or lock file
+may be left behind. Exits 1 if any check fails.
+
+    ./stress.py                        # 50 runs with each engine
+    ./stress.py --runs 200 --engines python
+"""
+
+import os
+import sys
+import json
+import glob
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTALL_FILES = ['permsync.sh', 'engine.py']
+ENGINES = ['shell', 'python']
+
+SEED_RULE = 'Bash(ls:*)'
+BLACKLISTED_RULE = 'Bash(rm -rf /tmp/stress)'
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def project_rule(i):
+    return f"Bash(stress-{i:04d}:*)"
+
+
+def prepare(workdir, runs):
+    """An installation with allowed.json and blacklist.json, a HOME and `runs` projects"""
+    install = os.path.join(workdir, 'install')
+    os.makedirs(install)
+    for name in INSTALL_FILES:
+        shutil.copy2(os.path.join(SCRIPT_DIR, name), install)
+    _write_json(os.path.join(install, 'allowed.json'), {'permissions': {'allow': [SEED_RULE], 'deny': []}})
+    _write_json(os.path.join(install, 'blacklist.json'), {'permissions': {'blacklist': ['Bash(rm *)']}})
+
+    # Without the installed wrapper permsync.sh asks to install itself
+    home = os.path.join(workdir, 'home')
+    os.makedirs(os.path.join(home, '.local', 'bin'))
+    open(os.path.join(home, '.local', 'bin', 'permsync'), 'a').close()
+
+    projects = []
+    for i in range(runs):
+        project = os.path.join(workdir, 'projects', f"p{i:04d}")
+        allow = [project_rule(i)] + ([BLACKLISTED_RULE] if i == 0 else [])
+        _write_json(os.path.join(project, '.claude', 'settings.local.json'), {'permissions': {'allow': allow, 'deny': []}})
+        projects.append(project)
+    return install, home, projects
+
+
+def run_concurrently(install, home, projects, engine, timeout, lock_timeout):
+    """Start one sync per project at once; returns [(project, returncode, output)]"""
+    env = dict(os.environ, HOME=home, PERMSYNC_ENGINE=engine, PERMSYNC_LOCK_TIMEOUT=str(lock_timeout))
+    command = [os.path.join(install, 'permsync.sh'), '--force']
+    processes = [(project, subprocess.Popen(command, cwd=project, env=env, stdin=subprocess.DEVNULL,
+                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True))
+                 for project in projects]
+    results = []
+    for project, process in processes:
+        try:
+            output, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            output, _ = process.communicate()
+            output += f"\n(killed after {timeout}s)"
+        results.append((project, process.returncode, output))
+    return results
+
+
+def leftovers(install, home, projects):
+    """Temp and lock files left next to the synced files and the fingerprints"""
+    directories = [install, os.path.join(home, '.permsync')] + [os.path.join(project, '.claude') for project in projects]
+    found = []
+    for directory in directories:
+        for pattern in ('*.tmp.*', '*.tmp-*', '*.lock'):
+            found.extend(glob.glob(os.path.join(directory, pattern)))
+    return sorted(found)
+
+
+def check(install, home, projects, results):
+    """Print a line per check; returns the number of failed checks"""
+    failures = 0
+
+    def report(ok, message, details=()):
+        nonlocal failures
+        print(f"  {'✓' if ok else '❌'} {message}")
+        for line in list(details)[:5]:
+            print(f"      {line}")
+        failures += not ok
+
+    failed = [(project, code, output) for project, code, output in results if code != 0]
+    report(not failed, f"{len(results) - len(failed)}/{len(results)} runs exited 0",
+           [f"{os.path.basename(project)}: exit {code}: {''.join(output.strip().splitlines()[-1:])}"
+            for project, code, output in failed])
+
+    try:
+        with open(os.path.join(install, 'allowed.json')) as f:
+            allowed = json.load(f)['permissions']['allow']
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        report(False, f"allowed.json is valid JSON ({e})")
+        return failures + 1
+    report(True, "allowed.json is valid JSON")
+
+    expected = {SEED_RULE} | {project_rule(i) for i in range(len(projects))}
+    missing = sorted(expected - set(allowed))
+    report(not missing, f"allowed.json holds all {len(expected)} rules", [f"missing {rule}" for rule in missing])
+    report(BLACKLISTED_RULE not in allowed, "the blacklisted rule stayed out of allowed.json")
+    report(len(allowed) == len(set(allowed)), "allowed.json has no duplicates")
+
+    # Each project must at least hold its own rule and the seed, and valid JSON
+    broken = []
+    for i, project in enumerate(projects):
+        try:
+            with open(os.path.join(project, '.claude', 'settings.local.json')) as f:
+                local = set(json.load(f)['permissions']['allow'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            broken.append(f"{os.path.basename(project)}: {e}")
+            continue
+        if not {SEED_RULE, project_rule(i)} <= local:
+            broken.append(f"{os.path.basename(project)}: lost {sorted({SEED_RULE, project_rule(i)} - local)}")
+    report(not broken, "every project's settings are valid and kept their rules", broken)
+
+    left = leftovers(install, home, projects)
+    report(not left, "no temp or lock files left behind", [os.path.relpath(path, os.path.dirname(install)) for path in left])
+    return failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run many permsync syncs at once and check nothing is lost')
+    parser.add_argument('--runs', type=int, default=50, help='concurrent syncs (default: %(default)s)')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES, metavar='ENGINE',
+                        help=f"implementations to run (default: all of {', '.join(ENGINES)})")
+    parser.add_argument('--lock-timeout', type=int, default=300,
+                        help='PERMSYNC_LOCK_TIMEOUT for the runs; the shell path queues slowly (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds before a run is killed (default: %(default)s)')
+    parser.add_argument('--keep', action='store_true', help='keep the temp directory and print its path')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    failures = 0
+    for engine in args.engines:
+        workdir = tempfile.mkdtemp(prefix=f"permsync-stress-{engine}-")
+        try:
+            install, home, projects = prepare(workdir, args.runs)
+            print(f"{engine}: {args.runs} concurrent syncs")
+            results = run_concurrently(install, home, projects, engine, args.timeout, args.lock_timeout)
+            failures += check(install, home, projects, results)
+        finally:
+            if args.keep:
+                print(f"  files kept in {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
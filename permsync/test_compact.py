@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+compact must agree with sync
+After `compact --write`, a sync must not add anything back: every rule compact removes
+is either filtered by sync anyway (shadowed) or still allowed by a broader rule that
+stays (redundant). Run with `python3 test_compact.py` or pytest.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import compact
+import engine
+
+
+class CompactThenSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='permsync-compact-')
+        self.allowed = os.path.join(self.workdir, 'allowed.json')
+        self.blacklist = os.path.join(self.workdir, 'blacklist.json')
+        self.settings = os.path.join(self.workdir, 'project', '.claude', 'settings.local.json')
+        self.fingerprints = os.path.join(self.workdir, 'fingerprints.json')
+        os.makedirs(os.path.dirname(self.settings))
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def write(self, path, key, rules):
+        with open(path, 'w') as f:
+            json.dump({'permissions': {key: rules}}, f)
+
+    def rules(self, path, key):
+        with open(path, 'r') as f:
+            return json.load(f)['permissions'][key]
+
+    def sync(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = engine.sync(self.settings, self.allowed, self.blacklist, force=True,
+                                 fingerprint_file=self.fingerprints)
+        self.assertEqual(status, 0)
+
+    def compact(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = compact.compact(self.allowed, self.blacklist, [self.settings], write=True)
+        self.assertEqual(status, 0)
+
+    def assert_sync_keeps_compacted(self, allowed, local, blacklist):
+        self.write(self.allowed, 'allow', allowed)
+        self.write(self.settings, 'allow', local)
+        self.write(self.blacklist, 'blacklist', blacklist)
+        self.sync()
+        before = self.rules(self.allowed, 'allow')
+
+        self.compact()
+        compacted = (self.rules(self.allowed, 'allow'), self.rules(self.settings, 'allow'))
+        self.sync()
+        synced = (self.rules(self.allowed, 'allow'), self.rules(self.settings, 'allow'))
+        self.assertEqual(compacted, synced, "sync changed the compacted files")
+
+        # Nothing sync allowed before is lost: removed rules are covered by a kept one
+        after = set(synced[0])
+        for rule in before:
+            if rule not in after:
+                cover = compact.find_redundant(sorted(after) + [rule]).get(rule)
+                self.assertIn(cover, after, f"{rule} was removed but nothing covers it")
+
+    def test_glob_patterns_are_not_word_prefixes(self):
+        # Bash(rm:*) as a blacklist glob matches Bash(rm:...) only, not Bash(rm -rf /tmp)
+        self.assert_sync_keeps_compacted(
+            allowed=['Bash(rm -rf /tmp)', 'Bash(rm)', 'Bash(rm:*)', 'Bash(git status)', 'Bash(git:*)',
+                     'Bash(git push origin main)', 'Bash(curl https://example.com)'],
+            local=['Bash(ls -la)', 'Bash(ls:*)', 'Bash(rm -f build)'],
+            blacklist=['Bash(rm:*)', 'Bash(git push*)', 'Bash(curl *)'])
+        allowed = self.rules(self.allowed, 'allow')
+        self.assertIn('Bash(rm -rf /tmp)', allowed)
+        self.assertIn('Bash(rm)', allowed)
+        self.assertNotIn('Bash(rm:*)', allowed)
+
+    def test_rules_covered_by_shadowed_rules_stay(self):
+        # Bash(git:*) is blacklisted, so it cannot stand in for Bash(git status)
+        self.assert_sync_keeps_compacted(
+            allowed=['Bash(git:*)', 'Bash(git status)', 'Bash(git log:*)', 'Bash(git log --oneline)'],
+            local=[],
+            blacklist=['Bash(git:*)'])
+        self.assertEqual(self.rules(self.allowed, 'allow'), ['Bash(git log:*)', 'Bash(git status)'])
+
+    def test_random_rule_sets(self):
+        words = ['git', 'status', 'log', 'push', 'rm', '-rf', '/tmp', 'npm', 'run', 'test', 'ls']
+        generator = random.Random(7)
+
+        def rule():
+            command = ' '.join(generator.choice(words) for _ in range(generator.randint(1, 3)))
+            return f"Bash({command}:*)" if generator.random() < 0.3 else f"Bash({command})"
+
+        def pattern():
+            command = ' '.join(generator.choice(words) for _ in range(generator.randint(1, 2)))
+            return f"Bash({command}{generator.choice(['', '*', ':*', ' *'])})"
+
+        for _ in range(40):
+            self.assert_sync_keeps_compacted(
+                allowed=[rule() for _ in range(generator.randint(0, 25))],
+                local=[rule() for _ in range(generator.randint(0, 10))],
+                blacklist=[pattern() for _ in range(generator.randint(0, 4))])
+
+
+if __name__ == "__main__":
+    unittest.main()
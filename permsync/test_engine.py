@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# @author madebycm (2025)
+
+"""
+Checks for engine.py
+It must never write over rule files it cannot parse: the shell path aborts when jq fails
+on allowed.json or blacklist.json, and the engine has to do the same instead of treating
+the file as empty. Fingerprints must be saved wherever --fingerprints points.
+Run with `python3 test_engine.py` or pytest.
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import engine
+
+MALFORMED = '{"permissions":{"allow":["Bash(ls)","Bash(git status)",]}}\n'
+
+
+class InvalidRuleFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='permsync-engine-')
+        self.allowed = os.path.join(self.workdir, 'allowed.json')
+        self.blacklist = os.path.join(self.workdir, 'blacklist.json')
+        self.fingerprints = os.path.join(self.workdir, 'fingerprints.json')
+        self.settings = self.project('project', ['Bash(npm test)'])
+        self.write_text(self.allowed, json.dumps({'permissions': {'allow': ['Bash(ls)'], 'deny': []}}))
+        self.write_text(self.blacklist, json.dumps({'permissions': {'blacklist': []}}))
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def write_text(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def read_text(self, path):
+        with open(path, 'r') as f:
+            return f.read()
+
+    def project(self, name, rules):
+        path = os.path.join(self.workdir, name, '.claude', 'settings.local.json')
+        os.makedirs(os.path.dirname(path))
+        self.write_text(path, json.dumps({'permissions': {'allow': rules, 'deny': []}}))
+        return path
+
+    def sync(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+            status = engine.sync(self.settings, self.allowed, self.blacklist, force=True,
+                                 fingerprint_file=self.fingerprints)
+        return status, stderr.getvalue()
+
+    def assert_refused(self, run, invalid, files):
+        """run() fails naming the invalid file and leaves every file as it was"""
+        before = {name: self.read_text(name) for name in files}
+        status, stderr = run()
+        self.assertNotEqual(status, 0)
+        self.assertIn(f"Error: Invalid JSON in {invalid}", stderr)
+        self.assertEqual({name: self.read_text(name) for name in files}, before)
+
+    def test_sync_keeps_malformed_allowed(self):
+        self.write_text(self.allowed, MALFORMED)
+        self.assert_refused(self.sync, self.allowed, [self.allowed, self.settings])
+
+    def test_sync_keeps_files_with_malformed_blacklist(self):
+        # Read as empty, the blacklist would let blacklisted rules into allowed.json
+        self.write_text(self.blacklist, '{"permissions":{"blacklist":["Bash(npm *)",]}}\n')
+        self.assert_refused(self.sync, self.blacklist, [self.allowed, self.blacklist, self.settings])
+
+    def test_sync_all_touches_nothing_with_malformed_allowed(self):
+        other = self.project('other', ['Bash(make)'])
+        self.write_text(self.allowed, MALFORMED)
+
+        def sync_all():
+            stderr = io.StringIO()
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+                status = engine.sync_all(self.workdir, self.allowed, self.blacklist,
+                                         fingerprint_file=self.fingerprints)
+            return status, stderr.getvalue()
+
+        self.assert_refused(sync_all, self.allowed, [self.allowed, self.settings, other])
+        self.assertFalse(os.path.exists(self.fingerprints))
+
+    def test_sync_creates_missing_allowed(self):
+        os.unlink(self.allowed)
+        status, _ = self.sync()
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(self.read_text(self.allowed))['permissions']['allow'], ['Bash(npm test)'])
+
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_relative_fingerprint_file_is_saved(self):
+        workdir = tempfile.mkdtemp(prefix='permsync-engine-')
+        cwd = os.getcwd()
+        self.addCleanup(shutil.rmtree, workdir)
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(workdir)
+        settings = os.path.join(workdir, 'project', '.claude', 'settings.local.json')
+        os.makedirs(os.path.dirname(settings))
+        with open(settings, 'w') as f:
+            json.dump({'permissions': {'allow': ['Bash(ls)'], 'deny': []}}, f)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.sync(settings, 'allowed.json', 'blacklist.json', fingerprint_file='fp.json')
+        self.assertIn(os.path.realpath(settings), engine.load_fingerprints('fp.json'))
+
+if __name__ == "__main__":
+    unittest.main()